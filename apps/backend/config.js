@@ -137,6 +137,8 @@ let config = {
             metadata_queue: metadataQueueConf?.keys?.sqs || process.env.METADATA_QUEUE,
             file_queue: fileQueueConf?.keys?.sqs || process.env.FILE_QUEUE,
             export_queue: exporterQueueConf?.keys?.sqs || process.env.EXPORTER_QUEUE,
+            // validate all data files of a submission in one file validation job
+            submission_file_validation: process.env.SUBMISSION_FILE_VALIDATION ? process.env.SUBMISSION_FILE_VALIDATION.toLowerCase() === 'true' : false,
             model_url: modelURLConf || getModelUrl(tierConf?.keys?.tier),
             //uploader configuration file template
             uploaderCLIConfigs: readUploaderCLIConfigTemplate(),
@@ -30,7 +30,7 @@ const NODE_RELATION_TYPES = [NODE_RELATION_TYPE_PARENT, NODE_RELATION_TYPE_CHILD
 
 const FILE = "file";
 class DataRecordService {
-    constructor(dataRecordsCollection, dataRecordArchiveCollection, releaseCollection, fileQueueName, metadataQueueName, awsService, s3Service, qcResultsService, exportQueue) {
+    constructor(dataRecordsCollection, dataRecordArchiveCollection, releaseCollection, fileQueueName, metadataQueueName, awsService, s3Service, qcResultsService, exportQueue, submissionFileValidation = false) {
         this.dataRecordsCollection = dataRecordsCollection;
         this.fileQueueName = fileQueueName;
         this.metadataQueueName = metadataQueueName;
@@ -40,6 +40,8 @@ class DataRecordService {
         this.qcResultsService = qcResultsService;
         this.exportQueue = exportQueue;
         this.releaseCollection = releaseCollection;
+        // validate all data files of a submission in one file validation job instead of a message for each file
+        this.submissionFileValidation = submissionFileValidation;
 
     }
 
@@ -150,13 +152,16 @@ class DataRecordService {
         }
         const isFile = types.some(t => (t?.toLowerCase() === VALIDATION.TYPES.DATA_FILE || t?.toLowerCase() === VALIDATION.TYPES.FILE));
         if (isFile) {
-            const fileNodes = await getFileNodes(this.dataRecordsCollection, submissionID, scope);
-            if (fileNodes && fileNodes.length > 0) {
-                const fileValidationErrors = await this.#sendBatchSQSMessage(fileNodes, validationID, submissionID);
-                if (fileValidationErrors.length > 0)
-                    errorMessages.push(ERRORS.FAILED_VALIDATE_FILE, ...fileValidationErrors)
+            if (!this.submissionFileValidation) {
+                const fileNodes = await getFileNodes(this.dataRecordsCollection, submissionID, scope);
+                if (fileNodes && fileNodes.length > 0) {
+                    const fileValidationErrors = await this.#sendBatchSQSMessage(fileNodes, validationID, submissionID);
+                    if (fileValidationErrors.length > 0)
+                        errorMessages.push(ERRORS.FAILED_VALIDATE_FILE, ...fileValidationErrors)
+                }
             }
-            const msg = Message.createFileSubmissionMessage("Validate Submission Files", submissionID, validationID);
+            // the data files in the scope are validated by the submission job if the scope is given
+            const msg = Message.createFileSubmissionMessage("Validate Submission Files", submissionID, validationID, this.submissionFileValidation ? scope : null);
             const result= await sendSQSMessageWrapper(this.awsService, msg, submissionID, this.fileQueueName, submissionID);
             if (!result.success)
                 errorMessages.push(result.message);
@@ -733,9 +738,12 @@ class Message {
         return msg;
     }
 
-    static createFileSubmissionMessage(type, submissionID, validationID) {
+    static createFileSubmissionMessage(type, submissionID, validationID, scope) {
         const msg = new Message(type, validationID);
         msg.submissionID = submissionID;
+        if (scope) {
+            msg.scope = scope;
+        }
         return msg;
     }
 
@@ -0,0 +1,164 @@
+import time
+import bson
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from pymongo import errors
+from common.utils import get_exception_msg
+
+DEFAULT_BULK_WRITE_BATCH_SIZE = 1000
+DEFAULT_BULK_WRITE_BATCH_BYTES = 8 * 1024 * 1024
+DEFAULT_BULK_WRITE_WORKERS = 4
+
+
+class BatchResult:
+    """
+    Result of a batch of write operations sent in one unordered bulk write.
+    """
+    def __init__(self, index, offset, count, size):
+        self.index = index
+        # index of the first operation of the batch in all operations
+        self.offset = offset
+        self.count = count
+        self.size = size
+        self.latency = 0
+        self.inserted_count = 0
+        self.matched_count = 0
+        self.modified_count = 0
+        self.upserted_count = 0
+        self.deleted_count = 0
+        # write errors of the batch with the index of the operation in all operations
+        self.write_errors = []
+        # error of the batch if it was not written
+        self.error = None
+
+    def set_counts(self, result):
+        for name in ["inserted_count", "matched_count", "modified_count", "upserted_count", "deleted_count"]:
+            setattr(self, name, result.get(name, 0) if isinstance(result, dict) else getattr(result, name))
+
+
+class BulkWriteResult:
+    """
+    Result of all batches of a bulk write.
+    """
+    def __init__(self):
+        self.batches = []
+        self.latency = 0
+
+    @property
+    def ok(self):
+        return all(not batch.error and not batch.write_errors for batch in self.batches)
+
+    @property
+    def count(self):
+        return sum(batch.count for batch in self.batches)
+
+    @property
+    def upserted_count(self):
+        return sum(batch.upserted_count for batch in self.batches)
+
+    @property
+    def modified_count(self):
+        return sum(batch.modified_count for batch in self.batches)
+
+    @property
+    def write_errors(self):
+        return [write_error for batch in self.batches for write_error in batch.write_errors]
+
+    @property
+    def failed_batches(self):
+        return [batch for batch in self.batches if batch.error]
+
+    def get_error_msg(self):
+        write_errors = self.write_errors
+        failed_batches = self.failed_batches
+        msg = f"{len(write_errors)} of {self.count} operations failed"
+        if write_errors:
+            msg += f", {write_errors[0].get('errmsg')}"
+        if failed_batches:
+            msg += f", {len(failed_batches)} of {len(self.batches)} batches failed, {failed_batches[0].error}"
+        return msg
+
+
+class BulkWriter:
+    """
+    Writes operations to a collection in batches bounded by number of operations and BSON size of the documents.
+    Batches are sent as unordered bulk writes, so a bad document only fails its own write, and up to the number of workers
+    batches are written at the same time by a thread pool while the next batches are built from the operations.
+    """
+    def __init__(self, collection, log, batch_size=DEFAULT_BULK_WRITE_BATCH_SIZE, batch_bytes=DEFAULT_BULK_WRITE_BATCH_BYTES,
+                 workers=DEFAULT_BULK_WRITE_WORKERS):
+        self.collection = collection
+        self.log = log
+        self.batch_size = max(1, batch_size)
+        self.batch_bytes = max(1, batch_bytes)
+        self.workers = max(1, workers)
+
+    def write(self, operations):
+        """
+        write operations in batches, errors of batches are returned in the result instead of raised
+        :param operations: iterable of tuples of (write operation, document of the operation), the document is only used to
+        measure the size of the operation, operations are read as batches are sent so a generator is not held in memory
+        :return: BulkWriteResult with results of batches in the order of the batches
+        """
+        result = BulkWriteResult()
+        start = time.perf_counter()
+        pending = set()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for batch in self.get_batches(operations):
+                if len(pending) >= self.workers:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        # raises errors other than database errors
+                        future.result()
+                result.batches.append(batch[0])
+                pending.add(executor.submit(self.write_batch, *batch))
+            for future in pending:
+                future.result()
+        result.latency = time.perf_counter() - start
+        if result.batches:
+            latencies = [batch.latency for batch in result.batches]
+            self.log.info(f"{result.count} operations are written to {self.collection.name} in {len(result.batches)} batches "
+                          f"in {result.latency:.3f}s, batch latency avg {sum(latencies) / len(latencies):.3f}s, max {max(latencies):.3f}s.")
+        return result
+
+    def get_batches(self, operations):
+        """
+        split operations into batches
+        :return: generator of tuples of (BatchResult, list of write operations)
+        """
+        batch, batch_size = [], 0
+        offset = 0
+        index = 0
+        for operation, document in operations:
+            size = len(bson.encode(document))
+            if batch and (len(batch) >= self.batch_size or batch_size + size > self.batch_bytes):
+                yield BatchResult(index, offset, len(batch), batch_size), batch
+                index += 1
+                offset += len(batch)
+                batch, batch_size = [], 0
+            batch.append(operation)
+            batch_size += size
+        if batch:
+            yield BatchResult(index, offset, len(batch), batch_size), batch
+
+    def write_batch(self, batch_result, batch):
+        start = time.perf_counter()
+        try:
+            batch_result.set_counts(self.collection.bulk_write(batch, ordered=False))
+        except errors.BulkWriteError as bwe:
+            batch_result.set_counts({"inserted_count": bwe.details.get("nInserted", 0), "matched_count": bwe.details.get("nMatched", 0),
+                                     "modified_count": bwe.details.get("nModified", 0), "upserted_count": bwe.details.get("nUpserted", 0),
+                                     "deleted_count": bwe.details.get("nRemoved", 0)})
+            for write_error in bwe.details.get("writeErrors", []):
+                batch_result.write_errors.append({**write_error, "index": batch_result.offset + write_error.get("index", 0)})
+            if bwe.details.get("writeConcernErrors"):
+                batch_result.error = f"{bwe.details['writeConcernErrors'][0].get('errmsg')}"
+            self.log.error(f"{len(batch_result.write_errors)} of {batch_result.count} operations of batch {batch_result.index} "
+                           f"failed to be written to {self.collection.name}: {batch_result.write_errors[0].get('errmsg') if batch_result.write_errors else bwe}")
+        except errors.PyMongoError as pe:
+            self.log.exception(pe)
+            batch_result.error = f"{get_exception_msg()}"
+            self.log.error(f"Batch {batch_result.index} of {batch_result.count} operations failed to be written to {self.collection.name}.")
+        batch_result.latency = time.perf_counter() - start
+        self.log.debug(f"Batch {batch_result.index} of {batch_result.count} operations, {batch_result.size} bytes, is written "
+                       f"to {self.collection.name} in {batch_result.latency:.3f}s.")
+        return batch_result
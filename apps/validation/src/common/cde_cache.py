@@ -0,0 +1,112 @@
+import time
+import threading
+from collections import OrderedDict
+from common.utils import is_hashable
+
+DEFAULT_CDE_CACHE_TTL = 3600  # seconds
+DEFAULT_CDE_CACHE_SIZE = 5000
+
+
+class PermissibleValues:
+    """
+    Compiled permissible values of a property.
+    Keeps the stripped values in their original order, a frozenset for exact (case-sensitive) matches
+    and a dict of lower-cased string values to the first canonical value for case-insensitive matches.
+    """
+    def __init__(self, values):
+        values = list(values) if values else []
+        self.is_string = len(values) > 0 and isinstance(values[0], str)
+        self.values = [item.strip() for item in values] if self.is_string else values
+        self.exact_values = frozenset(item for item in self.values if is_hashable(item))
+        self.folded_values = {}
+        if self.is_string:
+            for item in self.values:
+                self.folded_values.setdefault(item.lower(), item)
+
+    def __len__(self):
+        return len(self.values)
+
+    def __iter__(self):
+        return iter(self.values)
+
+    def __getitem__(self, index):
+        return self.values[index]
+
+    def __contains__(self, value):
+        if is_hashable(value):
+            return value in self.exact_values
+        return value in self.values
+
+    def match_ignore_case(self, value):
+        """
+        find the canonical permissible value of a string value in case-insensitive
+        :param value: string value
+        :return: matched permissible value or None
+        """
+        return self.folded_values.get(value.lower())
+
+
+class CDEPermissibleValueCache:
+    """
+    Process-wide cache of compiled CDE permissible values keyed by (CDE code, CDE version).
+    Entries expire after ttl seconds and the least recently used entry is evicted when the cache is full.
+    """
+    def __init__(self, ttl=DEFAULT_CDE_CACHE_TTL, max_size=DEFAULT_CDE_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def configure(self, ttl=None, max_size=None):
+        with self._lock:
+            if ttl is not None:
+                self.ttl = ttl
+            if max_size is not None:
+                self.max_size = max_size
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def get(self, cde_code, cde_version):
+        """
+        get cached permissible values of a CDE
+        :return: tuple of (found, permissible values), permissible values is None if the CDE has no permissible values defined.
+        """
+        key = (cde_code, cde_version)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry[0] > self.ttl:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, entry[1]
+
+    def put(self, cde_code, cde_version, permissible_values):
+        """
+        cache permissible values of a CDE
+        :param permissible_values: permissible values list in the CDE record, None if not defined.
+        :return: compiled permissible values
+        """
+        compiled = PermissibleValues(permissible_values) if permissible_values is not None else None
+        key = (cde_code, cde_version)
+        with self._lock:
+            self._entries[key] = (time.monotonic(), compiled)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return compiled
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+cde_cache = CDEPermissibleValueCache()
@@ -156,6 +156,10 @@ SUBMISSION_REL_STATUS_DELETED= "Deleted"
 VALIDATION_COLLECTION = "validation"
 VALIDATION_ID = "validationID"
 VALIDATION_ENDED= "validationEnded"
+VALIDATION_CHECKPOINT = "metadataValidationCheckpoint"
+CHECKPOINT_STARTED_AT = "startedAt"
+CHECKPOINT_RECORD_COUNT = "recordCount"
+CHECKPOINT_FINGERPRINT = "fingerprint"
 
 #DCF Manifest
 PROD_BUCKET_CONFIG_NAME = "production_bucket_name"
@@ -179,6 +183,19 @@ CDE_FULL_NAME = "CDEFullName"
 CDE_API_URL = "cde-data-element-api"
 CDE_TERM = "Term"
 CDE_PERMISSIVE_VALUES = "PermissibleValues"
+CDE_CACHE_TTL = "cde-cache-ttl"
+CDE_CACHE_SIZE = "cde-cache-size"
+METADATA_VALIDATION_WORKERS = "metadata-validation-workers"
+METADATA_VALIDATION_INCREMENTAL = "metadata-validation-incremental"
+METADATA_VALIDATION_COLUMNAR = "metadata-validation-columnar"
+STREAM_MIN_FILE_SIZE = "stream-min-file-size"
+STREAM_CHUNK_ROWS = "stream-chunk-rows"
+METADATA_DOWNLOAD_WORKERS = "metadata-download-workers"
+TSV_PARSING_ENGINE = "tsv-parsing-engine"
+BULK_WRITE_BATCH_SIZE = "bulk-write-batch-size"
+BULK_WRITE_BATCH_BYTES = "bulk-write-batch-bytes"
+BULK_WRITE_WORKERS = "bulk-write-workers"
+FILE_VALIDATION_WORKERS = "file-validation-workers"
 
 SYNONYM_API_URL = "synonym-api-url"
 
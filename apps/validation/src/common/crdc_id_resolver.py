@@ -0,0 +1,80 @@
+from common.constants import NODE_ID, CRDC_ID, SUBMISSION_ID, SUBMISSION_REL_STATUS, SUBMISSION_REL_STATUS_DELETED
+from common.utils import get_uuid_str
+
+
+class CrdcIdResolver:
+    """
+    Resolves CRDC IDs of new nodes in bulk, with the same precedence as searching each node one by one:
+    1. a released node of the data commons, if all released nodes are deleted, a dataRecord of the data commons
+       not in the submissions the released nodes were deleted from.
+    2. a dataRecord of the same entity type in the study.
+    3. a new UUID.
+    Resolved CRDC IDs are memoized by study, node type and node ID, so the nodes are searched once for all files of a batch.
+    """
+    def __init__(self, mongo_dao, data_common, model):
+        self.mongo_dao = mongo_dao
+        self.data_common = data_common
+        self.model = model
+        # (study ID, node type, node ID) -> CRDC ID
+        self.crdc_ids = {}
+
+    def resolve(self, node_type, node_ids, study_id):
+        """
+        resolve CRDC IDs of new nodes of a type, raises Exception if the nodes can't be searched
+        :param node_type: node type
+        :param node_ids: node IDs
+        :param study_id: study ID of the submission
+        :return: dict of node ID to CRDC ID
+        """
+        node_ids = set(node_ids)
+        unresolved = {node_id for node_id in node_ids if node_id and (study_id, node_type, node_id) not in self.crdc_ids}
+        resolved = {}
+        if unresolved and self.data_common and node_type:
+            resolved = self.search_data_commons(node_type, unresolved)
+        unresolved = {node_id for node_id in unresolved if not resolved.get(node_id)}
+        entity_type = self.model.get_entity_type(node_type)
+        if unresolved and study_id and entity_type:
+            records = self.mongo_dao.search_study_nodes_crdc(study_id, entity_type, unresolved)
+            if records is None:
+                raise Exception(f'Failed to search CRDC IDs of "{node_type}" nodes in the study.')
+            study_resolved = {}
+            for record in records:
+                study_resolved.setdefault(record[NODE_ID], record.get(CRDC_ID))
+            resolved.update({node_id: study_resolved.get(node_id) for node_id in unresolved})
+        crdc_ids = {}
+        for node_id in node_ids:
+            if not node_id:
+                # nodes without ID are not searched
+                crdc_ids[node_id] = get_uuid_str()
+                continue
+            key = (study_id, node_type, node_id)
+            if key not in self.crdc_ids:
+                # the CRDC ID can't be identified from the existing dataset, a new CRDC ID is generated
+                self.crdc_ids[key] = resolved.get(node_id) or get_uuid_str()
+            crdc_ids[node_id] = self.crdc_ids[key]
+        return crdc_ids
+
+    def search_data_commons(self, node_type, node_ids):
+        """
+        search CRDC IDs of nodes in released nodes and dataRecords of the data commons
+        :return: dict of node ID to CRDC ID of the first found node, the CRDC ID may be None
+        """
+        released_nodes = self.mongo_dao.search_released_nodes_crdc(self.data_common, node_type, node_ids)
+        if released_nodes is None:
+            raise Exception(f'Failed to search CRDC IDs of released "{node_type}" nodes.')
+        resolved = {}
+        deleted_submission_ids = {}
+        for node in released_nodes:
+            if node.get(SUBMISSION_REL_STATUS) == SUBMISSION_REL_STATUS_DELETED:
+                deleted_submission_ids.setdefault(node[NODE_ID], set()).add(node.get(SUBMISSION_ID))
+            else:
+                resolved.setdefault(node[NODE_ID], node.get(CRDC_ID))
+        unreleased = [node_id for node_id in node_ids if node_id not in resolved]
+        if unreleased:
+            records = self.mongo_dao.search_nodes_crdc(self.data_common, node_type, unreleased)
+            if records is None:
+                raise Exception(f'Failed to search CRDC IDs of "{node_type}" nodes.')
+            for record in records:
+                if record.get(SUBMISSION_ID) not in deleted_submission_ids.get(record[NODE_ID], set()):
+                    resolved.setdefault(record[NODE_ID], record.get(CRDC_ID))
+        return resolved
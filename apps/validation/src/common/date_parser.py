@@ -0,0 +1,104 @@
+import re
+from datetime import datetime
+from functools import lru_cache
+from bento.common.utils import DATE_FORMATS
+
+DEFAULT_DATE_CACHE_SIZE = 100000
+# permissive patterns of strptime directives, each one accepts at least everything strptime accepts for the directive.
+# locale dependent names are matched lazily by any characters.
+DIRECTIVE_PATTERNS = {
+    "Y": r"\d{4}",
+    "G": r"\d{4}",
+    "y": r"\d{2}",
+    "m": r"\d{1,2}",
+    "d": r" ?\d{1,2}",  # strptime accepts a leading space for single digit days
+    "H": r"\d{1,2}",
+    "I": r"\d{1,2}",
+    "M": r"\d{1,2}",
+    "S": r"\d{1,2}",
+    "f": r"\d{1,6}",
+    "j": r"\d{1,3}",
+    "U": r"\d{1,2}",
+    "W": r"\d{1,2}",
+    "V": r"\d{1,2}",
+    "w": r"\d",
+    "u": r"\d",
+    "z": r"Z|[+-]\d{2}:?\d{2}(:?\d{2}(\.\d{1,6})?)?",
+    "b": r".+?",
+    "B": r".+?",
+    "a": r".+?",
+    "A": r".+?",
+    "p": r".+?",
+    "Z": r".+?",
+    "%": r"%"
+}
+
+
+class DateParser:
+    """
+    Parses date and datetime values with the same result as trying datetime.strptime with each format in order.
+    A shape pattern derived from each format rules out the formats a value can't match without raising ValueError,
+    so usually only the one matching format is tried, and the results of repeated values are memoized.
+    """
+    def __init__(self, formats=DATE_FORMATS, cache_size=DEFAULT_DATE_CACHE_SIZE):
+        self.formats = list(formats)
+        # formats with directives not known by the shape patterns are always tried
+        self.shapes = [(date_format, compile_shape(date_format)) for date_format in self.formats]
+        self.parse_string = lru_cache(maxsize=cache_size)(self._parse_string)
+
+    def parse(self, value):
+        """
+        parse a date or datetime value
+        :param value: value to parse
+        :return: datetime parsed with the first format matching the value, or None if no format matches
+        """
+        if isinstance(value, str):
+            return self.parse_string(value)
+        # strptime raises TypeError for non string value
+        for date_format in self.formats:
+            try:
+                return datetime.strptime(value, date_format)
+            except ValueError:
+                continue
+        return None
+
+    def _parse_string(self, value):
+        for date_format, shape in self.shapes:
+            if shape is not None and not shape.fullmatch(value):
+                continue
+            try:
+                return datetime.strptime(value, date_format)
+            except ValueError:
+                continue
+        return None
+
+
+def compile_shape(date_format):
+    """
+    compile a case-insensitive pattern accepting at least all values strptime accepts for the format
+    :param date_format: strptime format
+    :return: compiled pattern, or None if the format contains a directive without known pattern
+    """
+    pattern = []
+    index = 0
+    while index < len(date_format):
+        char = date_format[index]
+        if char == "%":
+            directive = date_format[index + 1: index + 2]
+            directive_pattern = DIRECTIVE_PATTERNS.get(directive)
+            if directive_pattern is None:
+                return None
+            pattern.append(f"(?:{directive_pattern})")
+            index += 2
+        elif char.isspace():
+            # strptime matches a run of white space in the format with one or more white space characters
+            while index < len(date_format) and date_format[index].isspace():
+                index += 1
+            pattern.append(r"\s+")
+        else:
+            pattern.append(re.escape(char))
+            index += 1
+    return re.compile("".join(pattern), re.IGNORECASE)
+
+
+date_parser = DateParser()
@@ -0,0 +1,88 @@
+import threading
+from collections import Counter, OrderedDict
+from common.constants import S3_FILE_INFO, FILE_NAME, MD5
+
+DEFAULT_MANIFEST_INDEX_CACHE_SIZE = 16
+
+
+class ManifestIndex:
+    """
+    Counts of the data file records of a submission by file name, by MD5 and by both,
+    so the duplicate checks of a data file don't scan all file records of the submission.
+    """
+    def __init__(self, file_records):
+        self.count = 0
+        self.name_md5_counts = Counter()
+        self.name_counts = Counter()
+        self.md5_counts = Counter()
+        for file_record in file_records:
+            file_info = file_record.get(S3_FILE_INFO) or {}
+            file_name, md5 = file_info.get(FILE_NAME), file_info.get(MD5)
+            self.name_md5_counts[(file_name, md5)] += 1
+            self.name_counts[file_name] += 1
+            self.md5_counts[md5] += 1
+            self.count += 1
+
+    def count_same_name_md5(self, file_name, md5):
+        return self.name_md5_counts[(file_name, md5)]
+
+    def count_same_name_other_md5(self, file_name, md5):
+        return self.name_counts[file_name] - self.name_md5_counts[(file_name, md5)]
+
+    def count_same_md5_other_name(self, file_name, md5):
+        return self.md5_counts[md5] - self.name_md5_counts[(file_name, md5)]
+
+
+class ManifestIndexCache:
+    """
+    Process-wide cache of manifest indexes keyed by submission ID and validation ID, so the index is built once
+    for the data files of a validation, which are validated by a message for each file.
+    A new validation, e.g. after a manifest is uploaded or file records are deleted, builds a new index.
+    The least recently used index is evicted when the cache is full.
+    """
+    def __init__(self, max_size=DEFAULT_MANIFEST_INDEX_CACHE_SIZE):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, mongo_dao, submission_id, validation_id=None):
+        """
+        get the index of the file records of a submission for a validation
+        :param validation_id: ID of the validation, the index is built and not cached without it
+        :return: ManifestIndex, None if the file records can't be read
+        """
+        key = (submission_id, validation_id)
+        if validation_id is not None:
+            with self._lock:
+                index = self._entries.get(key)
+                if index is not None:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return index
+        with self._lock:
+            self.misses += 1
+        file_records = mongo_dao.get_file_manifest(submission_id)
+        if file_records is None:
+            return None
+        index = ManifestIndex(file_records)
+        if validation_id is None:
+            return index
+        with self._lock:
+            self._entries[key] = index
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return index
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+manifest_index_cache = ManifestIndexCache()
@@ -1,8 +1,11 @@
 from common.constants import IDS, NODES_LABEL, MODEL, RELATIONSHIPS, LIST_DELIMITER_PROP, DEF_MAIN_NODES
+from common.validation_plan import build_node_plan
 
 class DataModel:
-    def __init__(self, model):
+    def __init__(self, model, validation_plans=None):
         self.model = model
+        # compiled validation plans by node type, shared by all DataModel instances of the same model version
+        self.validation_plans = validation_plans if validation_plans is not None else {}
 
     # model connivent functions
     # """
@@ -86,6 +89,16 @@ class DataModel:
     """
     def get_list_delimiter(self):
         return self.model.get(LIST_DELIMITER_PROP)
-    
-    
-    
\ No newline at end of file
+
+    """
+    get compiled validation plan of a node, a dict of property name to PropertyPlan, or None if the node has no properties
+    """
+    def get_validation_plan(self, node_type):
+        node_plan = self.validation_plans.get(node_type)
+        if node_plan is None:
+            props = self.get_node_props(node_type)
+            if props is None:
+                return None
+            node_plan = build_node_plan(props, self.get_list_delimiter())
+            self.validation_plans[node_type] = node_plan
+        return node_plan
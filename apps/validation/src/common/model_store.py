@@ -20,6 +20,8 @@ class ModelFactory:
     def __init__(self, model_def_loc, tier):
         self.log = get_logger('Models')
         self.models = None
+        # compiled validation plans by model key
+        self.validation_plans = {}
         msg = None
         # get models definition file, content.json in models dir
         self.model_def_dir = os.path.join(model_def_loc, tier + "/cache")
@@ -52,6 +54,8 @@ class ModelFactory:
             model_reader = YamlModelParser(file_names, dc, delimiter, version)
             model_reader.model.update({DEF_FILE_NODES: v[DEF_SEMANTICS][DEF_FILE_NODES], DEF_MAIN_NODES: v[DEF_SEMANTICS][DEF_MAIN_NODES]})
             self.models.update({model_key(dc, version): model_reader.model})
+            # plans compiled from a previous model of the version are stale
+            self.validation_plans.pop(model_key(dc, version), None)
         except Exception as e:
             self.log.exception(e)
             msg = f"Failed to create data model: {data_common}/{version}!"
@@ -69,7 +73,7 @@ class ModelFactory:
         v = self.models_def[dc]
         version = v[DEF_VERSION]
         model = self.models.get(model_key(dc, version))
-        return DataModel(model)
+        return DataModel(model, self.get_validation_plans(dc, version))
     
     """
     get model by data common and version
@@ -85,10 +89,16 @@ class ModelFactory:
                     self.log.exception(e)
                     msg = f"Failed to create data model: {data_common}/{version}!"
                     self.log.exception(f"{msg} {get_exception_msg()}")
-            return DataModel(model)   
+            return DataModel(model, self.get_validation_plans(data_common, version))   
         else:
             return self.get_model_by_data_common(data_common)
         
+    """
+    get cached validation plans of a model version, the plans are compiled by node type on first use
+    """
+    def get_validation_plans(self, data_common, version):
+        return self.validation_plans.setdefault(model_key(data_common, version), {})
+
 def model_key(data_common, version):
     return f"{data_common}_{version}"
         
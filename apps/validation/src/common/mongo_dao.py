@@ -8,16 +8,29 @@ from common.constants import BATCH_COLLECTION, SUBMISSION_COLLECTION, DATA_COLlE
     SUBMISSION_REL_STATUS, SUBMISSION_REL_STATUS_DELETED, STUDY_ABBREVIATION, SUBMISSION_STATUS, STUDY_ID, \
     CROSS_SUBMISSION_VALIDATION_STATUS, ADDITION_ERRORS, VALIDATION_COLLECTION, VALIDATION_ENDED, CONFIG_COLLECTION, \
     BATCH_BUCKET, CDE_COLLECTION, CDE_CODE, CDE_VERSION, ENTITY_TYPE, QC_COLLECTION, QC_RESULT_ID, CONFIG_TYPE, \
-    SYNONYM_COLLECTION, PV_TERM, SYNONYM_TERM, CDE_FULL_NAME, CDE_PERMISSIVE_VALUES, CREATED_AT, PROPERTIES
+    SYNONYM_COLLECTION, PV_TERM, SYNONYM_TERM, CDE_FULL_NAME, CDE_PERMISSIVE_VALUES, CREATED_AT, PROPERTIES, ORIN_FILE_NAME, \
+    VALIDATION_CHECKPOINT, BATCH_IDS, MD5
 from common.utils import get_exception_msg, current_datetime, get_uuid_str
+from common.bulk_writer import BulkWriter, DEFAULT_BULK_WRITE_BATCH_SIZE, DEFAULT_BULK_WRITE_BATCH_BYTES, DEFAULT_BULK_WRITE_WORKERS
 
 MAX_SIZE = 10000
 
 class MongoDao:
-    def __init__(self, connectionStr, db_name):
+    def __init__(self, connectionStr, db_name, bulk_write_batch_size=DEFAULT_BULK_WRITE_BATCH_SIZE,
+                 bulk_write_batch_bytes=DEFAULT_BULK_WRITE_BATCH_BYTES, bulk_write_workers=DEFAULT_BULK_WRITE_WORKERS):
       self.log = get_logger("Mongo DAO")
       self.client = MongoClient(connectionStr)
       self.db_name = db_name
+      self.bulk_write_batch_size = bulk_write_batch_size
+      self.bulk_write_batch_bytes = bulk_write_batch_bytes
+      self.bulk_write_workers = bulk_write_workers
+
+    """
+    get writer of unordered bulk writes in batches to the collection
+    """
+    def get_bulk_writer(self, collection):
+        return BulkWriter(collection, self.log, self.bulk_write_batch_size, self.bulk_write_batch_bytes, self.bulk_write_workers)
+
     """
     get batch by id
     """
@@ -120,7 +133,64 @@ class MongoDao:
             self.log.exception(e)
             self.log.exception(f"{submission_id}: Failed to search nodes: {get_exception_msg()}")
             return None
-        
+
+    """
+    stream the keys of all dataRecords in a submission, as tuples of (nodeType, nodeID, _id, orginalFileName, lineNumber)
+    """
+    def get_node_keys_by_submission(self, submission_id):
+        db = self.client[self.db_name]
+        data_collection = db[DATA_COLlECTION]
+        projection = {ID: 1, NODE_TYPE: 1, NODE_ID: 1, ORIN_FILE_NAME: 1, "lineNumber": 1}
+        try:
+            cursor = data_collection.find({SUBMISSION_ID: submission_id}, projection, batch_size=MAX_SIZE)
+            return [(node.get(NODE_TYPE), node.get(NODE_ID), node[ID], node.get(ORIN_FILE_NAME), node.get("lineNumber")) for node in cursor]
+        except errors.PyMongoError as pe:
+            self.log.exception(pe)
+            self.log.exception(f"{submission_id}: Failed to retrieve node keys: {get_exception_msg()}")
+            return None
+        except Exception as e:
+            self.log.exception(e)
+            self.log.exception(f"{submission_id}: Failed to retrieve node keys: {get_exception_msg()}")
+            return None
+
+    """
+    find nodes of a node type in a submission by a list of nodeIDs
+    """
+    def search_nodes_by_type_and_ids(self, submission_id, node_type, node_ids):
+        db = self.client[self.db_name]
+        data_collection = db[DATA_COLlECTION]
+        try:
+            return list(data_collection.find({SUBMISSION_ID: submission_id, NODE_TYPE: node_type, NODE_ID: {"$in": list(node_ids)}},
+                                             {NODE_TYPE: 1, NODE_ID: 1, PROPERTIES: 1}))
+        except errors.PyMongoError as pe:
+            self.log.exception(pe)
+            self.log.exception(f"{submission_id}: Failed to search {node_type} nodes: {get_exception_msg()}")
+            return None
+        except Exception as e:
+            self.log.exception(e)
+            self.log.exception(f"{submission_id}: Failed to search {node_type} nodes: {get_exception_msg()}")
+            return None
+
+    """
+    find released nodes of a node type by a list of nodeIDs, optionally filtered by release status
+    """
+    def search_released_nodes_by_ids(self, data_commons, node_type, node_ids, status=None):
+        db = self.client[self.db_name]
+        data_collection = db[RELEASE_COLLECTION]
+        query = {DATA_COMMON_NAME: data_commons, NODE_TYPE: node_type, NODE_ID: {"$in": list(node_ids)}}
+        if status is not None:
+            query[SUBMISSION_REL_STATUS] = {"$in": status}
+        try:
+            return list(data_collection.find(query, {NODE_TYPE: 1, NODE_ID: 1}))
+        except errors.PyMongoError as pe:
+            self.log.exception(pe)
+            self.log.exception(f"Failed to find release records for {data_commons}/{node_type}: {get_exception_msg()}")
+            return None
+        except Exception as e:
+            self.log.exception(e)
+            self.log.exception(f"Failed to find release records for {data_commons}/{node_type}: {get_exception_msg()}")
+            return None
+
     """
     check node exists by dataCommons, nodeType and nodeID
     """
@@ -193,6 +263,24 @@ class MongoDao:
             self.log.exception(f"Failed to find data file for the submission, {submission_id}: {get_exception_msg()}")
             return None
     
+    """
+    get file names and md5 of data file records of a submission
+    """
+    def get_file_manifest(self, submission_id):
+        db = self.client[self.db_name]
+        file_collection = db[DATA_COLlECTION]
+        try:
+            return list(file_collection.find({SUBMISSION_ID: submission_id, S3_FILE_INFO: {"$nin": [None, ""]}},
+                                             {f"{S3_FILE_INFO}.{FILE_NAME}": 1, f"{S3_FILE_INFO}.{MD5}": 1}))
+        except errors.PyMongoError as pe:
+            self.log.exception(pe)
+            self.log.exception(f"Failed to find data file for the submission, {submission_id}: {get_exception_msg()}")
+            return None
+        except Exception as e:
+            self.log.exception(e)
+            self.log.exception(f"Failed to find data file for the submission, {submission_id}: {get_exception_msg()}")
+            return None
+    
     def update_batch(self, batch):
         db = self.client[self.db_name]
         batch_collection = db[BATCH_COLLECTION]
@@ -265,6 +353,30 @@ class MongoDao:
             self.log.exception(f"Failed to update data file, {file_record[ID]}: {get_exception_msg()}")
             return False  
     """
+    update s3 file info of data file records in dataRecords collection
+    """
+    def update_files_info(self, file_records):
+        db = self.client[self.db_name]
+        file_collection = db[DATA_COLlECTION]
+        try:
+            result = self.get_bulk_writer(file_collection).write(get_set_operations(file_records, lambda m: {S3_FILE_INFO: m[S3_FILE_INFO]}))
+            self.log.info(f'Total {result.modified_count} data file records are updated!')
+            if not result.ok:
+                msg = f"Failed to update data files, {result.get_error_msg()}"
+                self.log.error(msg)
+                return False, msg
+            return True, None
+        except errors.PyMongoError as pe:
+            self.log.exception(pe)
+            msg = f"Failed to update data files, {get_exception_msg()}"
+            self.log.exception(msg)
+            return False, msg
+        except Exception as e:
+            self.log.exception(e)
+            msg = f"Failed to update data files, {get_exception_msg()}"
+            self.log.exception(msg)
+            return False, msg
+    """
     update errors in submissions collection
     """   
     def set_submission_validation_status(self, submission, file_status, metadata_status, cross_submission_status, fileErrors, is_delete = False):
@@ -322,11 +434,14 @@ class MongoDao:
         db = self.client[self.db_name]
         file_collection = db[DATA_COLlECTION]
         try:
-            result = file_collection.bulk_write([
-                ReplaceOne( {ID: m[ID]}, remove_id(m),  upsert=True)
-                    for m in list(data_records)
-                ])
+            result = self.get_bulk_writer(file_collection).write(get_replace_operations(data_records))
+            if not result.batches:
+                return True, None
             self.log.info(f'Total {result.upserted_count} dataRecords are upserted!')
+            if not result.ok:
+                msg = f"Failed to update metadata, {result.get_error_msg()}"
+                self.log.error(msg)
+                return False, msg
             return True, None
         except errors.PyMongoError as pe:
             self.log.exception(pe)
@@ -346,12 +461,13 @@ class MongoDao:
         db = self.client[self.db_name]
         file_collection = db[DATA_COLlECTION]
         try:
-            result = file_collection.bulk_write([
-                UpdateOne( {ID: m[ID]}, 
-                    {"$set": {STATUS: m[STATUS], UPDATED_AT: m[UPDATED_AT], VALIDATED_AT: m[UPDATED_AT], QC_RESULT_ID: m.get(QC_RESULT_ID), PROPERTIES: m.get(PROPERTIES)}})
-                    for m in list(data_records)
-                ])
+            result = self.get_bulk_writer(file_collection).write(get_set_operations(data_records,
+                lambda m: {STATUS: m[STATUS], VALIDATED_AT: m[VALIDATED_AT], QC_RESULT_ID: m.get(QC_RESULT_ID), PROPERTIES: m.get(PROPERTIES)}))
             self.log.info(f'Total {result.modified_count} dataRecords are updated!')
+            if not result.ok:
+                msg = f"Failed to update metadata, {result.get_error_msg()}"
+                self.log.error(msg)
+                return False, msg
             return True, None
         except errors.PyMongoError as pe:
             self.log.debug(pe)
@@ -370,12 +486,13 @@ class MongoDao:
         db = self.client[self.db_name]
         file_collection = db[DATA_COLlECTION]
         try:
-            result = file_collection.bulk_write([
-                UpdateOne( {ID: m[ID]}, 
-                    {"$set": {UPDATED_AT: m[UPDATED_AT], VALIDATED_AT: m[UPDATED_AT], ADDITION_ERRORS: m.get(ADDITION_ERRORS, [])}})
-                    for m in list(data_records)
-                ])
+            result = self.get_bulk_writer(file_collection).write(get_set_operations(data_records,
+                lambda m: {VALIDATED_AT: m[VALIDATED_AT], ADDITION_ERRORS: m.get(ADDITION_ERRORS, [])}))
             self.log.info(f'Total {result.modified_count} dataRecords are updated!')
+            if not result.ok:
+                msg = f"Failed to update metadata, {result.get_error_msg()}"
+                self.log.error(msg)
+                return False, msg
             return True, None
         except errors.PyMongoError as pe:
             self.log.exception(pe)
@@ -459,29 +576,6 @@ class MongoDao:
             self.log.exception(f"{submission_id}: Failed to retrieve data records, {get_exception_msg()}")
             return None 
 
-    """
-    retrieve dataRecord by submissionID and scope either New dataRecords or All in batch
-    """
-    def get_dataRecords_chunk(self, submission_id, scope, start, size):
-        db = self.client[self.db_name]
-        file_collection = db[DATA_COLlECTION]
-        try:
-            query = {SUBMISSION_ID: {'$eq': submission_id}} 
-            if scope == STATUS_NEW:
-                query[STATUS] = STATUS_NEW
-                result = list(file_collection.find(query).sort({SUBMISSION_ID: 1, "nodeType": 1, "nodeID": 1}).limit(size))
-            else:
-                result = list(file_collection.find(query).sort({SUBMISSION_ID: 1, "nodeType": 1, "nodeID": 1}).skip(start).limit(size))
-            return result
-        except errors.PyMongoError as pe:
-            self.log.exception(pe)
-            self.log.exception(f"{submission_id}: Failed to retrieve data records, {get_exception_msg()}")
-            return None
-        except Exception as e:
-            self.log.exception(e)
-            self.log.exception(f"{submission_id}: Failed to retrieve data records, {get_exception_msg()}")
-            return None 
-        
     """
     retrieve dataRecord by submissionID and nodeType
     """
@@ -499,7 +593,49 @@ class MongoDao:
         except Exception as e:
             self.log.exception(e)
             self.log.exception(f"{submission_id}: Failed to retrieve data records, {get_exception_msg()}")
-            return None 
+            return None
+
+    """
+    stream dataRecords of a submission in chunks, optionally filtered by scope and nodeType, with keyset pagination
+    on the submissionID_nodeType_nodeID index. Each chunk is fetched after the (nodeType, nodeID) of the last record of
+    the previous chunk, so the fetch time does not grow with the offset, and records changed by the caller between
+    chunks, e.g. validated records no longer in New status, are neither skipped nor read twice.
+    yields None and stops if failed to retrieve a chunk.
+    """
+    def get_dataRecords_chunks(self, submission_id, scope=None, node_type=None, size=MAX_SIZE):
+        db = self.client[self.db_name]
+        file_collection = db[DATA_COLlECTION]
+        query = {SUBMISSION_ID: submission_id}
+        if node_type:
+            query[NODE_TYPE] = node_type
+        if scope == STATUS_NEW:
+            query[STATUS] = STATUS_NEW
+        sort = [(SUBMISSION_ID, 1), (NODE_TYPE, 1), (NODE_ID, 1)]
+        last_key, last_ids = None, []
+        while True:
+            try:
+                chunk_query = query if last_key is None else {"$and": [query, get_keyset_query(last_key, last_ids)]}
+                result = list(file_collection.find(chunk_query).sort(sort).limit(size))
+            except errors.PyMongoError as pe:
+                self.log.exception(pe)
+                self.log.exception(f"{submission_id}: Failed to retrieve data records, {get_exception_msg()}")
+                yield None
+                return
+            except Exception as e:
+                self.log.exception(e)
+                self.log.exception(f"{submission_id}: Failed to retrieve data records, {get_exception_msg()}")
+                yield None
+                return
+            if len(result) == 0:
+                return
+            # remember _ids of the records sharing the last key, which may be duplicated in a submission
+            key = (result[-1].get(NODE_TYPE), result[-1].get(NODE_ID))
+            if key != last_key:
+                last_key, last_ids = key, []
+            last_ids.extend(record[ID] for record in result if (record.get(NODE_TYPE), record.get(NODE_ID)) == key)
+            yield result
+            if len(result) < size:
+                return
 
     """
     retrieve dataRecord by nodeID
@@ -519,6 +655,29 @@ class MongoDao:
             self.log.exception(f"{submission_id}: Failed to retrieve data record, {get_exception_msg()}")
             return None   
     """
+    retrieve dataRecords of nodes of a type by nodeIDs, with the fields to reuse when the nodes are loaded again.
+    the nodeIDs are queried in slices of the given size to keep each query small.
+    """
+    def get_dataRecords_by_nodes(self, submission_id, node_type, node_ids, size=MAX_SIZE):
+        db = self.client[self.db_name]
+        data_collection = db[DATA_COLlECTION]
+        node_ids = list(node_ids)
+        projection = {ID: 1, NODE_ID: 1, BATCH_IDS: 1, CREATED_AT: 1, CRDC_ID: 1, QC_RESULT_ID: 1}
+        try:
+            records = []
+            for start in range(0, len(node_ids), size):
+                records.extend(data_collection.find({SUBMISSION_ID: submission_id, NODE_TYPE: node_type, NODE_ID: {"$in": node_ids[start: start + size]}},
+                                                    projection, batch_size=size))
+            return records
+        except errors.PyMongoError as pe:
+            self.log.exception(pe)
+            self.log.exception(f"{submission_id}: Failed to retrieve data records, {get_exception_msg()}")
+            return None
+        except Exception as e:
+            self.log.exception(e)
+            self.log.exception(f"{submission_id}: Failed to retrieve data records, {get_exception_msg()}")
+            return None
+    """
     find child node by type and id
     """
     def get_nodes_by_parents(self, parent_ids, submission_id):
@@ -686,6 +845,44 @@ class MongoDao:
             self.log.exception(f"{md5_info[SUBMISSION_ID]}: Failed to save data file md5: {get_exception_msg()}")
             return False
         
+    """
+    find cached file md5 of all data files of a submission
+    """
+    def get_files_md5(self, submission_id):
+        db = self.client[self.db_name]
+        data_collection = db[FILE_MD5_COLLECTION]
+        try:
+            return list(data_collection.find({SUBMISSION_ID: submission_id}))
+        except errors.PyMongoError as pe:
+            self.log.exception(pe)
+            self.log.exception(f"{submission_id}: Failed to retrieve data files md5: {get_exception_msg()}")
+            return None
+        except Exception as e:
+            self.log.exception(e)
+            self.log.exception(f"{submission_id}: Failed to retrieve data files md5: {get_exception_msg()}")
+            return None
+
+    """
+    save md5 info of data files to fileMD5 collection
+    """
+    def save_files_md5(self, md5_infos):
+        db = self.client[self.db_name]
+        data_collection = db[FILE_MD5_COLLECTION]
+        try:
+            result = self.get_bulk_writer(data_collection).write(get_replace_operations(md5_infos))
+            if not result.ok:
+                self.log.error(f"Failed to save data files md5, {result.get_error_msg()}")
+                return False
+            return True
+        except errors.PyMongoError as pe:
+            self.log.exception(pe)
+            self.log.exception(f"Failed to save data files md5: {get_exception_msg()}")
+            return False
+        except Exception as e:
+            self.log.exception(e)
+            self.log.exception(f"Failed to save data files md5: {get_exception_msg()}")
+            return False
+
     """
     get release by CRDC_ID
     """
@@ -810,6 +1007,64 @@ class MongoDao:
             self.log.exception(f"Failed to search node for study {get_exception_msg()}")
             return None
 
+    def search_released_nodes_crdc(self, data_commons, node_type, node_ids, size=MAX_SIZE):
+        """
+        Search release collection for CRDC IDs of given nodes
+        :param data_commons:
+        :param node_type:
+        :param node_ids:
+        :param size: number of node IDs in a query
+        :return: list of release records with nodeID, CRDC_ID, submissionID and status, None if failed
+        """
+        db = self.client[self.db_name]
+        data_collection = db[RELEASE_COLLECTION]
+        projection = {NODE_ID: 1, CRDC_ID: 1, SUBMISSION_ID: 1, SUBMISSION_REL_STATUS: 1}
+        return self._find_by_node_ids(data_collection, {DATA_COMMON_NAME: data_commons, NODE_TYPE: node_type}, node_ids, projection, size)
+
+    def search_nodes_crdc(self, data_commons, node_type, node_ids, size=MAX_SIZE):
+        """
+        Search dataRecord collection for CRDC IDs of given nodes
+        :param data_commons:
+        :param node_type:
+        :param node_ids:
+        :param size: number of node IDs in a query
+        :return: list of dataRecords with nodeID, CRDC_ID and submissionID, None if failed
+        """
+        db = self.client[self.db_name]
+        data_collection = db[DATA_COLlECTION]
+        projection = {NODE_ID: 1, CRDC_ID: 1, SUBMISSION_ID: 1}
+        return self._find_by_node_ids(data_collection, {DATA_COMMON_NAME: data_commons, NODE_TYPE: node_type}, node_ids, projection, size)
+
+    def search_study_nodes_crdc(self, studyID, entity_type, node_ids, size=MAX_SIZE):
+        """
+        Search dataRecord collection for CRDC IDs of given nodes in a study
+        :param studyID:
+        :param entity_type:
+        :param node_ids:
+        :param size: number of node IDs in a query
+        :return: list of dataRecords with nodeID and CRDC_ID, None if failed
+        """
+        db = self.client[self.db_name]
+        data_collection = db[DATA_COLlECTION]
+        projection = {NODE_ID: 1, CRDC_ID: 1}
+        return self._find_by_node_ids(data_collection, {STUDY_ID: studyID, ENTITY_TYPE: entity_type}, node_ids, projection, size)
+
+    def _find_by_node_ids(self, data_collection, query, node_ids, projection, size):
+        node_ids = list(node_ids)
+        try:
+            results = []
+            for start in range(0, len(node_ids), size):
+                results.extend(data_collection.find({**query, NODE_ID: {"$in": node_ids[start: start + size]}}, projection, batch_size=size))
+            return results
+        except errors.PyMongoError as pe:
+            self.log.exception(pe)
+            self.log.exception(f"Failed to search nodes in {data_collection.name}: {get_exception_msg()}")
+            return None
+        except Exception as e:
+            self.log.exception(e)
+            self.log.exception(f"Failed to search nodes in {data_collection.name}: {get_exception_msg()}")
+            return None
+
     def search_released_node(self, data_commons, node_type, node_id):
         """
         Search release collection for given node
@@ -897,10 +1152,189 @@ class MongoDao:
             self.log.exception(e)
             self.log.exception(f"Failed to find release record for {data_commons}/{parent_node[PARENT_TYPE]}/{parent_node[PARENT_ID_VAL]}: {get_exception_msg()}")
             return None
-        
+
+    """
+    group the distinct nodeIDs of certain type children nodes in a submission by their parent of a given type,
+    returns a list of {_id: {parentIDPropName, parentIDValue}, nodeIDs: [...]}
+    """
+    def get_child_ids_by_parent(self, submission_id, node_type, parent_type):
+        db = self.client[self.db_name]
+        data_collection = db[DATA_COLlECTION]
+        match = {SUBMISSION_ID: submission_id, NODE_TYPE: node_type, f"{PARENTS}.{PARENT_TYPE}": parent_type}
+        try:
+            return list(data_collection.aggregate(get_child_ids_by_parent_pipeline(match, parent_type), allowDiskUse=True))
+        except errors.PyMongoError as pe:
+            self.log.exception(pe)
+            self.log.exception(f"{submission_id}: Failed to group {node_type} nodes by {parent_type}: {get_exception_msg()}")
+            return None
+        except Exception as e:
+            self.log.exception(e)
+            self.log.exception(f"{submission_id}: Failed to group {node_type} nodes by {parent_type}: {get_exception_msg()}")
+            return None
+
+    """
+    group the distinct nodeIDs of certain type released children nodes by their parent of a given type,
+    limited to the given parent ID values, returns a list of {_id: {parentIDPropName, parentIDValue}, nodeIDs: [...]}
+    the parent ID values are searched in chunks of MAX_SIZE, each chunk only groups by its own parent ID values.
+    """
+    def get_released_child_ids_by_parent(self, data_commons, node_type, parent_type, parent_id_values):
+        db = self.client[self.db_name]
+        data_collection = db[RELEASE_COLLECTION]
+        parent_id_values = list(parent_id_values)
+        try:
+            results = []
+            for start in range(0, len(parent_id_values), MAX_SIZE):
+                chunk = parent_id_values[start: start + MAX_SIZE]
+                match = {DATA_COMMON_NAME: data_commons, NODE_TYPE: node_type,
+                         PARENTS: {"$elemMatch": {PARENT_TYPE: parent_type, PARENT_ID_VAL: {"$in": chunk}}}}
+                results.extend(data_collection.aggregate(get_child_ids_by_parent_pipeline(match, parent_type, chunk), allowDiskUse=True))
+            return results
+        except errors.PyMongoError as pe:
+            self.log.exception(pe)
+            self.log.exception(f"Failed to group released {data_commons}/{node_type} nodes by {parent_type}: {get_exception_msg()}")
+            return None
+        except Exception as e:
+            self.log.exception(e)
+            self.log.exception(f"Failed to group released {data_commons}/{node_type} nodes by {parent_type}: {get_exception_msg()}")
+            return None
+
+    """
+    retrieve _id, nodeType, nodeID and parents of dataRecords in a submission changed since a given time,
+    i.e. never validated, updated after last validated or updated after the given time.
+    updatedAt of dataRecords is only set by loading metadata, validations set validatedAt.
+    """
+    def get_changed_dataRecords(self, submission_id, updated_after):
+        db = self.client[self.db_name]
+        data_collection = db[DATA_COLlECTION]
+        query = {SUBMISSION_ID: submission_id, "$or": [{VALIDATED_AT: None}, {UPDATED_AT: {"$gt": updated_after}},
+                                                        {"$expr": {"$gt": [f"${UPDATED_AT}", f"${VALIDATED_AT}"]}}]}
+        try:
+            return list(data_collection.find(query, {ID: 1, NODE_TYPE: 1, NODE_ID: 1, PARENTS: 1}))
+        except errors.PyMongoError as pe:
+            self.log.exception(pe)
+            self.log.exception(f"{submission_id}: Failed to retrieve changed data records: {get_exception_msg()}")
+            return None
+        except Exception as e:
+            self.log.exception(e)
+            self.log.exception(f"{submission_id}: Failed to retrieve changed data records: {get_exception_msg()}")
+            return None
+
+    """
+    retrieve nodeType, nodeID and parents of released nodes of a data commons created or updated after a given time
+    """
+    def get_changed_released_nodes(self, data_commons, updated_after):
+        db = self.client[self.db_name]
+        data_collection = db[RELEASE_COLLECTION]
+        query = {DATA_COMMON_NAME: data_commons, "$or": [{CREATED_AT: {"$gt": updated_after}}, {UPDATED_AT: {"$gt": updated_after}}]}
+        try:
+            return list(data_collection.find(query, {ID: 0, NODE_TYPE: 1, NODE_ID: 1, PARENTS: 1}))
+        except errors.PyMongoError as pe:
+            self.log.exception(pe)
+            self.log.exception(f"Failed to retrieve changed released nodes of {data_commons}: {get_exception_msg()}")
+            return None
+        except Exception as e:
+            self.log.exception(e)
+            self.log.exception(f"Failed to retrieve changed released nodes of {data_commons}: {get_exception_msg()}")
+            return None
+
+    """
+    retrieve the distinct status of dataRecords in a submission, returns a list of status or None if failed
+    """
+    def get_dataRecord_statuses(self, submission_id):
+        db = self.client[self.db_name]
+        data_collection = db[DATA_COLlECTION]
+        try:
+            return data_collection.distinct(STATUS, {SUBMISSION_ID: submission_id})
+        except errors.PyMongoError as pe:
+            self.log.exception(pe)
+            self.log.exception(f"{submission_id}: Failed to retrieve status of data records: {get_exception_msg()}")
+            return None
+        except Exception as e:
+            self.log.exception(e)
+            self.log.exception(f"{submission_id}: Failed to retrieve status of data records: {get_exception_msg()}")
+            return None
+
+    """
+    retrieve _ids of dataRecords in a submission with the given node keys, with a parent of the given parent keys
+    or of the given node types. node keys and parent keys are dicts of nodeType to list of nodeIDs.
+    """
+    def get_dataRecord_ids(self, submission_id, node_keys=None, parent_keys=None, node_types=None):
+        db = self.client[self.db_name]
+        data_collection = db[DATA_COLlECTION]
+        conditions = [{NODE_TYPE: node_type, NODE_ID: {"$in": list(node_ids)}} for node_type, node_ids in (node_keys or {}).items()]
+        conditions.extend({PARENTS: {"$elemMatch": {PARENT_TYPE: parent_type, PARENT_ID_VAL: {"$in": list(parent_ids)}}}}
+                          for parent_type, parent_ids in (parent_keys or {}).items())
+        if node_types:
+            conditions.append({NODE_TYPE: {"$in": list(node_types)}})
+        if len(conditions) == 0:
+            return []
+        try:
+            return [record[ID] for record in data_collection.find({SUBMISSION_ID: submission_id, "$or": conditions}, {ID: 1})]
+        except errors.PyMongoError as pe:
+            self.log.exception(pe)
+            self.log.exception(f"{submission_id}: Failed to retrieve data record IDs: {get_exception_msg()}")
+            return None
+        except Exception as e:
+            self.log.exception(e)
+            self.log.exception(f"{submission_id}: Failed to retrieve data record IDs: {get_exception_msg()}")
+            return None
+
+    """
+    retrieve dataRecords in a submission by _ids
+    """
+    def get_dataRecords_by_ids(self, submission_id, record_ids):
+        db = self.client[self.db_name]
+        data_collection = db[DATA_COLlECTION]
+        try:
+            return list(data_collection.find({SUBMISSION_ID: submission_id, ID: {"$in": list(record_ids)}}))
+        except errors.PyMongoError as pe:
+            self.log.exception(pe)
+            self.log.exception(f"{submission_id}: Failed to retrieve data records: {get_exception_msg()}")
+            return None
+        except Exception as e:
+            self.log.exception(e)
+            self.log.exception(f"{submission_id}: Failed to retrieve data records: {get_exception_msg()}")
+            return None
+
+    """
+    retrieve CDE codes and versions of the given CDE codes updated after a given time
+    """
+    def get_updated_cdes(self, cde_codes, updated_after):
+        db = self.client[self.db_name]
+        data_collection = db[CDE_COLLECTION]
+        try:
+            return list(data_collection.find({CDE_CODE: {"$in": list(cde_codes)}, UPDATED_AT: {"$gt": updated_after}},
+                                             {ID: 0, CDE_CODE: 1, CDE_VERSION: 1}))
+        except errors.PyMongoError as pe:
+            self.log.exception(pe)
+            self.log.exception(f"Failed to retrieve updated CDEs: {get_exception_msg()}")
+            return None
+        except Exception as e:
+            self.log.exception(e)
+            self.log.exception(f"Failed to retrieve updated CDEs: {get_exception_msg()}")
+            return None
+
+    """
+    save the checkpoint of the last validation of the whole submission
+    """
+    def set_submission_validation_checkpoint(self, submission_id, checkpoint):
+        db = self.client[self.db_name]
+        data_collection = db[SUBMISSION_COLLECTION]
+        try:
+            result = data_collection.update_one({ID: submission_id}, {"$set": {VALIDATION_CHECKPOINT: checkpoint}})
+            return result.matched_count > 0
+        except errors.PyMongoError as pe:
+            self.log.exception(pe)
+            self.log.exception(f"{submission_id}: Failed to save validation checkpoint: {get_exception_msg()}")
+            return False
+        except Exception as e:
+            self.log.exception(e)
+            self.log.exception(f"{submission_id}: Failed to save validation checkpoint: {get_exception_msg()}")
+            return False
+
+    """
+    count documents in a given collection and conditions
     """
-    count documents in a given collection and conditions 
-    """  
     def count_docs(self, collection, query):
         db = self.client[self.db_name]
         data_collection = db[collection]
@@ -1060,6 +1494,24 @@ class MongoDao:
             self.log.exception(f"Failed to get qc record for {qc_id}: {get_exception_msg()}")
             return None
 
+    """
+    get qc records by qc_id list
+    :param qc_ids:
+    """
+    def get_qcRecords(self, qc_ids):
+        db = self.client[self.db_name]
+        data_collection = db[QC_COLLECTION]
+        try:
+            return list(data_collection.find({ID: {"$in": list(qc_ids)}}))
+        except errors.PyMongoError as pe:
+            self.log.exception(pe)
+            self.log.exception(f"Failed to get qc records: {get_exception_msg()}")
+            return None
+        except Exception as e:
+            self.log.exception(e)
+            self.log.exception(f"Failed to get qc records: {get_exception_msg()}")
+            return None
+
     """
     delete qc record by qc_id
     :param qc_id:
@@ -1090,11 +1542,11 @@ class MongoDao:
             return True if result.deleted_count > 0 else False
         except errors.PyMongoError as pe:
             self.log.exception(pe)
-            self.log.exception(f"Failed to delete qc record for {qc_id}: {get_exception_msg()}")
+            self.log.exception(f"Failed to delete qc records for {qc_ids}: {get_exception_msg()}")
             return False
         except Exception as e:
             self.log.exception(e)
-            self.log.exception(f"Failed to delete qc record for {qc_id}: {get_exception_msg()}")
+            self.log.exception(f"Failed to delete qc records for {qc_ids}: {get_exception_msg()}")
             return False
 
     """
@@ -1105,11 +1557,12 @@ class MongoDao:
         db = self.client[self.db_name]
         data_collection = db[QC_COLLECTION]
         try:
-            result = data_collection.bulk_write([
-                ReplaceOne({ID: m[ID]}, remove_id(m), upsert=True)
-                    for m in list(qc_list)
-                ])
+            result = self.get_bulk_writer(data_collection).write(get_replace_operations(qc_list))
             self.log.info(f'Total {result.upserted_count} QC records are upserted!')
+            if not result.ok:
+                msg = f"Failed to upsert QC records, {result.get_error_msg()}"
+                self.log.error(msg)
+                return False, msg
             return True, None
         except errors.PyMongoError as pe:
             self.log.exception(pe)
@@ -1160,6 +1613,22 @@ class MongoDao:
             self.log.exception(f"Failed to get synonyms for {synonym}: {get_exception_msg()}")
             return None
     """
+    get all synonym records in synonyms collection
+    """
+    def get_synonyms(self):
+        db = self.client[self.db_name]
+        data_collection = db[SYNONYM_COLLECTION]
+        try:
+            return list(data_collection.find({}, {ID: 0, SYNONYM_TERM: 1, PV_TERM: 1}, batch_size=MAX_SIZE))
+        except errors.PyMongoError as pe:
+            self.log.exception(pe)
+            self.log.exception(f"Failed to get synonyms: {get_exception_msg()}")
+            return None
+        except Exception as e:
+            self.log.exception(e)
+            self.log.exception(f"Failed to get synonyms: {get_exception_msg()}")
+            return None
+    """
     upsert synonym records
     :param synonym_list
     """
@@ -1200,4 +1669,44 @@ def remove_id (data_record):
         if k == ID:
             continue
         data[k] = data_record[k]
-    return data
\ No newline at end of file
+    return data
+"""
+get upsert operations replacing records by ID, with the replacement document of each operation for the bulk writer
+"""
+def get_replace_operations(data_records):
+    for data_record in data_records:
+        data = remove_id(data_record)
+        yield ReplaceOne({ID: data_record[ID]}, data, upsert=True), data
+"""
+get operations setting values of records by ID, with the values of each operation for the bulk writer
+"""
+def get_set_operations(data_records, get_values):
+    for data_record in data_records:
+        values = get_values(data_record)
+        yield UpdateOne({ID: data_record[ID]}, {"$set": values}), values
+"""
+get query of records sorted after the given (nodeType, nodeID) key, excluding records with the key already read
+"""
+def get_keyset_query(last_key, last_ids):
+    node_type, node_id = last_key
+    return {"$or": [
+        {NODE_TYPE: {"$gt": node_type}},
+        {NODE_TYPE: node_type, NODE_ID: {"$gt": node_id} if node_id is not None else {"$ne": None}},
+        {NODE_TYPE: node_type, NODE_ID: node_id, ID: {"$nin": last_ids}}
+    ]}
+
+"""
+get aggregation pipeline grouping distinct child nodeIDs by parent of a given type, limited to the given parent ID values if any
+"""
+def get_child_ids_by_parent_pipeline(match, parent_type, parent_id_values=None):
+    parent_match = {f"{PARENTS}.{PARENT_TYPE}": parent_type}
+    if parent_id_values is not None:
+        parent_match[f"{PARENTS}.{PARENT_ID_VAL}"] = {"$in": parent_id_values}
+    return [
+        {"$match": match},
+        {"$project": {NODE_ID: 1, PARENTS: 1}},
+        {"$unwind": f"${PARENTS}"},
+        {"$match": parent_match},
+        {"$group": {ID: {PARENT_ID_NAME: f"${PARENTS}.{PARENT_ID_NAME}", PARENT_ID_VAL: f"${PARENTS}.{PARENT_ID_VAL}"},
+                    "nodeIDs": {"$addToSet": f"${NODE_ID}"}}}
+    ]
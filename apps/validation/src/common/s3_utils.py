@@ -1,11 +1,14 @@
 import boto3
+from botocore.config import Config
 from botocore.exceptions import ClientError
 
 
 class S3Service:
-    def __init__(self, aws_profile = None):
+    def __init__(self, aws_profile = None, max_pool_connections = None):
         self.session = boto3.Session(profile_name=aws_profile) if aws_profile else boto3.Session()
-        self.s3_client = self.session.client('s3')
+        # the client is shared by threads, the pool needs a connection for each of them
+        self.s3_client = self.session.client('s3', config=Config(max_pool_connections=max_pool_connections)) \
+            if max_pool_connections else self.session.client('s3')
 
     def close(self, log):
         try:
@@ -49,6 +52,44 @@ class S3Service:
             else:
                 raise e
             
+    def get_file_size(self, bucket_name, key):
+        """
+        get size of a file in s3 bucket, None if the file does not exist
+        """
+        try:
+            response = self.s3_client.head_object(Bucket=bucket_name, Key=key)
+            return response.get('ContentLength')
+        except ClientError as e:
+            if e.response['Error']['Code'] == '404' or e.response['Error']['Code'] == 'NoSuchKey':
+                return None
+            else:
+                raise e
+
+    def get_file_head(self, bucket_name, key):
+        """
+        get head of a file in s3 bucket, e.g. ContentLength and LastModified, None if the file does not exist
+        """
+        try:
+            return self.s3_client.head_object(Bucket=bucket_name, Key=key)
+        except ClientError as e:
+            if e.response['Error']['Code'] == '404' or e.response['Error']['Code'] == 'NoSuchKey':
+                return None
+            else:
+                raise e
+
+    def download_file(self, bucket_name, key, file_path):
+        """
+        download a file in s3 bucket to a local path
+        """
+        self.s3_client.download_file(bucket_name, key, file_path)
+
+    def get_file_stream(self, bucket_name, key):
+        """
+        open a file in s3 bucket as a stream of bytes, the caller needs to close the stream
+        """
+        response = self.s3_client.get_object(Bucket=bucket_name, Key=key)
+        return response['Body']
+
     def move_file(self, source_bucket, source_key, dest_bucket, dest_key):
         try:
             copy_source = {'Bucket': source_bucket, 'Key': source_key}
@@ -0,0 +1,127 @@
+import re
+import threading
+from bento.common.utils import get_logger
+from common.constants import SYNONYM_COLLECTION, SYNONYM_TERM, PV_TERM
+from common.utils import is_hashable
+
+
+class SynonymIndex:
+    """
+    In-memory index of the synonyms collection for suggesting permissible values.
+    The index is loaded once per process and reloaded when the number of synonyms in the collection changes,
+    i.e. after the PV puller inserted new synonyms.
+    """
+    def __init__(self):
+        self.log = get_logger('Synonym Index')
+        self.doc_count = None
+        # lower-cased synonym term -> set of equivalent terms
+        self.synonym_terms = {}
+        # equivalent term -> lower-cased synonym terms and equivalent term of its synonym records
+        self.searchable_terms = {}
+        self._lock = threading.Lock()
+
+    def is_loaded(self):
+        return self.doc_count is not None
+
+    def refresh(self, mongo_dao):
+        """
+        load the synonyms collection if it is not loaded yet or has been changed since last loaded
+        :param mongo_dao: Data access object for MongoDB operations.
+        :return: True if the index is loaded
+        """
+        count = mongo_dao.count_docs(SYNONYM_COLLECTION, {})
+        if count is False:
+            return self.is_loaded()
+        with self._lock:
+            if self.doc_count == count:
+                return True
+            synonyms = mongo_dao.get_synonyms()
+            if synonyms is None:
+                return self.doc_count is not None
+            synonym_terms = {}
+            searchable_terms = {}
+            for synonym in synonyms:
+                synonym_term, pv_term = synonym.get(SYNONYM_TERM), synonym.get(PV_TERM)
+                if not is_hashable(pv_term):
+                    continue
+                terms = searchable_terms.get(pv_term)
+                if terms is None:
+                    terms = searchable_terms[pv_term] = [pv_term.lower()] if isinstance(pv_term, str) else []
+                if isinstance(synonym_term, str):
+                    terms.append(synonym_term.lower())
+                    synonym_terms.setdefault(synonym_term.lower(), set()).add(pv_term)
+            self.synonym_terms = synonym_terms
+            self.searchable_terms = searchable_terms
+            self.doc_count = count
+            self.log.info(f'{count} synonyms are loaded.')
+            return True
+
+    def get_terms(self):
+        """
+        get the terms of the index to load the same index in another process
+        :return: tuple of (number of synonyms, synonym terms, searchable terms)
+        """
+        with self._lock:
+            return self.doc_count, self.synonym_terms, self.searchable_terms
+
+    def load_terms(self, terms):
+        """
+        load the terms of an index got by get_terms
+        """
+        with self._lock:
+            self.doc_count, self.synonym_terms, self.searchable_terms = terms
+
+    def find_equivalent_terms(self, synonym):
+        """
+        find equivalent terms of a synonym term in case-insensitive
+        :param synonym: synonym term
+        :return: set of equivalent terms
+        """
+        return self.synonym_terms.get(synonym.lower(), set()) if isinstance(synonym, str) else set()
+
+    def suggest(self, value, permissive_vals):
+        """
+        find the first permissible value that has a synonym record with synonym term or equivalent term containing the value,
+        same as searching the synonyms collection with a case-insensitive regex of the value.
+        :param value: invalid value
+        :param permissive_vals: permissible values of the property
+        :return: suggested permissible value or None
+        """
+        if not isinstance(value, str) or not permissive_vals:
+            return None
+        matches = get_term_matcher(value)
+        if matches is None:
+            return None
+        # exact synonym matches only imply a regex match if the value is plain text
+        equivalent_terms = self.find_equivalent_terms(value) if is_plain_text(value) else set()
+        for pv in permissive_vals:
+            if not is_hashable(pv):
+                continue
+            if pv in equivalent_terms:
+                return pv
+            terms = self.searchable_terms.get(pv)
+            if terms and any(matches(term) for term in terms):
+                return pv
+        return None
+
+
+def get_term_matcher(value):
+    """
+    get a function that checks if a lower-cased term matches the value as a case-insensitive regex,
+    plain values are matched as substrings.
+    """
+    lower_value = value.lower()
+    if is_plain_text(value):
+        return lambda term: lower_value in term
+    try:
+        pattern = re.compile(value, re.IGNORECASE)
+    except re.error:
+        return None
+    return lambda term: pattern.search(term) is not None
+
+
+def is_plain_text(value):
+    return re.escape(value) == value
+
+
+synonym_index = SynonymIndex()
@@ -0,0 +1,162 @@
+from collections import defaultdict
+import numpy as np
+import pandas as pd
+from pandas._libs.parsers import STR_NA_VALUES
+from common.utils import removeTailingEmptyColumnsAndRows
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    from pyarrow import csv as pa_csv
+except ImportError:
+    pa = None
+
+SEPARATOR_CHAR = '\t'
+UTF8_ENCODE = 'utf8'
+# strings read as missing values by pandas by default, besides empty cells
+DEFAULT_NA_STRINGS = sorted(STR_NA_VALUES - {''})
+TSV_ENGINE_PANDAS = "pandas"
+TSV_ENGINE_PYARROW = "pyarrow"
+TSV_ENGINES = [TSV_ENGINE_PANDAS, TSV_ENGINE_PYARROW]
+# characters removed by str.strip, i.e. str.isspace, arrow kernels trim a different set of whitespace by default
+WHITESPACE_CHARS = "\t\n\x0b\x0c\r\x1c\x1d\x1e\x1f \x85\xa0\u1680\u2000\u2001\u2002\u2003\u2004\u2005\u2006\u2007" \
+    "\u2008\u2009\u200a\u2028\u2029\u202f\u205f\u3000"
+# dtype of the columns pandas reads with dtype 'str', object before pandas 3
+STRING_DTYPE = pd.Series(dtype='str').dtype
+
+
+class ParsedTsv:
+    """
+    Metadata TSV file parsed once and normalized, shared by the essential validation and the data loader.
+    The frame has stripped headers and values, and only empty cells are missing as the data loader reads it.
+    The essential validation also reads the pandas default NA strings, e.g. "NA" and "null", as missing,
+    they are kept as a mask applied on demand, so the file is not parsed twice.
+    """
+    def __init__(self, file_path, df, na_mask=None):
+        self.file_path = file_path
+        self.df = df
+        self.na_mask = na_mask
+
+    def get_validation_frame(self):
+        """
+        get the frame read by the essential validation, with the default NA strings as missing values
+        :return: dataframe, the same frame as the loading frame if the file has no default NA strings
+        """
+        return self.df if self.na_mask is None else self.df.mask(self.na_mask)
+
+    def get_loading_frame(self):
+        """
+        get the frame read by the data loader, with tailing empty columns and rows removed
+        :return: dataframe
+        """
+        return removeTailingEmptyColumnsAndRows(self.df)
+
+
+def parse_tsv(file_path, engine=TSV_ENGINE_PYARROW):
+    """
+    parse a metadata TSV file, raises the same errors as pd.read_csv for invalid files
+    :param file_path: path of the TSV file
+    :param engine: "pyarrow" to read the file with the multithreaded arrow CSV reader if pyarrow is installed,
+    a file arrow can't read the same way, e.g. with rows of missing or extra cells, or invalid, is read by pandas.
+    "pandas" to read the file with pandas only.
+    :return: ParsedTsv
+    """
+    if engine not in TSV_ENGINES:
+        raise ValueError(f'Invalid TSV parsing engine "{engine}", it must be one of {TSV_ENGINES}.')
+    if engine == TSV_ENGINE_PYARROW and pa is not None:
+        parsed_file = parse_tsv_arrow(file_path)
+        if parsed_file:
+            return parsed_file
+    df = pd.read_csv(file_path, sep=SEPARATOR_CHAR, header=0, dtype='str', encoding=UTF8_ENCODE, keep_default_na=False, na_values=[''])
+    return normalize_tsv(file_path, df)
+
+
+def normalize_tsv(file_path, df):
+    """
+    strip headers and values of a frame read with only empty cells as missing, and mask its default NA strings
+    :param file_path: path of the TSV file
+    :param df: dataframe read from the file
+    :return: ParsedTsv
+    """
+    # default NA strings are matched before stripping, as pandas matches them on the raw cells
+    na_mask = df.isin(DEFAULT_NA_STRINGS).to_numpy()
+    na_mask = na_mask if na_mask.any() else None
+    df = (df.rename(columns=lambda x: x.strip())).apply(lambda x: x.str.strip() if x.dtype == 'object' or pd.api.types.is_string_dtype(x.dtype) else x) # stripe white space.
+    return ParsedTsv(file_path, df, na_mask)
+
+
+def parse_tsv_arrow(file_path):
+    """
+    parse a metadata TSV file with the arrow CSV reader, headers and values are stripped with arrow kernels
+    :param file_path: path of the TSV file
+    :return: ParsedTsv of the same frame as parse_tsv with pandas, None if arrow can't read the file as pandas does
+    """
+    column_count = get_header_field_count(file_path)
+    if not column_count:
+        return None
+    try:
+        # the header is read as the first row, so empty and duplicated column names are named as pandas names them
+        table = pa_csv.read_csv(file_path,
+            read_options=pa_csv.ReadOptions(use_threads=True, autogenerate_column_names=True),
+            parse_options=pa_csv.ParseOptions(delimiter=SEPARATOR_CHAR, newlines_in_values=True, ignore_empty_lines=True),
+            convert_options=pa_csv.ConvertOptions(column_types={f"f{i}": pa.string() for i in range(column_count)},
+                strings_can_be_null=True, quoted_strings_can_be_null=True, null_values=['']))
+    except pa.ArrowException:
+        # rows with missing or extra cells, non UTF-8 characters, etc.
+        return None
+    if table.num_columns == 0 or any(not pa.types.is_string(field.type) for field in table.schema):
+        return None
+    if table.num_columns == 1 and pc.any(pc.match_substring_regex(table.column(0), "^ +$")).as_py():
+        # pandas skips lines of only spaces as blank lines, they are cells of spaces in a file of one column
+        return None
+    header = [value if value is not None else "" for value in table.slice(0, 1).to_pylist()[0].values()]
+    table = table.slice(1)
+    values = []
+    na_masks = []
+    for column in table.columns:
+        # default NA strings are matched before stripping, as pandas matches them on the raw cells
+        na_masks.append(pc.is_in(column, value_set=pa.array(DEFAULT_NA_STRINGS)).to_numpy(zero_copy_only=False))
+        values.append(to_string_series(pc.utf8_trim(column, characters=WHITESPACE_CHARS)))
+    df = pd.DataFrame(dict(enumerate(values)), index=pd.RangeIndex(table.num_rows))
+    df.columns = [name.strip() for name in get_column_names(header)]
+    na_mask = np.column_stack(na_masks)
+    na_mask = na_mask if na_mask.any() else None
+    return ParsedTsv(file_path, df, na_mask)
+
+
+def get_header_field_count(file_path):
+    """
+    get the max number of fields of the header, the first line that is not blank
+    """
+    with open(file_path, "rb") as file:
+        for line in file:
+            if line.rstrip(b"\r\n"):
+                return line.count(SEPARATOR_CHAR.encode()) + 1
+    return 0
+
+
+def get_column_names(header):
+    """
+    name empty and duplicated columns as pandas does, e.g. "Unnamed: 2", "age.1"
+    """
+    names = [name if name else f"Unnamed: {i}" for i, name in enumerate(header)]
+    counts = defaultdict(int)
+    for i, name in enumerate(names):
+        count = counts[name]
+        while count > 0:
+            counts[name] = count + 1
+            name = f"{name}.{count}"
+            count = counts[name]
+        names[i] = name
+        counts[name] = count + 1
+    return names
+
+
+def to_string_series(column):
+    """
+    convert an arrow string column to a series of the dtype pandas reads with dtype 'str', missing values are NaN
+    """
+    if hasattr(STRING_DTYPE, "__from_arrow__"):
+        return pd.Series(STRING_DTYPE.__from_arrow__(column))
+    values = column.to_numpy(zero_copy_only=False)
+    values[pd.isna(values)] = np.nan
+    return pd.Series(values, dtype='str')
@@ -0,0 +1,226 @@
+import csv
+import io
+import os
+import re
+import sqlite3
+import tempfile
+import pandas as pd
+from common.tsv_parser import SEPARATOR_CHAR, UTF8_ENCODE, normalize_tsv
+
+DEFAULT_STREAM_CHUNK_ROWS = 50000
+STREAM_READ_SIZE = 8 * 1024 * 1024
+QUOTE_CHAR = ord('"')
+TAB_CHAR = ord(SEPARATOR_CHAR)
+LINE_NUMBER_PATTERN = re.compile(r"line (\d+)")
+
+
+class StreamedTsv:
+    """
+    Metadata TSV file read from S3 in chunks of rows, so a file of any size is validated and loaded in bounded memory.
+    The stream is split into batches of complete rows and each batch is parsed and normalized the same way parse_tsv
+    parses a whole file, the row index and the line numbers in parser errors are relative to the whole file.
+    The file is read from S3 again each time the chunks are iterated.
+    """
+    def __init__(self, s3_service, bucket_name, key, file_name, chunk_rows=DEFAULT_STREAM_CHUNK_ROWS):
+        self.s3_service = s3_service
+        self.bucket_name = bucket_name
+        self.key = key
+        self.file_name = file_name
+        self.chunk_rows = chunk_rows
+        # set by the essential validation for the data loader
+        # columns and number of rows left after removing tailing empty columns and rows as the data loader reads the file
+        self.loading_columns = None
+        self.loading_row_count = 0
+        # node IDs in more than one row, the rows are merged into one dataRecord
+        self.multi_row_ids = set()
+
+    def read_chunks(self):
+        """
+        read the file in chunks of rows, raises the same errors as pd.read_csv for invalid files
+        :return: generator of ParsedTsv of each chunk, at least one chunk is read if the file has a header
+        """
+        body = self.s3_service.get_file_stream(self.bucket_name, self.key)
+        try:
+            records = read_records(body)
+            header = None
+            for line_number, record in records:
+                # pandas skips blank lines before the header
+                if record.rstrip(b"\r\n"):
+                    header = record
+                    break
+            if header is None:
+                raise pd.errors.EmptyDataError("No columns to parse from file")
+            header = header if header.endswith(b"\n") else header + b"\n"
+            column_count = len(next(csv.reader([header.decode(UTF8_ENCODE)], delimiter=SEPARATOR_CHAR)))
+            # an empty leading row makes pandas check the field count of the first row of the batch as it does for other rows
+            # instead of reading the first column as the index when the first row has an extra field.
+            leading = header + SEPARATOR_CHAR.join(['""'] * column_count).encode() + b"\n"
+            row_offset = 0
+            batch, batch_line = [], None
+            for line_number, record in records:
+                if batch_line is None:
+                    batch_line = line_number
+                batch.append(record)
+                if len(batch) >= self.chunk_rows:
+                    df = self._parse_batch(leading, batch, batch_line, row_offset)
+                    row_offset += len(df.index)
+                    batch, batch_line = [], None
+                    yield normalize_tsv(self.file_name, df)
+            if batch or row_offset == 0:
+                yield normalize_tsv(self.file_name, self._parse_batch(leading, batch, batch_line, row_offset))
+        finally:
+            body.close()
+
+    def _parse_batch(self, leading, batch, batch_line, row_offset):
+        data = leading + b"".join(batch)
+        try:
+            df = pd.read_csv(io.BytesIO(data), sep=SEPARATOR_CHAR, header=0, dtype='str', encoding=UTF8_ENCODE, keep_default_na=False, na_values=[''])
+        except pd.errors.ParserError as pe:
+            # the header and the leading row are the first two lines of the batch
+            offset = (batch_line or 3) - 3
+            raise pd.errors.ParserError(LINE_NUMBER_PATTERN.sub(lambda m: f"line {int(m.group(1)) + offset}", str(pe))) from pe
+        df = df.iloc[1:]
+        df.index = pd.RangeIndex(row_offset, row_offset + len(df.index))
+        return df
+
+
+class RowKeyIndex:
+    """
+    Temporary on-disk index of the ID, relationship values and a hash of other values of each row of a streamed file,
+    used to find duplicated IDs and check many-to-many relationships without keeping the rows in memory.
+    """
+    def __init__(self, dir_path=None):
+        fd, self.db_path = tempfile.mkstemp(suffix=".db", dir=dir_path)
+        os.close(fd)
+        self.conn = sqlite3.connect(self.db_path)
+        self.conn.execute("CREATE TABLE row_key (line INTEGER PRIMARY KEY, id TEXT, rels TEXT, props INTEGER)")
+        self.indexed = False
+
+    def add_rows(self, rows):
+        """
+        add rows to the index
+        :param rows: iterable of tuples of (row index, ID, JSON list of relationship values, hash of other values)
+        """
+        self.conn.executemany("INSERT INTO row_key VALUES (?, ?, ?, ?)", rows)
+
+    def _create_id_index(self):
+        if not self.indexed:
+            self.conn.execute("CREATE INDEX row_key_id ON row_key (id)")
+            self.indexed = True
+
+    def get_repeated_ids(self):
+        """
+        get the ID of each row whose ID is in a previous row, in the order of the rows
+        :return: generator of IDs
+        """
+        self._create_id_index()
+        cursor = self.conn.execute("SELECT id FROM (SELECT id, line, ROW_NUMBER() OVER (PARTITION BY id ORDER BY line) AS n FROM row_key) WHERE n > 1 ORDER BY line")
+        return (row[0] for row in cursor)
+
+    def get_duplicated_rows(self):
+        """
+        get all rows with an ID in more than one row, in the order of the rows
+        :return: generator of tuples of (row index, ID)
+        """
+        self._create_id_index()
+        return self.conn.execute("SELECT line, id FROM row_key WHERE id IN (SELECT id FROM row_key GROUP BY id HAVING COUNT(*) > 1) ORDER BY line")
+
+    def get_duplicated_row_keys(self):
+        """
+        get all rows with an ID in more than one row, in the order of the rows
+        :return: list of tuples of (row index, ID, JSON list of relationship values, hash of other values)
+        """
+        self._create_id_index()
+        return self.conn.execute("SELECT line, id, rels, props FROM row_key WHERE id IN (SELECT id FROM row_key GROUP BY id HAVING COUNT(*) > 1) ORDER BY line").fetchall()
+
+    def get_multi_row_ids(self):
+        """
+        get IDs in more than one row
+        :return: set of IDs
+        """
+        self._create_id_index()
+        return {row[0] for row in self.conn.execute("SELECT id FROM row_key GROUP BY id HAVING COUNT(*) > 1")}
+
+    def close(self):
+        self.conn.close()
+        if os.path.isfile(self.db_path):
+            os.remove(self.db_path)
+
+
+def read_records(body, read_size=STREAM_READ_SIZE):
+    """
+    split a stream of a TSV file into rows, a row is more than one line if a quoted value contains line breaks
+    :param body: binary stream with read(size)
+    :param read_size: number of bytes to read at a time
+    :return: generator of tuples of (line number, bytes of the row), line numbers count rows as pandas does in parser errors
+    """
+    line_number = 0
+    record, in_quotes = [], False
+    for line in read_lines(body, read_size):
+        record.append(line)
+        if in_quotes or QUOTE_CHAR in line:
+            in_quotes = ends_in_quoted_value(line, in_quotes)
+        if not in_quotes:
+            line_number += 1
+            yield line_number, b"".join(record)
+            record = []
+    if record:
+        yield line_number + 1, b"".join(record)
+
+
+def read_lines(body, read_size=STREAM_READ_SIZE):
+    pending = b""
+    while True:
+        block = body.read(read_size)
+        if not block:
+            break
+        lines = (pending + block).split(b"\n")
+        pending = lines.pop()
+        for line in lines:
+            yield line + b"\n"
+    if pending:
+        yield pending
+
+
+def ends_in_quoted_value(line, in_quotes):
+    """
+    check if a line ends inside a quoted value as the pandas tokenizer reads it,
+    a quote only starts a quoted value at the beginning of a value, and two quotes in a quoted value are a literal quote.
+    :param line: bytes of the line
+    :param in_quotes: if the line starts inside a quoted value
+    :return: True if the row continues on the next line
+    """
+    index = 0
+    length = len(line)
+    value_start = not in_quotes
+    while index < length:
+        char = line[index]
+        if in_quotes:
+            if char == QUOTE_CHAR:
+                if index + 1 < length and line[index + 1] == QUOTE_CHAR:
+                    index += 1
+                else:
+                    in_quotes = False
+        elif char == QUOTE_CHAR and value_start:
+            in_quotes = True
+        value_start = not in_quotes and char == TAB_CHAR
+        index += 1
+    return in_quotes
+
+
+def trim_tailing_columns(columns, notna_counts):
+    """
+    get the columns left after removing tailing empty columns as removeTailingEmptyColumnsAndRows does
+    :param columns: list of column names
+    :param notna_counts: dict or Series of column name to number of non-empty values
+    :return: list of column names
+    """
+    columns = list(columns)
+    index = len(columns) - 1
+    while not columns[index] or "Unnamed:" in columns[index]:
+        if notna_counts["Unnamed: " + str(index)] == 0:
+            del columns[index]
+        else:
+            break
+        index -= 1
+    return columns
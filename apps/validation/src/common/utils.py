@@ -225,13 +225,15 @@ def removeTailingEmptyColumnsAndRows(df):
     index = col_length - 1
     while not columns[index] or  "Unnamed:" in columns[index]:
         if df["Unnamed: " + str(index)].notna().sum() == 0: 
-            df = df.drop(df.columns[index], axis=1)
+            index -= 1
         else:
             break
-        index -= 1
-    # remove tailing empty row
-    while  df.iloc[[-1]].isnull().all(1).values[0]:
-        df = df.iloc[:-1]
+    if index < col_length - 1:
+        df = df.iloc[:, :index + 1]
+    # remove tailing empty rows, the rows after the last row with a value
+    if len(df.index) > 0 and df.iloc[-1].isnull().all():
+        not_empty = np.flatnonzero(df.notna().any(axis=1).to_numpy())
+        df = df.iloc[:not_empty[-1] + 1 if len(not_empty) > 0 else 0]
     return df
 
 def dict_exists_in_list(dict_list, target_dict, keys=None):
@@ -253,5 +255,14 @@ def dict_exists_in_list(dict_list, target_dict, keys=None):
                 return True
     return False
 
-
-
+def is_hashable(value):
+    """
+    Check if a value can be used as a set member or dict key
+    :param value: any value
+    :return: Boolean
+    """
+    try:
+        hash(value)
+        return True
+    except TypeError:
+        return False
@@ -0,0 +1,51 @@
+from common.constants import TYPE, MIN, MAX, CDE_TERM, TERM_CODE, TERM_VERSION
+from common.model_reader import valid_prop_types
+from common.cde_cache import PermissibleValues
+
+PROP_CONVERTERS = {
+    "integer": int,
+    "number": float
+}
+
+
+class PropertyPlan:
+    """
+    Compiled validation plan of a property in a data model version.
+    Everything the metadata validator needs to check a value, the type, converter, boundaries, permissible values
+    defined in the model, caDSR CDE term and list delimiter, is resolved once from the raw model definition.
+    Plans are shared by all validations of the model version and must not be changed.
+    """
+    def __init__(self, name, prop_def, list_delimiter):
+        self.name = name
+        self.type = prop_def.get(TYPE)
+        self.is_valid_type = bool(self.type) and self.type in valid_prop_types
+        self.converter = PROP_CONVERTERS.get(self.type)
+        self.minimum = prop_def.get(MIN)
+        self.maximum = prop_def.get(MAX)
+        permissible_values = prop_def.get("permissible_values")
+        self.permissible_values = PermissibleValues(permissible_values) if permissible_values is not None else None
+        self.has_cde_term = bool(prop_def.get(CDE_TERM))
+        self.cde_code, self.cde_version = get_cde_term(prop_def)
+        self.list_delimiter = list_delimiter
+
+
+def build_node_plan(props, list_delimiter):
+    """
+    build validation plans of all properties of a node
+    :param props: property definitions of the node in the model
+    :param list_delimiter: list delimiter of the model
+    :return: dict of property name to PropertyPlan, properties with empty definition are not validated
+    """
+    return {name: PropertyPlan(name, prop_def, list_delimiter) for name, prop_def in props.items() if prop_def}
+
+
+def get_cde_term(prop_def):
+    """
+    get caDSR CDE code and version of a property
+    :param prop_def: property definition in the model
+    :return: tuple of (CDE code, CDE version), (None, None) if the property has no caDSR CDE term
+    """
+    cde_terms = [ct for ct in prop_def.get(CDE_TERM) or [] if 'caDSR' in ct.get('Origin', '')]
+    if cde_terms and len(cde_terms) > 0:
+        return cde_terms[0].get(TERM_CODE), cde_terms[0].get(TERM_VERSION)
+    return None, None
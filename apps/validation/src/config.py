@@ -5,10 +5,13 @@ from common.constants import MONGO_DB, SQS_NAME, DB, MODEL_FILE_DIR, SERVICE_TYP
     LOADER_QUEUE, SERVICE_TYPE, SERVICE_TYPE_ESSENTIAL, SERVICE_TYPE_FILE, SERVICE_TYPE_METADATA, \
     SERVICE_TYPES, DB, FILE_QUEUE, METADATA_QUEUE, TIER, TIER_CONFIG, SERVICE_TYPE_EXPORT, EXPORTER_QUEUE,\
     DM_BUCKET_CONFIG_NAME, PROD_BUCKET_CONFIG_NAME, DATASYNC_ROLE_ARN_CONFIG , DATASYNC_ROLE_ARN_ENV, CONFIG_TYPE, \
-    CONFIG_KEY, CDE_API_URL, SYNONYM_API_URL, DATASYNC_LOG_ARN_ENV, DATASYNC_LOG_ARN_CONFIG
+    CONFIG_KEY, CDE_API_URL, SYNONYM_API_URL, DATASYNC_LOG_ARN_ENV, DATASYNC_LOG_ARN_CONFIG, \
+    BULK_WRITE_BATCH_SIZE, BULK_WRITE_BATCH_BYTES, BULK_WRITE_WORKERS, TSV_PARSING_ENGINE
 from bento.common.utils import get_logger
 from common.utils import clean_up_key_value, get_exception_msg, load_message_config
 from common.mongo_dao import MongoDao
+from common.bulk_writer import DEFAULT_BULK_WRITE_BATCH_SIZE, DEFAULT_BULK_WRITE_BATCH_BYTES, DEFAULT_BULK_WRITE_WORKERS
+from common.tsv_parser import TSV_ENGINES, TSV_ENGINE_PYARROW, pa
 DM_BUCKET_NAME_ENV = "DM_BUCKET_NAME"
 
 class Config():
@@ -56,6 +59,12 @@ class Config():
         if service_type is None or service_type not in SERVICE_TYPES:
             self.log.critical(f'Service type is required and must be "essential", "file" or "metadata" or "export"!')
             return False
+        tsv_engine = self.data.get(TSV_PARSING_ENGINE)
+        if tsv_engine is not None and tsv_engine not in TSV_ENGINES:
+            self.log.critical(f'{TSV_PARSING_ENGINE} must be "pyarrow" or "pandas"!')
+            return False
+        if service_type == SERVICE_TYPE_ESSENTIAL and (tsv_engine or TSV_ENGINE_PYARROW) == TSV_ENGINE_PYARROW and pa is None:
+            self.log.warning(f'pyarrow is not installed, metadata files are parsed by pandas!')
         
         db_server = self.data.get("server", os.environ.get("MONGO_DB_HOST"))
         db_port = self.data.get("port", os.environ.get("MONGO_DB_PORT"))
@@ -69,7 +78,10 @@ class Config():
         else:
             self.data[DB] = db_name
             self.data[MONGO_DB] = f"mongodb://{db_user_id}:{db_user_password}@{db_server}:{db_port}/?authMechanism=DEFAULT"
-            self.mongodb_dao =  MongoDao(self.data[MONGO_DB], db_name)
+            self.mongodb_dao =  MongoDao(self.data[MONGO_DB], db_name,
+                int(self.data.get(BULK_WRITE_BATCH_SIZE) or DEFAULT_BULK_WRITE_BATCH_SIZE),
+                int(self.data.get(BULK_WRITE_BATCH_BYTES) or DEFAULT_BULK_WRITE_BATCH_BYTES),
+                int(self.data.get(BULK_WRITE_WORKERS) or DEFAULT_BULK_WRITE_WORKERS))
         
         models_loc= self.data.get(MODEL_FILE_DIR)
         if models_loc is None and self.data[SERVICE_TYPE] not in [SERVICE_TYPE_FILE, SERVICE_TYPE_PV_PULLER]:
@@ -3,7 +3,9 @@ import os
 import pandas as pd
 import numpy as np
 from bento.common.utils import get_logger
-from common.utils import get_uuid_str, current_datetime, removeTailingEmptyColumnsAndRows
+from common.utils import get_uuid_str, current_datetime
+from common.tsv_parser import parse_tsv
+from common.crdc_id_resolver import CrdcIdResolver
 from common.constants import TYPE, ID, SUBMISSION_ID, STATUS, STATUS_NEW, NODE_ID, \
     ERRORS, WARNINGS, CREATED_AT, UPDATED_AT, S3_FILE_INFO, FILE_NAME, \
     MD5, SIZE, PARENT_TYPE, DATA_COMMON_NAME, QC_RESULT_ID, BATCH_IDS, \
@@ -11,9 +13,6 @@ from common.constants import TYPE, ID, SUBMISSION_ID, STATUS, STATUS_NEW, NODE_I
     ORIN_FILE_NAME, ADDITION_ERRORS, RAW_DATA, DCF_PREFIX, ID_FIELD, ORCID, ENTITY_TYPE, STUDY_ID, \
     DISPLAY_ID, UPLOADED_DATE, LATEST_BATCH_ID, LATEST_BATCH_DISPLAY_ID
 
-SEPARATOR_CHAR = '\t'
-UTF8_ENCODE ='utf8'
-
 PRINCIPAL_INVESTIGATOR = "principal_investigator"
 
 
@@ -32,99 +31,31 @@ class DataLoader:
         self.main_nodes = self.model.get_main_nodes()
         self.errors = None
         self.submission = submission
+        self.crdc_id_resolver = CrdcIdResolver(mongo_dao, data_common, model)
+        self.pi_crdc_id = None
 
     """
     param: file_path_list downloaded from s3 bucket
+    param: parsed_files, optional dict of file path to the file already parsed by the essential validation
+    param: streamed_files, optional list of StreamedTsv validated by the essential validation, loaded chunk by chunk
     """
-    def load_data(self, file_path_list):
+    def load_data(self, file_path_list, parsed_files=None, streamed_files=None):
         returnVal = True
         self.errors = []
-        file_types = [k for (k,v) in self.file_nodes.items()]
-        main_node_types = [k for (k,v) in self.main_nodes.items()]
 
         for file in file_path_list:
             records = []
-            failed_at = 1
+            df = None
             file_name = os.path.basename(file)
             # 1. read file to dataframe
             if not os.path.isfile(file):
                 self.errors.append(f"File does not exist, {file}")
                 continue
             try:
-                df = pd.read_csv(file, sep=SEPARATOR_CHAR, header=0, dtype='str', encoding=UTF8_ENCODE,keep_default_na=False,na_values=[''])
-                df = (df.rename(columns=lambda x: x.strip())).apply(lambda x: x.str.strip() if x.dtype == 'object' else x) # stripe white space.
-                df = removeTailingEmptyColumnsAndRows(df)
-                df = df.replace({np.nan: None})  # replace Nan in dataframe with None
-                df = df.reset_index()  # make sure indexes pair with number of rows
-                col_names =list(df.columns)
-
-                for index, row in df.iterrows():
-                    type = row[TYPE]
-                    node_id = self.get_node_id(type, row)
-                    exist_node = self.mongo_dao.get_dataRecord_by_node(node_id, type, self.batch[SUBMISSION_ID])
-                    # add logic to delete QC record if exist_node
-                    if exist_node and exist_node.get(QC_RESULT_ID): 
-                        self.mongo_dao.delete_qcRecord(exist_node[QC_RESULT_ID])
-                        exist_node[QC_RESULT_ID] = None
-                        s3FileInfo = exist_node.get(S3_FILE_INFO)
-                        if s3FileInfo:
-                            s3FileInfo[QC_RESULT_ID] = None
-                    # 2. construct dataRecord
-                    rawData = df.loc[index].to_dict()
-                    if rawData.get('index') is not None:
-                        del rawData['index'] #remove index column
-                    relation_fields = [name for name in col_names if '.' in name]
-                    prop_names = [name for name in col_names if not name in [TYPE, 'index'] + relation_fields]
-                    batchIds = [self.batch[ID]] if not exist_node else  exist_node[BATCH_IDS] + [self.batch[ID]]
-                    current_date_time = current_datetime()
-                    id = self.get_record_id(exist_node)
-                    # onlu generating CRDC ID for valid nodes
-                    valid_crdc_id_nodes = type in main_node_types
-                    crdc_id = self.get_crdc_id(exist_node, type, node_id, self.submission.get(STUDY_ID)) if valid_crdc_id_nodes else None
-                    # file nodes
-                    if valid_crdc_id_nodes and type in file_types:
-                        id_field = self.file_nodes.get(type, {}).get(ID_FIELD)
-                        file_id_val = row.get(id_field)
-                        if file_id_val:
-                            crdc_id = file_id_val if file_id_val.startswith(DCF_PREFIX) else DCF_PREFIX + file_id_val
-                    # principal investigator node
-                    if type == PRINCIPAL_INVESTIGATOR and PRINCIPAL_INVESTIGATOR in main_node_types:
-                        submission = self.mongo_dao.get_submission(self.batch[SUBMISSION_ID])
-                        crdc_id = submission.get(ORCID) if submission and submission.get(ORCID) else None
-
-                    if index == 0 or not self.process_m2m_rel(records, node_id, rawData, relation_fields):
-                        dataRecord = {
-                            ID: id,
-                            SUBMISSION_ID: self.batch[SUBMISSION_ID],
-                            DATA_COMMON_NAME: self.data_common,
-                            BATCH_IDS: batchIds,
-                            LATEST_BATCH_ID: self.batch[ID],
-                            LATEST_BATCH_DISPLAY_ID: self.batch.get(DISPLAY_ID),
-                            UPLOADED_DATE: current_date_time, 
-                            STATUS: STATUS_NEW,
-                            ERRORS: [],
-                            WARNINGS: [],
-                            CREATED_AT : current_date_time if not exist_node else exist_node[CREATED_AT], 
-                            UPDATED_AT: current_date_time, 
-                            ORIN_FILE_NAME: file_name,
-                            "lineNumber":  index + 2,
-                            NODE_TYPE: type,
-                            NODE_ID: node_id,
-                            "IDPropName": self.model.get_node_id(type),
-                            PROPERTIES: {k: v for (k, v) in rawData.items() if k in prop_names},
-                            PARENTS: self.get_parents(relation_fields, row),
-                            RAW_DATA:  rawData,
-                            ADDITION_ERRORS: [],
-                            ENTITY_TYPE: self.model.get_entity_type(type), 
-                            STUDY_ID: self.submission.get(STUDY_ID)
-                        }
-                        if crdc_id:
-                            dataRecord["CRDC_ID"] = crdc_id
-                        if type in file_types:
-                            dataRecord[S3_FILE_INFO] = self.get_file_info(type, prop_names, row)
-                        records.append(dataRecord)
-                    failed_at += 1
-
+                parsed_file = parsed_files.get(file) if parsed_files else None
+                df = (parsed_file or parse_tsv(file)).get_loading_frame()
+                # 2. construct dataRecords
+                records = self.build_records(df, file_name)
                 # 3-1. upsert data in a tsv file into mongo DB
                 result, error = self.mongo_dao.update_data_records(records)
                 if error:
@@ -142,31 +73,146 @@ class DataLoader:
                 del df
                 del records
 
+        for streamed_file in streamed_files or []:
+            file_name = streamed_file.file_name
+            try:
+                # rows of nodes in more than one row are merged until the whole file is read
+                multi_row_records = dict.fromkeys(streamed_file.multi_row_ids)
+                for chunk in streamed_file.read_chunks():
+                    df = chunk.df[chunk.df.index < streamed_file.loading_row_count][streamed_file.loading_columns]
+                    if len(df.index) == 0:
+                        continue
+                    records = self.build_records(df, file_name, int(df.index[0]), multi_row_records)
+                    # 3-2. upsert data in a chunk into mongo DB
+                    result, error = self.mongo_dao.update_data_records(records)
+                    if error:
+                        self.errors.append(f'“{file_name}”: updating metadata failed - database error.  Please try again and contact the helpdesk if this error persists.')
+                    returnVal = returnVal and result
+                records = (node_record[0] for node_record in multi_row_records.values() if node_record)
+                result, error = self.mongo_dao.update_data_records(records)
+                if error:
+                    self.errors.append(f'“{file_name}”: updating metadata failed - database error.  Please try again and contact the helpdesk if this error persists.')
+                returnVal = returnVal and result
+
+            except Exception as e:
+                    self.log.exception(e)
+                    upload_type =  "Add/Update"
+                    msg = f'“{file_name}”: {upload_type} metadata failed with internal error.  Please try again and contact the helpdesk if this error persists.'
+                    self.log.exception(msg)
+                    self.errors.append(msg)
+                    return False, self.errors
+
         del file_path_list
         return returnVal, self.errors
+
+    """
+    construct dataRecords of rows in a dataframe, rows of a node in more than one row are merged into one dataRecord.
+    The columns are partitioned, and node IDs and parents are read from the columns once for the dataframe.
+    param: row_offset, index of the first row of the dataframe in the file
+    param: multi_row_records, optional dict of node ID to a tuple of its dataRecord and parent keys, or None before its first row,
+    for nodes in more than one row of a streamed file. The dataRecords are kept in the dict until the whole file is read,
+    otherwise they are generated after the other dataRecords.
+    return: generator of dataRecords
+    """
+    def build_records(self, df, file_name, row_offset=0, multi_row_records=None):
+        file_types = [k for (k,v) in self.file_nodes.items()]
+        main_node_types = [k for (k,v) in self.main_nodes.items()]
+        df = df.replace({np.nan: None})  # replace Nan in dataframe with None
+        col_names = list(df.columns)
+        relation_fields = [name for name in col_names if '.' in name]
+        prop_names = [name for name in col_names if not name in [TYPE] + relation_fields]
+        rows = df.to_dict('records')
+        types = df[TYPE].tolist()
+        id_fields = {type: self.model.get_node_id(type) for type in set(types)}
+        node_ids = [row[id_fields[type]] if id_fields[type] else None for type, row in zip(types, rows)]
+        parents_list = self.get_parents_column(df, relation_fields)
+        exist_nodes = self.get_exist_nodes(types, node_ids)
+        study_id = self.submission.get(STUDY_ID)
+        crdc_ids = self.get_crdc_ids(types, node_ids, exist_nodes, main_node_types, study_id)
+        flush_multi_row_records = multi_row_records is None
+        if flush_multi_row_records:
+            is_multi_row = pd.Series(node_ids, dtype=object).duplicated(keep=False).tolist()
+            multi_row_records = dict.fromkeys(node_id for node_id, multi_row in zip(node_ids, is_multi_row) if multi_row)
+        current_date_time = current_datetime()
+
+        for index, (rawData, type, node_id, parents) in enumerate(zip(rows, types, node_ids, parents_list)):
+            is_multi_row = node_id in multi_row_records
+            node_record = multi_row_records.get(node_id)
+            if node_record:
+                self.process_m2m_rel(node_record[0], parents, node_record[1])
+                continue
+            exist_node = exist_nodes.get((type, node_id))
+            batchIds = [self.batch[ID]] if not exist_node else  exist_node[BATCH_IDS] + [self.batch[ID]]
+            id = self.get_record_id(exist_node)
+            # onlu generating CRDC ID for valid nodes
+            valid_crdc_id_nodes = type in main_node_types
+            crdc_id = (exist_node.get(CRDC_ID) if exist_node else crdc_ids[type][node_id]) if valid_crdc_id_nodes else None
+            # file nodes
+            if valid_crdc_id_nodes and type in file_types:
+                id_field = self.file_nodes.get(type, {}).get(ID_FIELD)
+                file_id_val = rawData.get(id_field)
+                if file_id_val:
+                    crdc_id = file_id_val if file_id_val.startswith(DCF_PREFIX) else DCF_PREFIX + file_id_val
+            # principal investigator node
+            if type == PRINCIPAL_INVESTIGATOR and PRINCIPAL_INVESTIGATOR in main_node_types:
+                crdc_id = self.get_pi_crdc_id()
+
+            dataRecord = {
+                ID: id,
+                SUBMISSION_ID: self.batch[SUBMISSION_ID],
+                DATA_COMMON_NAME: self.data_common,
+                BATCH_IDS: batchIds,
+                LATEST_BATCH_ID: self.batch[ID],
+                LATEST_BATCH_DISPLAY_ID: self.batch.get(DISPLAY_ID),
+                UPLOADED_DATE: current_date_time, 
+                STATUS: STATUS_NEW,
+                ERRORS: [],
+                WARNINGS: [],
+                CREATED_AT : current_date_time if not exist_node else exist_node[CREATED_AT], 
+                UPDATED_AT: current_date_time, 
+                ORIN_FILE_NAME: file_name,
+                "lineNumber":  index + row_offset + 2,
+                NODE_TYPE: type,
+                NODE_ID: node_id,
+                "IDPropName": id_fields[type],
+                PROPERTIES: {k: rawData[k] for k in prop_names},
+                PARENTS: parents,
+                RAW_DATA:  rawData,
+                ADDITION_ERRORS: [],
+                ENTITY_TYPE: self.model.get_entity_type(type), 
+                STUDY_ID: study_id
+            }
+            if crdc_id:
+                dataRecord["CRDC_ID"] = crdc_id
+            if type in file_types:
+                dataRecord[S3_FILE_INFO] = self.get_file_info(type, prop_names, rawData, current_date_time)
+            if is_multi_row:
+                multi_row_records[node_id] = (dataRecord, {get_parent_key(parent) for parent in parents})
+            else:
+                yield dataRecord
+
+        if flush_multi_row_records:
+            for node_record in multi_row_records.values():
+                yield node_record[0]
+
     """
     process_m2m_rel
-     1) check if a node with the same nodeID exists in record list. 
-     2) check if current row has many to many relationship by comparing with parents property of the existing node.
-     3) update the parents property of the existing node in record list.
-    """
-    def process_m2m_rel(self, records, node_id, row, relation_fields):
-        existed_node = next((record for record in records if record[NODE_ID] == node_id), None)
-        if not existed_node:
-            return False
-        else:
-            parents = self.get_parents(relation_fields, row)
-            if len(parents) == 0:
-                return True
-            existed_parents = existed_node.get(PARENTS)
-            if not existed_parents or len(existed_parents) == 0:
-                existed_node[PARENTS] = parents
-                return True
-            for parent in parents:
-                if not any( p.get(PARENT_TYPE) == parent.get(PARENT_TYPE) and p.get("parentIDPropName") ==  parent.get("parentIDPropName") \
-                           and p.get("parentIDValue") ==  parent.get("parentIDValue")  for p in existed_parents):
-                    existed_node[PARENTS].append(parent)
-            return True
+     merge parents of a row with many to many relationship into the dataRecord of the node from its previous rows.
+     parents not in the dataRecord yet are appended in order, looked up by parent keys of the dataRecord.
+    param: parent_keys, set of parent keys of the dataRecord, updated with the merged parents
+    """
+    def process_m2m_rel(self, existed_node, parents, parent_keys):
+        if len(parents) == 0:
+            return
+        if not existed_node.get(PARENTS):
+            existed_node[PARENTS] = parents
+            parent_keys.update(get_parent_key(parent) for parent in parents)
+            return
+        for parent in parents:
+            key = get_parent_key(parent)
+            if key not in parent_keys:
+                parent_keys.add(key)
+                existed_node[PARENTS].append(parent)
     
     """
     get node id 
@@ -175,29 +221,25 @@ class DataLoader:
         return node[ID] if node else get_uuid_str()
 
     """
-    get node crdc id
-    """
-    def get_crdc_id(self, exist_node, node_type, node_id, studyID):
-        crdc_id = None
-        if not exist_node: 
-            # find existing crdc_id by datacommon, nodeType and nodeID
-            if self.data_common and node_type and node_id:
-                result = self.mongo_dao.search_node(self.data_common, node_type, node_id)
-                crdc_id = result.get(CRDC_ID) if result else None
-            if not crdc_id:
-                entity_type = self.model.get_entity_type(node_type)
-                if studyID and node_id and entity_type:
-                    result = self.mongo_dao.search_node_by_study(studyID, entity_type, node_id)
-                    crdc_id = result.get(CRDC_ID) if result else None
-            # if the crdc_id can't be identified from the existing dataset, a new crdc_id should be generated.
-            if not crdc_id:
-                crdc_id = get_uuid_str()
-
-        else:
-            crdc_id = exist_node.get(CRDC_ID)
-        return crdc_id
-        
-    
+    get crdc ids of new nodes of main node types in a dataframe, resolved in bulk by node type
+    return: dict of node type to dict of node ID to crdc id
+    """
+    def get_crdc_ids(self, types, node_ids, exist_nodes, main_node_types, study_id):
+        new_nodes = {}
+        for type, node_id in zip(types, node_ids):
+            if type in main_node_types and (type, node_id) not in exist_nodes:
+                new_nodes.setdefault(type, set()).add(node_id)
+        return {type: self.crdc_id_resolver.resolve(type, ids, study_id) for type, ids in new_nodes.items()}
+
+    """
+    get crdc id of principal investigator nodes, the ORCID of the submission
+    """
+    def get_pi_crdc_id(self):
+        if self.pi_crdc_id is None:
+            submission = self.mongo_dao.get_submission(self.batch[SUBMISSION_ID])
+            self.pi_crdc_id = submission.get(ORCID) if submission and submission.get(ORCID) else False
+        return self.pi_crdc_id or None
+
     """
     get node id defined in model dict
     """
@@ -206,28 +248,47 @@ class DataLoader:
         return row[id_field] if id_field else None
     
     """
-    get parents based on relationship fields that in format of
+    get existing dataRecords of nodes in a dataframe by node type and node ID, with one query per node type,
+    QC records of the existing nodes are deleted in bulk.
+    """
+    def get_exist_nodes(self, types, node_ids):
+        node_keys = {}
+        for type, node_id in zip(types, node_ids):
+            if node_id is not None:
+                node_keys.setdefault(type, set()).add(node_id)
+        exist_nodes = {}
+        for type, ids in node_keys.items():
+            records = self.mongo_dao.get_dataRecords_by_nodes(self.batch[SUBMISSION_ID], type, ids)
+            if records is None:
+                raise Exception(f'Failed to retrieve existing "{type}" nodes.')
+            exist_nodes.update({(type, record[NODE_ID]): record for record in records})
+        qc_ids = [record[QC_RESULT_ID] for record in exist_nodes.values() if record.get(QC_RESULT_ID)]
+        if qc_ids:
+            self.mongo_dao.delete_qcRecords(qc_ids)
+        return exist_nodes
+
+    """
+    get parents of each row of a dataframe based on relationship fields that in format of
     [parent node].parentNodeID
     """
-    def get_parents(self, relation_fields, rawData):
-        parents = []
+    def get_parents_column(self, df, relation_fields):
+        parents_list = [[] for _ in range(len(df.index))]
         for relation in relation_fields:
-            val = rawData.get(relation)
-            if val:
-                temp = relation.split('.')
-                parents.append({"parentType": temp[0], "parentIDPropName": temp[1], "parentIDValue": val})
-                rawData.update({relation.replace(".", "|"): val})
-        return parents
-    
+            temp = relation.split('.')
+            for parents, val in zip(parents_list, df[relation].tolist()):
+                if val:
+                    parents.append({"parentType": temp[0], "parentIDPropName": temp[1], "parentIDValue": val})
+        return parents_list
+
     """
     get file information by a file node type
     """
-    def get_file_info(self, type, prop_names, row):
+    def get_file_info(self, type, prop_names, row, current_date_time=None):
         file_fields = self.file_nodes.get(type)
         file_name = row[file_fields[FILE_NAME_FIELD]] if file_fields[FILE_NAME_FIELD] in prop_names else None
         file_size = row[file_fields[FILE_SIZE_FIELD]] if file_fields[FILE_SIZE_FIELD] in prop_names else None
         file_md5 = row[file_fields[FILE_MD5_FIELD]] if file_fields[FILE_MD5_FIELD] in prop_names else None
-        current_date_time = current_datetime()
+        current_date_time = current_date_time or current_datetime()
         return {
             FILE_NAME: file_name,
             SIZE: file_size,
@@ -237,4 +298,8 @@ class DataLoader:
             WARNINGS: [],
             CREATED_AT: current_date_time, 
             UPDATED_AT: current_date_time
-        }
\ No newline at end of file
+        }
+
+
+def get_parent_key(parent):
+    return parent.get(PARENT_TYPE), parent.get("parentIDPropName"), parent.get("parentIDValue")
@@ -4,6 +4,9 @@ import numpy as np
 import re
 import json
 import os
+from collections import deque
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
 from botocore.exceptions import ClientError
 from bento.common.sqs import VisibilityExtender
 from bento.common.utils import get_logger
@@ -12,16 +15,19 @@ from common.constants import STATUS, BATCH_TYPE_METADATA, DATA_COMMON_NAME, ROOT
     ERRORS, S3_DOWNLOAD_DIR, SQS_NAME, BATCH_ID, BATCH_STATUS_UPLOADED, SQS_TYPE, TYPE_LOAD, STATUS_PASSED,\
     BATCH_STATUS_FAILED, ID, FILE_NAME, TYPE, FILE_PREFIX, MODEL_VERSION, MODEL_FILE_DIR, \
     TIER_CONFIG, STATUS_ERROR, STATUS_NEW, SERVICE_TYPE_ESSENTIAL, SUBMISSION_ID, SUBMISSION_INTENTION_DELETE, NODE_TYPE, \
-    SUBMISSION_INTENTION, TYPE_DELETE, BATCH_BUCKET, METADATA_VALIDATION_STATUS, STATUS_WARNING
+    SUBMISSION_INTENTION, TYPE_DELETE, BATCH_BUCKET, METADATA_VALIDATION_STATUS, STATUS_WARNING, STREAM_MIN_FILE_SIZE, \
+    STREAM_CHUNK_ROWS, METADATA_DOWNLOAD_WORKERS, TSV_PARSING_ENGINE
 from common.utils import cleanup_s3_download_dir, get_exception_msg, dump_dict_to_json, removeTailingEmptyColumnsAndRows
+from common.tsv_parser import parse_tsv, TSV_ENGINE_PYARROW
+from common.tsv_stream import StreamedTsv, RowKeyIndex, DEFAULT_STREAM_CHUNK_ROWS, trim_tailing_columns
+from common.s3_utils import S3Service
 from common.model_store import ModelFactory
 from metadata_remover import MetadataRemover
 from data_loader import DataLoader
 from service.ecs_agent import set_scale_in_protection
 
 VISIBILITY_TIMEOUT = 20
-SEPARATOR_CHAR = '\t'
-UTF8_ENCODE ='utf8'
+DEFAULT_DOWNLOAD_WORKERS = 4
 
 """
 Interface for essential validation of metadata via SQS
@@ -77,13 +83,13 @@ def essentialValidate(configs, job_queue, mongo_dao):
                             msg.delete()
                             continue
                         #2. validate batch and files.
-                        validator = EssentialValidator(mongo_dao, model_store)
+                        validator = EssentialValidator(mongo_dao, model_store, configs)
                         try:
                             result = validator.validate(batch)
-                            if result and validator.download_file_list and len(validator.download_file_list) > 0:
+                            if result and (validator.download_file_list or validator.streamed_files):
                                 #3. call mongo_dao to load data
                                 data_loader = DataLoader(validator.model, batch, mongo_dao, validator.bucket, validator.root_path, validator.datacommon, validator.submission)
-                                result, errors = data_loader.load_data(validator.download_file_list)
+                                result, errors = data_loader.load_data(validator.download_file_list, validator.parsed_files, validator.streamed_files)
                                 if result:
                                     batch[STATUS] = BATCH_STATUS_UPLOADED
                                     submission_meta_status = STATUS_NEW
@@ -161,7 +167,7 @@ When metadata intention is "New", all IDs must not exist in the database or curr
 """
 class EssentialValidator:
     
-    def __init__(self, mongo_dao, model_store):
+    def __init__(self, mongo_dao, model_store, configs=None):
         self.fileList = [] #list of files object {file_name, file_path, file_size, invalid_reason}
         self.log = get_logger('Essential Validator')
         self.mongo_dao = mongo_dao
@@ -172,6 +178,17 @@ class EssentialValidator:
         self.submission_id = None
         self.root_path = None
         self.download_file_list = None
+        # parsed metadata files by download path, handed to the data loader so each file is parsed once
+        self.parsed_files = {}
+        # metadata files of at least the configured size are streamed from s3 in chunks instead of downloaded
+        self.stream_min_size = int(configs.get(STREAM_MIN_FILE_SIZE) or 0) if configs else 0
+        self.stream_chunk_rows = int(configs.get(STREAM_CHUNK_ROWS) or DEFAULT_STREAM_CHUNK_ROWS) if configs else DEFAULT_STREAM_CHUNK_ROWS
+        # metadata files of a batch are downloaded and parsed by a pool of threads while the files read before are validated
+        self.download_workers = int(configs.get(METADATA_DOWNLOAD_WORKERS) or DEFAULT_DOWNLOAD_WORKERS) if configs else DEFAULT_DOWNLOAD_WORKERS
+        # engine parsing downloaded metadata files, "pyarrow" or "pandas"
+        self.tsv_engine = (configs.get(TSV_PARSING_ENGINE) or TSV_ENGINE_PYARROW) if configs else TSV_ENGINE_PYARROW
+        self.s3_service = None
+        self.streamed_files = []
         self.bucket = None
         self.batch = None
         self.def_file_nodes = None
@@ -183,16 +200,28 @@ class EssentialValidator:
             return False
         self.def_file_nodes = self.model.get_file_nodes()
         self.def_file_name = self.model.get_file_name()
+        if not self.s3_service:
+            self.s3_service = S3Service()
         try:
-            for file_info in self.file_info_list: 
-                #1. download the file in s3 and load tsv file into dataframe
-                if not self.download_file(file_info):
-                    file_info[STATUS] = STATUS_ERROR
-                    # return False
-                    continue
-                #2. validate meatadata in self.df
-                if not self.validate_data(file_info):
-                    file_info[STATUS] = STATUS_ERROR
+            workers = max(1, self.download_workers)
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                #1. download the files in s3 and load tsv files into dataframes in the pool,
+                # at most as many files as the workers are read ahead of the validated file, so parsed files are not all buffered
+                pending_files = iter(self.file_info_list)
+                reads = deque((file_info, executor.submit(self.read_file, file_info)) for file_info in islice(pending_files, workers))
+                try:
+                    #2. validate the files in the order of the batch as they are read, so errors of the batch are in the same order
+                    while reads:
+                        file_info, read = reads.popleft()
+                        next_file = next(pending_files, None)
+                        if next_file is not None:
+                            reads.append((next_file, executor.submit(self.read_file, next_file)))
+                        if not self.validate_file(file_info, read):
+                            file_info[STATUS] = STATUS_ERROR
+                finally:
+                    # files not read yet are not downloaded after an internal error
+                    for _, read in reads:
+                        read.cancel()
             return True if len(self.batch[ERRORS]) == 0 else False
         except Exception as e:
             self.log.exception(e)
@@ -250,35 +279,57 @@ class EssentialValidator:
                 return False
             return True
     
-    def download_file(self, file_info):
+    def read_file(self, file_info):
+        """
+        download and parse a metadata file in a worker of the download pool, errors are reported when the file is validated
+        :return: tuple of (found, download path, ParsedTsv), the download path is None if the file is streamed
+        """
+        bucket_name = self.batch.get(BATCH_BUCKET)
         key = os.path.join(self.batch[FILE_PREFIX], file_info[FILE_NAME])
-        # todo set download file 
+        file_size = self.s3_service.get_file_size(bucket_name, key)
+        if file_size is None:
+            return False, None, None
+        # a large file is streamed from s3 and validated chunk by chunk
+        if self.stream_min_size and file_size >= self.stream_min_size:
+            return True, None, None
         download_file = os.path.join(S3_DOWNLOAD_DIR, file_info[FILE_NAME])
-        msg = None
+        self.s3_service.download_file(bucket_name, key, download_file)
+        return True, download_file, parse_tsv(download_file, self.tsv_engine)
+
+    def validate_file(self, file_info, read):
+        """
+        validate a metadata file read by the download pool
+        :param read: Future of read_file
+        """
         try:
-            if not self.bucket.file_exists_on_s3(key):
-                msg = f'Reading metadata file “{file_info[FILE_NAME]}.” failed - file not found.'
-                self.log.exception(msg)
-                file_info[ERRORS] = [msg]
-                self.batch[ERRORS].append(msg)
-                return False
-            self.bucket.download_file(key, download_file)
-            if os.path.isfile(download_file):
-                df = pd.read_csv(download_file, sep=SEPARATOR_CHAR, header=0, dtype='str', encoding=UTF8_ENCODE)
-                self.df = (df.rename(columns=lambda x: x.strip())).apply(lambda x: x.str.strip() if x.dtype == 'object' else x) # stripe white space.
-                self.download_file_list.append(download_file)
-            return True # if no exception
-        except ClientError as ce:
+            found, download_file, parsed_file = read.result()
+        except Exception as e:
             self.df = None
-            self.log.exception(ce)
-            self.log.exception(f"Failed to download file, {file_info[FILE_NAME]}. {get_exception_msg()}.")
-            msg = f'Reading metadata file “{file_info[FILE_NAME]}.” failed - network error. Please try again and contact the helpdesk if this error persists.'
+            return self.report_read_error(file_info, e)
+        if not found:
+            msg = f'Reading metadata file “{file_info[FILE_NAME]}.” failed - file not found.'
+            self.log.error(msg)
             file_info[ERRORS] = [msg]
             self.batch[ERRORS].append(msg)
             return False
-        except pd.errors.ParserError as pe:
-            self.df = None
-            self.log.exception(pe)
+        if not download_file:
+            return self.validate_streamed_file(file_info)
+        self.df = parsed_file.get_validation_frame()
+        self.download_file_list.append(download_file)
+        self.parsed_files[download_file] = parsed_file
+        #3. validate meatadata in self.df
+        return self.validate_data(file_info)
+
+    def report_read_error(self, file_info, e):
+        """
+        report an error of reading a metadata file from s3
+        """
+        if isinstance(e, ClientError):
+            self.log.exception(e)
+            self.log.exception(f"Failed to download file, {file_info[FILE_NAME]}. {get_exception_msg()}.")
+            msg = f'Reading metadata file “{file_info[FILE_NAME]}.” failed - network error. Please try again and contact the helpdesk if this error persists.'
+        elif isinstance(e, pd.errors.ParserError):
+            self.log.exception(e)
             msg = get_exception_msg()
             self.log.exception(f'Invalid metadata file! {msg}.')
             msg = msg.split(":")[-1].strip()
@@ -289,26 +340,165 @@ class EssentialValidator:
                 msg = f'“{file_info[FILE_NAME]}: line {line_number.strip()}": {" ".join(msg.split(" in line " + line_number + ", "))}.'
             else:
                 msg = f'“{file_info[FILE_NAME]}”: {msg}.'
-            file_info[ERRORS] = [msg]
-            self.batch[ERRORS].append(msg)
-            return False
-        except UnicodeDecodeError as ue:
-            self.df = None
-            self.log.exception(ue)
+        elif isinstance(e, UnicodeDecodeError):
+            self.log.exception(e)
             self.log.exception('Invalid metadata file! non UTF-8 character(s) found.')
             msg = f'“{file_info[FILE_NAME]}”: non UTF-8 character(s) found.'
-            file_info[ERRORS] = [msg]
-            self.batch[ERRORS].append(msg)
-            return False
-        except Exception as e:
-            self.df = None
+        else:
             self.log.exception(e)
             self.log.exception('Invalid metadata file! Check debug log for detailed information.')
             msg = f'“{file_info[FILE_NAME]}”: is not a valid TSV file.'
-            file_info[ERRORS] = [msg]
-            self.batch[ERRORS].append(msg)
-            return False
+        file_info[ERRORS] = [msg]
+        self.batch[ERRORS].append(msg)
+        return False
     
+    def validate_streamed_file(self, file_info):
+        """
+        validate a metadata file streamed from s3, the file is handed to the data loader if valid
+        """
+        key = os.path.join(self.batch[FILE_PREFIX], file_info[FILE_NAME])
+        streamed_file = StreamedTsv(self.s3_service, self.batch.get(BATCH_BUCKET), key, file_info[FILE_NAME], self.stream_chunk_rows)
+        row_keys = RowKeyIndex(S3_DOWNLOAD_DIR)
+        try:
+            result = self.validate_stream_data(file_info, streamed_file, row_keys)
+        except (ClientError, pd.errors.ParserError, pd.errors.EmptyDataError, UnicodeDecodeError) as e:
+            return self.report_read_error(file_info, e)
+        finally:
+            row_keys.close()
+        if result:
+            self.streamed_files.append(streamed_file)
+        return result
+
+    def validate_stream_data(self, file_info, streamed_file, row_keys):
+        """
+        validate a metadata file read in chunks with the checks of validate_data.
+        Each chunk is summarized by null counts, empty rows, cells in unnamed columns and the first row of a different type,
+        IDs are kept in the row key index to check duplicated IDs and many-to-many relationships after the whole file is read.
+        """
+        file_info[ERRORS] = [] if not file_info.get(ERRORS) else file_info[ERRORS]
+        type = None
+        id_field = None
+        columns = None
+        total_count = 0
+        # number of rows up to the last row with a value, as the essential validation and the data loader read the file
+        row_count = 0
+        loading_row_count = 0
+        empty_rows = []  # runs of empty rows as [first index, last index]
+        extra_cells = {}
+        type_conflict = None
+        id_null_rows = []
+        file_name_null_rows = []
+        check_duplicates = False
+        for chunk in streamed_file.read_chunks():
+            df = chunk.get_validation_frame()
+            if columns is None:
+                columns = df.columns.tolist()
+                null_counts = np.zeros(len(columns), dtype=int)
+                loading_notna_counts = np.zeros(len(columns), dtype=int)
+                empty_cols = get_empty_columns(columns)
+                rel_props = get_rel_props(columns)
+            is_null = df.isnull()
+            null_counts += is_null.sum().to_numpy()
+            is_empty = is_null.all(1).to_numpy()
+            for index in df.index[is_empty]:
+                if empty_rows and empty_rows[-1][1] == index - 1:
+                    empty_rows[-1][1] = index
+                else:
+                    empty_rows.append([index, index])
+            if not is_empty.all():
+                row_count = df.index[~is_empty][-1] + 1
+            is_loaded = chunk.df.notna()
+            loading_notna_counts += is_loaded.sum().to_numpy()
+            is_loaded = is_loaded.any(axis=1).to_numpy()
+            if is_loaded.any():
+                loading_row_count = chunk.df.index[is_loaded][-1] + 1
+            for col in empty_cols:
+                extra_cells.setdefault(col, []).extend(df[df[col].notna()].index.astype(int).tolist())
+            if len(df.index) == 0 or not TYPE in columns:
+                total_count += len(df.index)
+                continue
+            if total_count == 0:
+                type = df[TYPE].iloc[0]
+                if not pd.isnull(type) and type in self.model.get_node_keys():
+                    id_field = self.model.get_node_id(type)
+                    check_duplicates = self.submission_intention != SUBMISSION_INTENTION_DELETE and id_field in columns
+                    other_props = [col for col in columns if col not in rel_props + [TYPE, id_field]]
+            total_count += len(df.index)
+            if pd.isnull(type):
+                continue
+            if type_conflict is None:
+                type_conflict = get_type_conflict(df, type)
+            if id_field in columns:
+                id_null_rows.extend(df[df[id_field].isnull()].index.astype(int).tolist())
+            if self.submission_intention == SUBMISSION_INTENTION_DELETE and type in self.def_file_nodes and self.def_file_name in columns:
+                file_name_null_rows.extend(df[df[self.def_file_name].isnull()].index.astype(int).tolist())
+            if check_duplicates:
+                rows = df[df[id_field].notna()]
+                rels = [json.dumps(values) for values in rows[rel_props].to_numpy(dtype=object, na_value=None).tolist()]
+                props = pd.util.hash_pandas_object(rows[other_props], index=False).to_numpy().view(np.int64).tolist() if other_props else [0] * len(rows.index)
+                row_keys.add_rows(zip(rows.index.astype(int).tolist(), rows[id_field].tolist(), rels, props))
+
+        # check if there are rows
+        if total_count == 0:
+            self.add_error(file_info, f'“{file_info[FILE_NAME]}": no metadata in the file.')
+            return False
+        # remove tailing empty columns and rows, tailing empty rows have no value in any column
+        notna_counts = {col: total_count - count for col, count in zip(columns, null_counts)}
+        null_counts = {col: count - (total_count - row_count) for col, count in zip(columns, null_counts)}
+        streamed_file.loading_columns = trim_tailing_columns(columns, {col: count for col, count in zip(columns, loading_notna_counts)})
+        streamed_file.loading_row_count = loading_row_count
+        columns = trim_tailing_columns(columns, notna_counts)
+        if row_count == 0:
+            self.add_error(file_info, f'“{file_info[FILE_NAME]}": no metadata in the file.')
+            return False
+
+        self.check_columns(file_info, columns, extra_cells)
+        # check if empty row, tailing empty rows are removed
+        empty_rows = [index for first, last in empty_rows if first < row_count for index in range(first, last + 1)]
+        if not self.check_empty_rows(file_info, empty_rows):
+            return False
+        if not self.check_type(file_info, columns, type, null_counts.get(TYPE, 0), type_conflict):
+            return False
+        if not self.check_id(file_info, columns, id_field, [index for index in id_null_rows if index < row_count]):
+            return False
+        if self.submission_intention != SUBMISSION_INTENTION_DELETE:
+            rel_result = self.check_props(file_info, type, columns, id_field, rel_props)
+            # check duplicate rows with the same nodeID
+            streamed_file.multi_row_ids = row_keys.get_multi_row_ids()
+            if len(streamed_file.multi_row_ids) > 0:
+                if len(rel_props) == 0 or not rel_result:
+                    self.report_duplicated_rows(file_info, id_field, row_keys.get_duplicated_rows())
+                    return False
+                # check many-to-many relationship
+                if not self.check_streamed_m2m_relationship(streamed_file, row_keys, id_field, rel_props, other_props, file_info):
+                    return False
+        elif not self.check_file_name(file_info, type, columns, [index for index in file_name_null_rows if index < row_count]):
+            return False
+
+        return True if len(self.batch[ERRORS]) == 0 else False
+
+    def check_streamed_m2m_relationship(self, streamed_file, row_keys, id_field, rel_props, other_props, file_info):
+        """
+        validate many to many relationship with the row key index of a streamed file,
+        values of other properties are read again from the file only for rows of IDs with different hashes of the values.
+        """
+        lines, ids, rels, props = zip(*row_keys.get_duplicated_row_keys())
+        rows = pd.DataFrame([json.loads(values) for values in rels], index=lines, columns=rel_props)
+        rows.insert(0, id_field, ids)
+        is_conflict = pd.Series(props, index=rows.index).groupby(rows[id_field]).transform("nunique").gt(1)
+        conflict_lines = rows.index[is_conflict.to_numpy()]
+        values = pd.DataFrame(columns=other_props)
+        if len(conflict_lines) > 0:
+            values = pd.concat([df[df.index.isin(conflict_lines)][other_props]
+                                for df in (chunk.get_validation_frame() for chunk in streamed_file.read_chunks())])
+        prop_rows = rows.loc[conflict_lines, [id_field]].join(values)
+        return self.check_m2m_rows(file_info, list(row_keys.get_repeated_ids()), id_field, rows, rel_props, prop_rows, other_props)
+
+    def add_error(self, file_info, msg):
+        self.log.error(msg)
+        file_info[ERRORS].append(msg)
+        self.batch[ERRORS].append(msg)
+
     def validate_data(self, file_info):
         """
         Metadata files must have a "type" column
@@ -316,16 +506,11 @@ class EssentialValidator:
         Each row in a metadata file must have same number of columns as the header row
         When metadata intention is "New", all IDs must not exist in the database
         """
-        msg = None
-        type= None
         file_info[ERRORS] = [] if not file_info.get(ERRORS) else file_info[ERRORS] 
         
         # check if there are rows
         if len(self.df.index) == 0:
-            msg = f'“{file_info[FILE_NAME]}": no metadata in the file.'
-            self.log.error(msg)
-            file_info[ERRORS].append(msg)
-            self.batch[ERRORS].append(msg)
+            self.add_error(file_info, f'“{file_info[FILE_NAME]}": no metadata in the file.')
             return False
         
         # remove tailing empty columns and rows
@@ -333,199 +518,192 @@ class EssentialValidator:
 
         # check if there are rows after trimmed empty rows
         if len(self.df.index) == 0:
-            msg = f'“{file_info[FILE_NAME]}": no metadata in the file.'
-            self.log.error(msg)
-            file_info[ERRORS].append(msg)
-            self.batch[ERRORS].append(msg)
+            self.add_error(file_info, f'“{file_info[FILE_NAME]}": no metadata in the file.')
             return False 
         
-        # Each row in a metadata file must have same number of columns as the header row
         # dataframe will set the column name to "Unnamed: {index}" when parsing a tsv file with empty header.
         columns = self.df.columns.tolist()
-        empty_cols = [col for col in columns if not col or "Unnamed:" in col ]
-        if empty_cols and len(empty_cols) > 0:
-            for col in empty_cols:
-                extra_cell_list = self.df[self.df[col].notna()].index.astype(int).tolist()
-                if extra_cell_list and len(extra_cell_list):
-                    for index in extra_cell_list: 
-                        msg = f'“{file_info[FILE_NAME]}: line {index + 2}": extra columns/cells found.'
-                        self.log.error(msg)
-                        file_info[ERRORS].append(msg)
-                        self.batch[ERRORS].append(msg)
-                else:
-                    msg = f'“{file_info[FILE_NAME]}": empty column(s) found.'
-                    self.log.error(msg)
-                    file_info[ERRORS].append(msg)
-                    self.batch[ERRORS].append(msg)
-                    break
-
-        # check duplicate columns.
-        for col in columns:
-            if ".1" in col and col.replace(".1", "") in columns:
-                msg = f'“{file_info[FILE_NAME]}": multiple columns with the same header ("{col.replace(".1", "")}") is not allowed.'
-                self.log.error(msg)
-                file_info[ERRORS].append(msg)
-                self.batch[ERRORS].append(msg)
+        extra_cells = {col: self.df[self.df[col].notna()].index.astype(int).tolist() for col in get_empty_columns(columns)}
+        self.check_columns(file_info, columns, extra_cells)
 
         # check if empty row.
-        idx = self.df.index[self.df.isnull().all(1)]
-        if not idx.empty: 
-            for index in idx:
-                msg = f'“{file_info[FILE_NAME]}: line {index + 2}": empty row found.'
-                self.log.error(msg)
-                file_info[ERRORS].append(msg)
-                self.batch[ERRORS].append(msg)
+        if not self.check_empty_rows(file_info, self.df.index[self.df.isnull().all(1)]):
             return False
-        
-        # check if missing "type" column
-        if not TYPE in columns:
-            msg = f'“{file_info[FILE_NAME]}”: “type” column is required.'
-            self.log.error(msg)
-            file_info[ERRORS].append(msg)
-            self.batch[ERRORS].append(msg)
-            file_info[NODE_TYPE] = ""
+
+        null_counts = self.df.isnull().sum()
+        type = self.df[TYPE].iloc[0] if TYPE in columns else None
+        type_conflict = get_type_conflict(self.df, type) if TYPE in columns else None
+        if not self.check_type(file_info, columns, type, null_counts.get(TYPE, 0), type_conflict):
             return False
-        else: 
-            type = self.df[TYPE].iloc[0]
-            file_info[NODE_TYPE] = type if not pd.isnull(type) else ""
-            nan_count = self.df.isnull().sum()[TYPE] #check if any rows with empty node type
-            if nan_count > 0: 
-                msg = f'“{file_info[FILE_NAME]}”: “type” value is required'
-                self.log.error(msg)
-                file_info[ERRORS].append(msg)
-                self.batch[ERRORS].append(msg)
-                return False
-            else:
-                node_types = self.model.get_node_keys()
-                line_num = 2
-                if type not in node_types:
-                    msg = f'“{file_info[FILE_NAME]}: {line_num}": Node type “{type}” is not defined.'
-                    self.log.error(msg)
-                    file_info[ERRORS].append(msg)
-                    self.batch[ERRORS].append(msg)
-                    return False
-                
-                types = self.df[TYPE].tolist() 
-                unique_types = set(types)
-                if len(unique_types) > 1: # check if all type values are the same
-                    for node_type in self.df[TYPE]:
-                        if type != node_type:
-                            msg = f'“{file_info[FILE_NAME]}: {line_num}": Node type “{node_type}” is different from "{type}", only one node type is allowed.'
-                            self.log.error(msg)
-                            file_info[ERRORS].append(msg)
-                            self.batch[ERRORS].append(msg)
-                            return False
-                        line_num += 1
 
         id_field = self.model.get_node_id(type)
-        # check if missing id property
-        if id_field and not id_field in columns: 
-            msg = f'“{file_info[FILE_NAME]}”: Key property “{id_field}” is required.'
-            self.log.error(msg)
-            file_info[ERRORS].append(msg)
-            self.batch[ERRORS].append(msg)
-            return False
-        #check if id property value is empty
-        nan_count = self.df.isnull().sum()[id_field]
-        if nan_count > 0: 
-            nan_rows = self.df[self.df[id_field].isnull()].to_dict("index")
-            for key in nan_rows.keys():
-                msg = f'“{file_info[FILE_NAME]}:{key + 2}”:  Key property “{id_field}” value is required.'
-                self.log.error(msg)
-                file_info[ERRORS].append(msg)
-                self.batch[ERRORS].append(msg)
+        id_null_rows = self.df.index[self.df[id_field].isnull()] if id_field in columns else []
+        if not self.check_id(file_info, columns, id_field, id_null_rows):
             return False
         if self.submission_intention != SUBMISSION_INTENTION_DELETE: 
-            # check missing required proper 
-            required_props = self.model.get_node_req_props(type)
-            missed_props = [ prop for prop in required_props if prop not in columns and prop != id_field]
-            if len(missed_props) > 0:
-                msg = f'“{file_info[FILE_NAME]}”: '
-                msg += f'Properties {json.dumps(missed_props)} are required.' if len(missed_props) > 1 else f'Property "{missed_props[0]}" is required.'
-                self.log.error(msg)
-                file_info[ERRORS].append(msg)
-                self.batch[ERRORS].append(msg)
-            # check relationship
-            rel_props = [rel for rel in columns if "." in rel and not re.search('\.\d*$',rel)]
-            rel_result, msgs = self.check_relationship(file_info, type, rel_props)
-            if not rel_result:
-                self.log.error(msgs)
-                file_info[ERRORS].extend(msgs)
-                self.batch[ERRORS].extend(msgs)
+            rel_props = get_rel_props(columns)
+            rel_result = self.check_props(file_info, type, columns, id_field, rel_props)
             
             # check duplicate rows with the same nodeID
             duplicate_ids = self.df[id_field][self.df[id_field].duplicated()].tolist() 
             if len(duplicate_ids) > 0:
                 if len(rel_props) == 0 or not rel_result:
-                    duplicated_rows = self.df[self.df[id_field].isin(duplicate_ids)].to_dict("index")
-                    for key, val in duplicated_rows.items():
-                        msg = f'“{file_info[FILE_NAME]}:{key + 2}”: duplicated data detected: “{id_field}”: "{val[id_field]}".'
-                        self.log.error(msg)
-                        file_info[ERRORS].append(msg)
-                        self.batch[ERRORS].append(msg)
+                    duplicated_rows = self.df[self.df[id_field].isin(duplicate_ids)]
+                    self.report_duplicated_rows(file_info, id_field, zip(duplicated_rows.index, duplicated_rows[id_field]))
                     return False  
                 # check many-to-many relationship
                 result = self.check_m2m_relationship(columns, duplicate_ids, id_field, rel_props, file_info)
                 if not result:
                     return False 
         else:
-            if type in self.def_file_nodes:
-                # check is file name property is empty
-                if self.def_file_name not in columns:
-                    msg = f'“{file_info[FILE_NAME]}”: '
-                    msg += f'Property "{self.def_file_name}" is required.'
-                    self.log.error(msg)
-                    file_info[ERRORS].append(msg)
-                    self.batch[ERRORS].append(msg)
-                    return False
-                #check if file name property value is empty
-                nan_count = self.df.isnull().sum()[self.def_file_name]
-                if nan_count > 0: 
-                    nan_rows = self.df[self.df[self.def_file_name].isnull()].to_dict("index")
-                    for key in nan_rows.keys():
-                        msg = f'“{file_info[FILE_NAME]}:{key + 2}”:  file name property “{self.def_file_name}” value is required.'
-                        self.log.error(msg)
-                        file_info[ERRORS].append(msg)
-                        self.batch[ERRORS].append(msg)
-                    return False
+            file_name_null_rows = self.df.index[self.df[self.def_file_name].isnull()] if self.def_file_name in columns else []
+            if not self.check_file_name(file_info, type, columns, file_name_null_rows):
+                return False
                 
         return True if len(self.batch[ERRORS]) == 0 else False
+
+    def check_columns(self, file_info, columns, extra_cells):
+        """
+        Each row in a metadata file must have same number of columns as the header row, and headers must not be repeated
+        :param extra_cells: dict of the indexes of rows with a value in each unnamed column
+        """
+        for col in get_empty_columns(columns):
+            extra_cell_list = extra_cells.get(col)
+            if extra_cell_list:
+                for index in extra_cell_list:
+                    self.add_error(file_info, f'“{file_info[FILE_NAME]}: line {index + 2}": extra columns/cells found.')
+            else:
+                self.add_error(file_info, f'“{file_info[FILE_NAME]}": empty column(s) found.')
+                break
+
+        # check duplicate columns.
+        for col in columns:
+            if ".1" in col and col.replace(".1", "") in columns:
+                self.add_error(file_info, f'“{file_info[FILE_NAME]}": multiple columns with the same header ("{col.replace(".1", "")}") is not allowed.')
+
+    def check_empty_rows(self, file_info, empty_rows):
+        """
+        :param empty_rows: indexes of empty rows before the tailing empty rows
+        """
+        for index in empty_rows:
+            self.add_error(file_info, f'“{file_info[FILE_NAME]}: line {index + 2}": empty row found.')
+        return len(empty_rows) == 0
+
+    def check_type(self, file_info, columns, type, type_null_count, type_conflict):
+        """
+        check the "type" column, all rows must have the same node type defined in the data model
+        :param type: node type of the first row
+        :param type_conflict: tuple of (index, type) of the first row of a different type, or None
+        """
+        if not TYPE in columns:
+            self.add_error(file_info, f'“{file_info[FILE_NAME]}”: “type” column is required.')
+            file_info[NODE_TYPE] = ""
+            return False
+        file_info[NODE_TYPE] = type if not pd.isnull(type) else ""
+        if type_null_count > 0:
+            self.add_error(file_info, f'“{file_info[FILE_NAME]}”: “type” value is required')
+            return False
+        if type not in self.model.get_node_keys():
+            self.add_error(file_info, f'“{file_info[FILE_NAME]}: 2": Node type “{type}” is not defined.')
+            return False
+        if type_conflict:
+            index, node_type = type_conflict
+            self.add_error(file_info, f'“{file_info[FILE_NAME]}: {index + 2}": Node type “{node_type}” is different from "{type}", only one node type is allowed.')
+            return False
+        return True
+
+    def check_id(self, file_info, columns, id_field, id_null_rows):
+        """
+        check the key property column and its values
+        :param id_null_rows: indexes of rows without a key property value
+        """
+        if id_field and not id_field in columns:
+            self.add_error(file_info, f'“{file_info[FILE_NAME]}”: Key property “{id_field}” is required.')
+            return False
+        for index in id_null_rows:
+            self.add_error(file_info, f'“{file_info[FILE_NAME]}:{index + 2}”:  Key property “{id_field}” value is required.')
+        return len(id_null_rows) == 0
+
+    def check_props(self, file_info, type, columns, id_field, rel_props):
+        """
+        check required properties and relationship columns
+        :return: result of the relationship check
+        """
+        required_props = self.model.get_node_req_props(type)
+        missed_props = [ prop for prop in required_props if prop not in columns and prop != id_field]
+        if len(missed_props) > 0:
+            msg = f'“{file_info[FILE_NAME]}”: '
+            msg += f'Properties {json.dumps(missed_props)} are required.' if len(missed_props) > 1 else f'Property "{missed_props[0]}" is required.'
+            self.add_error(file_info, msg)
+        rel_result, msgs = self.check_relationship(file_info, type, rel_props)
+        if not rel_result:
+            self.log.error(msgs)
+            file_info[ERRORS].extend(msgs)
+            self.batch[ERRORS].extend(msgs)
+        return rel_result
+
+    def check_file_name(self, file_info, type, columns, file_name_null_rows):
+        """
+        check the file name column and its values of a data file node to delete
+        :param file_name_null_rows: indexes of rows without a file name
+        """
+        if type not in self.def_file_nodes:
+            return True
+        if self.def_file_name not in columns:
+            self.add_error(file_info, f'“{file_info[FILE_NAME]}”: Property "{self.def_file_name}" is required.')
+            return False
+        for index in file_name_null_rows:
+            self.add_error(file_info, f'“{file_info[FILE_NAME]}:{index + 2}”:  file name property “{self.def_file_name}” value is required.')
+        return len(file_name_null_rows) == 0
+
+    def report_duplicated_rows(self, file_info, id_field, rows):
+        """
+        :param rows: tuples of (index, ID) of all rows with an ID in more than one row
+        """
+        for index, id in rows:
+            self.add_error(file_info, f'“{file_info[FILE_NAME]}:{index + 2}”: duplicated data detected: “{id_field}”: "{id}".')
+
     """
-    validate many to many relationship
+    validate many to many relationship of the rows of the duplicated IDs
     """
     def check_m2m_relationship(self, columns, duplicate_ids, id_field, rel_props, file_info):
+        duplicate_rows = self.df[self.df[id_field].isin(duplicate_ids)]
+        other_props = [col for col in columns if col not in rel_props + [TYPE, id_field]]
+        return self.check_m2m_rows(file_info, duplicate_ids, id_field, duplicate_rows, rel_props, duplicate_rows, other_props)
+
+    def check_m2m_rows(self, file_info, duplicate_ids, id_field, rows, rel_props, prop_rows, other_props):
+        """
+        rows of the duplicated IDs are grouped by ID once and counted unique values of each relationship and other property
+        are compared with the number of rows of each ID.
+        :param duplicate_ids: ID of each row whose ID is in a previous row, in the order of the rows
+        :param rows: rows of the duplicated IDs with the ID and relationship columns
+        :param prop_rows: rows of the duplicated IDs with the ID and other property columns, rows of IDs without conflict values may be left out
+        """
         rtn_val = True
+        groups = rows.groupby(id_field, sort=False)
+        # rows of an ID are many-to-many relationships if a relationship has a different value in each row
+        is_m2m = groups[rel_props].nunique(dropna=False).eq(groups.size(), axis=0).any(axis=1)
+        prop_groups = prop_rows.groupby(id_field, sort=False)
+        conflicts = prop_groups[other_props].nunique(dropna=False).gt(1)
+        conflicts = conflicts[conflicts.any(axis=1)]
+        # first property with conflict values of each ID
+        conflict_props = conflicts.idxmax(axis=1).to_dict() if len(conflicts.index) > 0 else {}
+        group_rows = groups.indices
+        prop_group_rows = prop_groups.indices
         for id in duplicate_ids:
-            duplicate_rows = self.df[self.df[id_field] == id].to_dict('index')
-            row_cnt = len(duplicate_rows)
-            is_m2m = False
-            for rel in rel_props:
-                unique_rel_values = set([item[rel] for item in duplicate_rows.values()])
-                if row_cnt == len(list(unique_rel_values)):
-                    is_m2m = True
-                    break
-
-            if not is_m2m: # not a m2m rel or contain duplicate rel values
-                for key in duplicate_rows.keys():
-                    msg = f'“{file_info[FILE_NAME]}:{key + 2}”: duplicated data detected: “{id_field}”: {id}.'
-                    self.log.error(msg)
-                    file_info[ERRORS].append(msg)
-                    self.batch[ERRORS].append(msg)
+            if not is_m2m[id]: # not a m2m rel or contain duplicate rel values
+                for key in rows.index[group_rows[id]]:
+                    self.add_error(file_info, f'“{file_info[FILE_NAME]}:{key + 2}”: duplicated data detected: “{id_field}”: {id}.')
                 rtn_val = False  
                 break
-            else:
-                other_props = [col for col in columns if col not in rel_props + [TYPE, id_field]]
-                for prop in other_props:
-                    unique_prop_values =  list(set([item[prop] for item in duplicate_rows.values()]))
-                    if len(unique_prop_values) > 1:
-                        for value in unique_prop_values:
-                            index = next(key for key, val in duplicate_rows.items() if val[prop] == value)
-                            msg = f'“{file_info[FILE_NAME]}: {index + 2}”: conflict data detected: “{prop}”: "{value}".'
-                            self.log.error(msg)
-                            file_info[ERRORS].append(msg)
-                            self.batch[ERRORS].append(msg)
-                        rtn_val = False
-                        break
+            prop = conflict_props.get(id)
+            if prop:
+                # first row of each value of the property
+                values = prop_rows[prop].iloc[prop_group_rows[id]].drop_duplicates()
+                for index, value in values.items():
+                    value = None if pd.isna(value) else value
+                    self.add_error(file_info, f'“{file_info[FILE_NAME]}: {index + 2}”: conflict data detected: “{prop}”: "{value}".')
+                rtn_val = False
         return rtn_val
     """
     validate relationship
@@ -575,5 +753,25 @@ class EssentialValidator:
     def close(self):
         if self.bucket:
             del self.bucket
+        if self.s3_service:
+            self.s3_service.close(self.log)
+
+
+def get_empty_columns(columns):
+    """
+    dataframe sets the column name to "Unnamed: {index}" for an empty header
+    """
+    return [col for col in columns if not col or "Unnamed:" in col]
 
 
+def get_rel_props(columns):
+    return [rel for rel in columns if "." in rel and not re.search(r'\.\d*$', rel)]
+
+
+def get_type_conflict(df, type):
+    """
+    find the first row of a node type different from the type
+    :return: tuple of (index, type) of the row, or None
+    """
+    conflict_rows = df[df[TYPE].notna() & (df[TYPE] != type)]
+    return (conflict_rows.index[0], conflict_rows[TYPE].iloc[0]) if len(conflict_rows.index) > 0 else None
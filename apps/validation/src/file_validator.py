@@ -2,24 +2,32 @@
 
 import json
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from bento.common.sqs import VisibilityExtender
-from bento.common.utils import get_logger
+from bento.common.utils import get_logger, get_stream_md5
 from bento.common.s3 import S3Bucket
 from common.constants import ERRORS, WARNINGS, STATUS, S3_FILE_INFO, ID, SIZE, MD5, UPDATED_AT, \
     FILE_NAME, SQS_TYPE, SQS_NAME, FILE_ID, STATUS_ERROR, STATUS_WARNING, STATUS_PASSED, SUBMISSION_ID, \
     BATCH_BUCKET, SERVICE_TYPE_FILE, LAST_MODIFIED, CREATED_AT, TYPE, SUBMISSION_INTENTION, SUBMISSION_INTENTION_DELETE,\
-    VALIDATION_ID, VALIDATION_ENDED, QC_RESULT_ID, VALIDATION_TYPE_FILE, QC_SEVERITY, QC_VALIDATE_DATE
+    VALIDATION_ID, VALIDATION_ENDED, QC_RESULT_ID, VALIDATION_TYPE_FILE, QC_SEVERITY, QC_VALIDATE_DATE, SCOPE, STATUS_NEW, \
+    FILE_VALIDATION_WORKERS
 from common.utils import get_exception_msg, current_datetime, get_s3_file_info, get_s3_file_md5, create_error, get_uuid_str
+from common.manifest_index import ManifestIndex, manifest_index_cache
+from common.s3_utils import S3Service
 from service.ecs_agent import set_scale_in_protection
-from metadata_validator import get_qc_result
+from metadata_validator import get_qc_result, create_new_qc_result
 
 VISIBILITY_TIMEOUT = 20
+DEFAULT_FILE_VALIDATION_WORKERS = 8
 """
 Interface for validate files via SQS
 """
 def fileValidate(configs, job_queue, mongo_dao):
     file_processed = 0
     log = get_logger('Data file Validation Service')
+    # data files of a submission validated in one job are checked by a pool of threads
+    workers = int(configs.get(FILE_VALIDATION_WORKERS) or DEFAULT_FILE_VALIDATION_WORKERS)
     #run file validator as a service
     scale_in_protection_flag = False
     log.info(f'{SERVICE_TYPE_FILE} service started')
@@ -54,7 +62,7 @@ def fileValidate(configs, job_queue, mongo_dao):
                             continue
                         #2. validate file.
                         validator = FileValidator(mongo_dao)
-                        status = validator.validate(fileRecord)
+                        status = validator.validate(fileRecord, data.get(VALIDATION_ID))
                         if status == STATUS_ERROR:
                             log.error(f'The data file record is invalid, {data[FILE_ID]}!')
                         elif status == STATUS_WARNING:
@@ -70,14 +78,19 @@ def fileValidate(configs, job_queue, mongo_dao):
                     elif data.get(SQS_TYPE) == "Validate Submission Files" and data.get(SUBMISSION_ID) and data.get(VALIDATION_ID):
                         extender = VisibilityExtender(msg, VISIBILITY_TIMEOUT)
                         submission_id = data[SUBMISSION_ID]
-                        validator = FileValidator(mongo_dao)
+                        validator = FileValidator(mongo_dao, workers)
                         status = None
                         msgs = []
                         if not validator.get_root_path(submission_id):
                             log.error(f'Invalid submission, {submission_id}!')
                             status = STATUS_ERROR
                         else:
-                            status, msgs = validator.validate_all_files(data[SUBMISSION_ID])
+                            # the data files in the scope are validated in the job instead of a "Validate File" message for each file
+                            if data.get(SCOPE) and not validator.validate_submission_files(submission_id, data[SCOPE]):
+                                log.error(f'Failed to validate data files of the submission, {submission_id}!')
+                                status, msgs = STATUS_ERROR, [create_error("F011", [], "", "")]
+                            else:
+                                status, msgs = validator.validate_all_files(data[SUBMISSION_ID])
 
                         # update validation records
                         validation_id = data[VALIDATION_ID]
@@ -121,16 +134,17 @@ def fileValidate(configs, job_queue, mongo_dao):
 """
 class FileValidator:
     
-    def __init__(self, mongo_dao):
+    def __init__(self, mongo_dao, workers=DEFAULT_FILE_VALIDATION_WORKERS):
         self.log = get_logger('Data file Validator')
         self.mongo_dao = mongo_dao
+        self.workers = workers
         self.bucket_name = None
         self.bucket = None
         self.rootPath = None
         self.update_file_list = None
         self.submission = None
 
-    def validate(self, fileRecord):
+    def validate(self, fileRecord, validation_id=None):
         try: 
             #check if the file record is valid
             if not self.validate_fileRecord(fileRecord):
@@ -140,7 +154,7 @@ class FileValidator:
             if self.submission.get(SUBMISSION_INTENTION) == SUBMISSION_INTENTION_DELETE:
                 return STATUS_PASSED
             # validate individual file
-            status, error = self.validate_file(fileRecord)
+            status, error = self.validate_file(fileRecord, validation_id)
             self.save_qc_result(fileRecord, status, error)
             return status
         except Exception as e: #catch all unhandled exception
@@ -157,21 +171,23 @@ class FileValidator:
     
     def validate_fileRecord(self, fileRecord):
         #This service only processes metadata batches, if a file batch is passed, it should be ignored (output an error message in the log).
-        if not fileRecord.get(S3_FILE_INFO):
-            msg = f'Invalid file object, no s3 file info, {fileRecord[ID]}!'
-            self.log.error(msg)
-            error = create_error("F009", [fileRecord[ID]], S3_FILE_INFO, "")
+        error = self.get_fileRecord_error(fileRecord)
+        if error:
             self.save_qc_result(fileRecord, STATUS_ERROR, error)
             return False
-        else:
-            if not fileRecord[S3_FILE_INFO].get(FILE_NAME) or not fileRecord[S3_FILE_INFO].get(SIZE) \
-                    or not fileRecord[S3_FILE_INFO].get(MD5):
-                msg = f'Invalid data file object: invalid s3 data file info, {fileRecord[ID]}!'
-                self.log.error(msg)
-                error = create_error("F010", [fileRecord[ID]],  FILE_NAME, "")
-                self.save_qc_result(fileRecord, STATUS_ERROR, error)
-                return False
         return True
+
+    def get_fileRecord_error(self, fileRecord):
+        if not fileRecord.get(S3_FILE_INFO):
+            msg = f'Invalid file object, no s3 file info, {fileRecord[ID]}!'
+            self.log.error(msg)
+            return create_error("F009", [fileRecord[ID]], S3_FILE_INFO, "")
+        if not fileRecord[S3_FILE_INFO].get(FILE_NAME) or not fileRecord[S3_FILE_INFO].get(SIZE) \
+                or not fileRecord[S3_FILE_INFO].get(MD5):
+            msg = f'Invalid data file object: invalid s3 data file info, {fileRecord[ID]}!'
+            self.log.error(msg)
+            return create_error("F010", [fileRecord[ID]],  FILE_NAME, "")
+        return None
     
     def get_root_path(self, submissionID):
         submission = self.mongo_dao.get_submission(submissionID)
@@ -198,7 +214,7 @@ class FileValidator:
     """
     This function is designed for validate individual file in s3 bucket that is mounted to /s3_bucket dir
     """
-    def validate_file(self, fileRecord):
+    def validate_file(self, fileRecord, validation_id=None):
 
         file_info = fileRecord[S3_FILE_INFO]
         key = os.path.join(os.path.join(self.rootPath, f"file/{file_info[FILE_NAME]}"))
@@ -217,23 +233,39 @@ class FileValidator:
         size, last_updated = get_s3_file_info(self.bucket_name, key)
         #check cached md5
         cached_md5 = self.mongo_dao.get_file_md5(self.submission[ID], file_name)
-        md5 = None
-        if cached_md5 and last_updated.replace(tzinfo=None) <= cached_md5.get(LAST_MODIFIED).replace(tzinfo=None):
-            md5 = cached_md5.get(MD5)
-        else:
-            md5 = get_s3_file_md5(self.bucket_name, key)
-            current_date_time = current_datetime()
-            md5_info = {
-                ID: get_uuid_str() if not cached_md5 else cached_md5[ID],
-                SUBMISSION_ID : self.submission[ID],
-                FILE_NAME: file_name,
-                MD5: md5,
-                LAST_MODIFIED: last_updated,
-                CREATED_AT: current_date_time if not cached_md5 else cached_md5[CREATED_AT],
-                UPDATED_AT: current_date_time
-            }
+        md5, md5_info = self.get_md5(file_name, last_updated, cached_md5, lambda: get_s3_file_md5(self.bucket_name, key))
+        if md5_info:
             self.mongo_dao.save_file_md5(md5_info)
 
+        result = self.check_integrity(file_name, org_size, org_md5, size, md5)
+        if result:
+            return result
+        
+        # check duplicates in manifest, the index of the file records of the submission is shared by the files of the validation
+        manifest_index = manifest_index_cache.get(self.mongo_dao, fileRecord[SUBMISSION_ID], validation_id)
+        return self.check_duplicates(file_name, org_md5, manifest_index)
+
+    def get_md5(self, file_name, last_updated, cached_md5, compute_md5):
+        """
+        get md5 of a data file, cached md5 is used if the file is not modified after it is cached
+        :return: tuple of (md5, md5 info to cache, None if the cached md5 is used)
+        """
+        if cached_md5 and last_updated.replace(tzinfo=None) <= cached_md5.get(LAST_MODIFIED).replace(tzinfo=None):
+            return cached_md5.get(MD5), None
+        md5 = compute_md5()
+        current_date_time = current_datetime()
+        md5_info = {
+            ID: get_uuid_str() if not cached_md5 else cached_md5[ID],
+            SUBMISSION_ID : self.submission[ID],
+            FILE_NAME: file_name,
+            MD5: md5,
+            LAST_MODIFIED: last_updated,
+            CREATED_AT: current_date_time if not cached_md5 else cached_md5[CREATED_AT],
+            UPDATED_AT: current_date_time
+        }
+        return md5, md5_info
+
+    def check_integrity(self, file_name, org_size, org_md5, size, md5):
         if int(org_size) != int(size):
             msg = f'Data file “{file_name}”: expected size: {org_size}, actual size: {size}.'
             self.log.error(msg)
@@ -245,41 +277,143 @@ class FileValidator:
             self.log.error(msg)
             error = create_error("F004", [file_name, org_md5, md5],  "md5", org_md5)
             return STATUS_ERROR, error
-        
-        # check duplicates in manifest
-        manifest_info_list = self.mongo_dao.get_files_by_submission(fileRecord[SUBMISSION_ID])
-        if not manifest_info_list or  len(manifest_info_list) == 0:
+        return None
+
+    def check_duplicates(self, file_name, org_md5, manifest_index):
+        if not manifest_index or manifest_index.count == 0:
             msg = f"No data file records found for the submission."
             self.log.error(msg)
             error = create_error("F002", [], "files", None)
             return STATUS_ERROR, error
         
         # 3. check if Same MD5 checksum and same filename 
-        temp_list = [file for file in manifest_info_list if file[S3_FILE_INFO][FILE_NAME] == file_name and file[S3_FILE_INFO][MD5] == org_md5]
-        if len(temp_list) > 1:
+        if manifest_index.count_same_name_md5(file_name, org_md5) > 1:
             msg = f'Data file “{file_name}”: already exists with the same name and md5 value.'
             self.log.warning(msg)
             error = create_error("F005", [file_name], "file name", file_name)
             return STATUS_WARNING, error 
         
         # 4. check if Same filename but different MD5 checksum 
-        temp_list = [file for file in manifest_info_list if file[S3_FILE_INFO][FILE_NAME] == file_name and file[S3_FILE_INFO][MD5] != org_md5]
-        if len(temp_list) > 0:
+        if manifest_index.count_same_name_other_md5(file_name, org_md5) > 0:
             msg = f'Data file “{file_name}”: A data file with the same name but different md5 value was found.'
             self.log.warning(msg)
             error = create_error("F006", [file_name], "file name", file_name)
             return STATUS_WARNING, error
         
         # 5. check if Same MD5 checksum but different filename
-        temp_list = [file for file in manifest_info_list if file[S3_FILE_INFO][FILE_NAME] != file_name and file[S3_FILE_INFO][MD5] == org_md5]
-        if len(temp_list) > 0:
+        if manifest_index.count_same_md5_other_name(file_name, org_md5) > 0:
             msg = f'Data file “{file_name}”: another data file with the same MD5 found.'
             error = create_error("F007", [file_name], "file name", file_name)
             self.log.warning(msg)
             return STATUS_WARNING, error 
             
         return STATUS_PASSED, None
-    
+
+    """
+    Validate the data files of a submission in one job instead of a "Validate File" message for each file.
+    Heads of the s3 objects and md5 of the files not cached are read by a pool of threads,
+    the records, cached md5 and QC results are read before and written after in bulk.
+    returns False if the records, cached md5 or QC results can't be read or written.
+    """
+    def validate_submission_files(self, submission_id, scope):
+        if self.submission.get(SUBMISSION_INTENTION) == SUBMISSION_INTENTION_DELETE:
+            return True
+        start = time.perf_counter()
+        file_records = self.mongo_dao.get_files_by_submission(submission_id)
+        if file_records is None:
+            return False
+        # the duplicates are checked against all data file records of the submission
+        manifest_index = ManifestIndex(file_records)
+        if scope.lower() == STATUS_NEW.lower():
+            file_records = [file_record for file_record in file_records
+                            if str((file_record.get(S3_FILE_INFO) or {}).get(STATUS)).lower() == STATUS_NEW.lower()]
+        if not file_records:
+            return True
+        cached_md5s = self.mongo_dao.get_files_md5(submission_id)
+        if cached_md5s is None:
+            return False
+        cached_md5s = {md5_info[FILE_NAME]: md5_info for md5_info in cached_md5s}
+        qc_ids = [file_record[S3_FILE_INFO][QC_RESULT_ID] for file_record in file_records
+                  if file_record.get(S3_FILE_INFO) and file_record[S3_FILE_INFO].get(QC_RESULT_ID)]
+        qc_results = self.mongo_dao.get_qcRecords(qc_ids) if qc_ids else []
+        if qc_results is None:
+            return False
+        qc_results = {qc_result[ID]: qc_result for qc_result in qc_results}
+        s3_service = S3Service(max_pool_connections=self.workers)
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                results = list(executor.map(lambda file_record: self.check_file(s3_service, file_record, cached_md5s, manifest_index), file_records))
+        finally:
+            s3_service.close(self.log)
+
+        saved_qc_results = []
+        deleted_qc_ids = []
+        # records of the same file share its cached md5
+        md5_infos = {}
+        for file_record, (status, error, md5_info) in zip(file_records, results):
+            qc_id = (file_record.get(S3_FILE_INFO) or {}).get(QC_RESULT_ID)
+            qc_result, deleted_qc_id = self.set_qc_result(file_record, qc_results.get(qc_id) if qc_id else None, status, error)
+            if qc_result:
+                saved_qc_results.append(qc_result)
+            if deleted_qc_id:
+                deleted_qc_ids.append(deleted_qc_id)
+            if md5_info:
+                md5_infos[md5_info[FILE_NAME]] = md5_info
+        result = True
+        if md5_infos and not self.mongo_dao.save_files_md5(md5_infos.values()):
+            result = False
+        if deleted_qc_ids and not self.mongo_dao.delete_qcRecords(deleted_qc_ids):
+            result = False
+        if saved_qc_results and not self.mongo_dao.save_qc_results(saved_qc_results)[0]:
+            result = False
+        if not self.mongo_dao.update_files_info(file_records)[0]:
+            result = False
+        elapsed = time.perf_counter() - start
+        self.log.info(f'{submission_id}: {len(file_records)} data file(s) validated in {elapsed:.1f} seconds, '
+                      f'{len(file_records) / elapsed if elapsed else 0:.1f} files/s, md5 of {len(md5_infos)} file(s) calculated.')
+        return result
+
+    def check_file(self, s3_service, fileRecord, cached_md5s, manifest_index):
+        """
+        validate a data file of the submission, called by the threads of the pool, so it doesn't write to the database
+        :return: tuple of (status, error, md5 info to cache)
+        """
+        try:
+            error = self.get_fileRecord_error(fileRecord)
+            if error:
+                return STATUS_ERROR, error, None
+            file_info = fileRecord[S3_FILE_INFO]
+            file_name = file_info[FILE_NAME]
+            key = os.path.join(os.path.join(self.rootPath, f"file/{file_name}"))
+            # 1. check if exists, the head of the object has its size and last modified time
+            head = s3_service.get_file_head(self.bucket_name, key)
+            if head is None:
+                msg = f'Data file “{file_name}” not found.'
+                self.log.error(msg)
+                return STATUS_ERROR, create_error("F001", [file_name], "file", key), None
+            # 2. check file integrity
+            md5, md5_info = self.get_md5(file_name, head[LAST_MODIFIED], cached_md5s.get(file_name),
+                                         lambda: self.get_stream_md5(s3_service, key))
+            result = self.check_integrity(file_name, file_info[SIZE], file_info[MD5], head['ContentLength'], md5)
+            if not result:
+                result = self.check_duplicates(file_name, file_info[MD5], manifest_index)
+            return result + (md5_info,)
+        except Exception as e: #catch all unhandled exception
+            self.log.exception(e)
+            msg = f"{fileRecord.get(SUBMISSION_ID)}: Failed to validate data file, {fileRecord.get(ID)}! {get_exception_msg()}!"
+            self.log.exception(msg)
+            return STATUS_ERROR, create_error("F011", [], "", ""), None
+
+    def get_stream_md5(self, s3_service, key):
+        """
+        calculate md5 of a data file streamed from s3, the stream is closed after read
+        """
+        stream = s3_service.get_file_stream(self.bucket_name, key)
+        try:
+            return get_stream_md5(stream)
+        finally:
+            stream.close()
+
     """
     Validate all file in a submission:
     1. Extra files, validate if there are files in files folder of the submission that are not specified in any manifests of the submission. 
@@ -397,12 +531,26 @@ class FileValidator:
         if status == STATUS_ERROR or status == STATUS_WARNING:
             if not qc_result:
                 qc_result = get_qc_result(fileRecord, VALIDATION_TYPE_FILE, self.mongo_dao)
+        qc_result, deleted_qc_id = self.set_qc_result(fileRecord, qc_result, status, error)
+        if deleted_qc_id:
+            self.mongo_dao.delete_qcRecord(deleted_qc_id)
+        if qc_result: # save QC result
+            self.mongo_dao.save_qc_results([qc_result])
+
+    def set_qc_result(self, fileRecord, qc_result, status, error):
+        """
+        set status of a data file record and its QC result, a new QC result is created for an error or a warning if it has none
+        :return: tuple of (QC result to save, ID of the QC result to delete)
+        """
+        if not fileRecord.get(S3_FILE_INFO):
+            fileRecord[S3_FILE_INFO] = {}
+        if (status == STATUS_ERROR or status == STATUS_WARNING) and not qc_result:
+            qc_result = create_new_qc_result(fileRecord, VALIDATION_TYPE_FILE)
         self.set_status(fileRecord, qc_result, status, error)
         if status == STATUS_PASSED and qc_result:
-            self.mongo_dao.delete_qcRecord(qc_result[ID])
-            qc_result = None
             fileRecord[S3_FILE_INFO][QC_RESULT_ID] = None
-        if qc_result: # save QC result
+            return None, qc_result[ID]
+        if qc_result:
             fileRecord[S3_FILE_INFO][QC_RESULT_ID] = qc_result[ID]
             qc_result[QC_VALIDATE_DATE] = current_datetime()
-            self.mongo_dao.save_qc_results([qc_result])
\ No newline at end of file
+        return qc_result, None
\ No newline at end of file
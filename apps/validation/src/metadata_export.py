@@ -162,17 +162,16 @@ class ExportMetadata:
 
         
     def export(self, submission_id, node_type):
-        start_index = 0
+        total_count = 0
         rows = []
         columns = set()
         file_name = ""
         main_nodes = self.model.get_main_nodes()
-        while True:
-            # get nodes by submissionID and nodeType
-            data_records = self.mongo_dao.get_dataRecords_chunk_by_nodeType(submission_id, node_type, start_index, BATCH_SIZE)
-            if start_index == 0 and (not data_records or len(data_records) == 0):
+        # get nodes by submissionID and nodeType
+        for data_records in self.mongo_dao.get_dataRecords_chunks(submission_id, None, node_type, BATCH_SIZE):
+            if data_records is None:
+                self.log.error(f'{submission_id}: Failed to retrieve {node_type} data to export.')
                 return
-            
             for r in data_records:
                 # node_id = r.get(NODE_ID)
                 crdc_id = r.get(CRDC_ID) if node_type in main_nodes.keys() else None
@@ -181,30 +180,28 @@ class ExportMetadata:
                 if r.get(ORIN_FILE_NAME) != file_name:
                     columns.update(row_list[0].keys())
                     file_name = r.get(ORIN_FILE_NAME) 
+            total_count += len(data_records)
+        if total_count == 0:
+            return
 
-            count = len(data_records) 
-            if count < BATCH_SIZE: 
-                df = None
-                buf = None
-                try:
-                    df = pd.DataFrame(rows, columns = self.sort_columns(columns, node_type))
-                    buf = io.BytesIO()
-                    df.to_csv(buf, sep ='\t', index=False)
-                    buf.seek(0)
-                    self.upload_file(buf, node_type)
-                    self.log.info(f"{submission_id}: {count + start_index} {node_type} nodes are exported.")
-                    return
-                except Exception as e:
-                    self.log.exception(e)
-                    self.log.exception(f'{submission_id}: Failed to export {node_type} data: {get_exception_msg()}.')
-                finally:
-                    if buf:
-                        del buf
-                        del df
-                        del rows
-                        del columns
-
-            start_index += count 
+        df = None
+        buf = None
+        try:
+            df = pd.DataFrame(rows, columns = self.sort_columns(columns, node_type))
+            buf = io.BytesIO()
+            df.to_csv(buf, sep ='\t', index=False)
+            buf.seek(0)
+            self.upload_file(buf, node_type)
+            self.log.info(f"{submission_id}: {total_count} {node_type} nodes are exported.")
+        except Exception as e:
+            self.log.exception(e)
+            self.log.exception(f'{submission_id}: Failed to export {node_type} data: {get_exception_msg()}.')
+        finally:
+            if buf:
+                del buf
+                del df
+                del rows
+                del columns
 
     def convert_2_row(self, data_record, node_type, crdc_id):
         rows = []
@@ -243,31 +240,26 @@ class ExportMetadata:
         self.s3_service.upload_file_to_s3(buf, bucket_name, full_name)
 
     def delete_data_file(self, submission_id, node_type):
-        start_index = 0
         file_list = []
-        while True:
-            # get nodes by submissionID and nodeType
-            data_records = self.mongo_dao.get_dataRecords_chunk_by_nodeType(submission_id, node_type, start_index, BATCH_SIZE)
-            if start_index == 0 and (not data_records or len(data_records) == 0):
+        # get nodes by submissionID and nodeType
+        for data_records in self.mongo_dao.get_dataRecords_chunks(submission_id, None, node_type, BATCH_SIZE):
+            if data_records is None:
+                self.log.error(f'{submission_id}: Failed to retrieve {node_type} data to delete files.')
                 return
-            
             for r in data_records:
                 s3FileInfo = r.get(S3_FILE_INFO)
                 if s3FileInfo:
                     s3_file_name = s3FileInfo.get(FILE_NAME)
                     if s3_file_name:
                         file_list.append(s3_file_name)
+        if len(file_list) == 0:
+            return
 
-            count = len(data_records) 
-            if count < BATCH_SIZE: 
-                try:
-                    self.move_s3_objects(file_list)
-                except Exception as e:
-                    self.log.exception(e)
-                    self.log.exception(f'{submission_id}: Failed to delete {node_type} file: {get_exception_msg()}.')
-                return
-
-            start_index += count 
+        try:
+            self.move_s3_objects(file_list)
+        except Exception as e:
+            self.log.exception(e)
+            self.log.exception(f'{submission_id}: Failed to delete {node_type} file: {get_exception_msg()}.')
 
     def release_data(self):
         submission_id = self.submission[ID]
@@ -292,11 +284,11 @@ class ExportMetadata:
             return False
 
     def save_releases(self, submission_id, node_type):
-        start_index = 0
-        while True:
-            # get nodes by submissionID and nodeType
-            data_records = self.mongo_dao.get_dataRecords_chunk_by_nodeType(submission_id, node_type, start_index, BATCH_SIZE)
-            if start_index == 0 and (not data_records or len(data_records) == 0):
+        total_count = 0
+        # get nodes by submissionID and nodeType
+        for data_records in self.mongo_dao.get_dataRecords_chunks(submission_id, None, node_type, BATCH_SIZE):
+            if data_records is None:
+                self.log.error(f'{submission_id}: Failed to retrieve {node_type} data to release.')
                 return
             for r in data_records:
                 node_id = r.get(NODE_ID)
@@ -304,12 +296,9 @@ class ExportMetadata:
                 self.save_release(r, node_type, node_id, crdc_id)
                 if self.submission[SUBMISSION_INTENTION] == SUBMISSION_INTENTION_DELETE and node_type in self.model.get_file_nodes():
                     self.add_tag_on_deleted_file(r.get(S3_FILE_INFO))
-            count = len(data_records) 
-            if count < BATCH_SIZE: 
-                self.log.info(f"{submission_id}: {count + start_index} {node_type} nodes are {'released' if self.intention != SUBMISSION_INTENTION_DELETE else 'deleted'}.")
-                return
-
-            start_index += count 
+            total_count += len(data_records)
+        if total_count > 0:
+            self.log.info(f"{submission_id}: {total_count} {node_type} nodes are {'released' if self.intention != SUBMISSION_INTENTION_DELETE else 'deleted'}.")
 
     def save_release(self, data_record, node_type, node_id, crdc_id):
         if not node_type or not node_id: 
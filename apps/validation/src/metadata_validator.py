@@ -1,20 +1,32 @@
 #!/usr/bin/env python3
 import json
-from datetime import datetime
+import re
+import hashlib
+import multiprocessing
+import numpy as np
+import pandas as pd
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, Future
 from bento.common.sqs import VisibilityExtender
-from bento.common.utils import get_logger, DATE_FORMATS
+from bento.common.utils import get_logger
 from common.constants import SQS_NAME, SQS_TYPE, SCOPE, SUBMISSION_ID, ERRORS, WARNINGS, STATUS_ERROR, ID, FAILED, \
-    STATUS_WARNING, STATUS_PASSED, STATUS, UPDATED_AT, MODEL_FILE_DIR, TIER_CONFIG, DATA_COMMON_NAME, MODEL_VERSION, \
-    NODE_TYPE, PROPERTIES, TYPE, MIN, MAX, VALUE_EXCLUSIVE, VALUE_PROP, VALIDATION_RESULT, ORIN_FILE_NAME, \
+    STATUS_WARNING, STATUS_PASSED, STATUS, MODEL_FILE_DIR, TIER_CONFIG, DATA_COMMON_NAME, MODEL_VERSION, \
+    NODE_TYPE, PROPERTIES, TYPE, VALUE_EXCLUSIVE, VALUE_PROP, VALIDATION_RESULT, ORIN_FILE_NAME, \
     VALIDATED_AT, SERVICE_TYPE_METADATA, NODE_ID, PROPERTIES, PARENTS, KEY, NODE_ID, PARENT_TYPE, PARENT_ID_NAME, PARENT_ID_VAL, \
     SUBMISSION_INTENTION, SUBMISSION_INTENTION_NEW_UPDATE, SUBMISSION_INTENTION_DELETE, TYPE_METADATA_VALIDATE, TYPE_CROSS_SUBMISSION, \
-    SUBMISSION_REL_STATUS_RELEASED, VALIDATION_ID, VALIDATION_ENDED, CDE_TERM, TERM_CODE, TERM_VERSION, CDE_PERMISSIVE_VALUES, \
+    SUBMISSION_REL_STATUS_RELEASED, VALIDATION_ID, VALIDATION_ENDED, CDE_PERMISSIVE_VALUES, \
     QC_RESULT_ID, BATCH_IDS, VALIDATION_TYPE_METADATA, S3_FILE_INFO, VALIDATION_TYPE_FILE, QC_SEVERITY, QC_VALIDATE_DATE, QC_ORIGIN, \
     QC_ORIGIN_METADATA_VALIDATE_SERVICE, QC_ORIGIN_FILE_VALIDATE_SERVICE, DISPLAY_ID, UPLOADED_DATE, LATEST_BATCH_ID, SUBMITTED_ID, \
-    LATEST_BATCH_DISPLAY_ID, QC_VALIDATION_TYPE, DATA_RECORD_ID, PV_TERM
-from common.utils import current_datetime, get_exception_msg, dump_dict_to_json, create_error, get_uuid_str
+    LATEST_BATCH_DISPLAY_ID, QC_VALIDATION_TYPE, DATA_RECORD_ID, PV_TERM, CDE_CACHE_TTL, CDE_CACHE_SIZE, \
+    METADATA_VALIDATION_WORKERS, METADATA_VALIDATION_INCREMENTAL, METADATA_VALIDATION_COLUMNAR, STATUS_NEW, CREATED_AT, \
+    DATA_COLlECTION, VALIDATION_CHECKPOINT, CHECKPOINT_STARTED_AT, CHECKPOINT_RECORD_COUNT, CHECKPOINT_FINGERPRINT, CDE_CODE, \
+    MONGO_DB, DB
+from common.utils import current_datetime, get_exception_msg, dump_dict_to_json, create_error, get_uuid_str, is_hashable
+from common.cde_cache import cde_cache, PermissibleValues
+from common.synonym_index import synonym_index
+from common.date_parser import date_parser
 from common.model_store import ModelFactory
-from common.model_reader import valid_prop_types
+from common.mongo_dao import MongoDao
 from service.ecs_agent import set_scale_in_protection
 from x_submission_validator import CrossSubmissionValidator
 from pv_puller import get_pv_by_datacommon_version_cde
@@ -22,6 +34,14 @@ from pv_puller import get_pv_by_datacommon_version_cde
 VISIBILITY_TIMEOUT = 20
 BATCH_SIZE = 1000
 CDE_NOT_FOUND = "CDE not available"
+# validator of a worker process of the parallel validation, created by init_worker
+worker_validator = None
+# state of a validation copied to the validators of worker processes, the lookups are passed with each chunk
+WORKER_STATE = ["submission", "model"]
+# string values converted in bulk by columnar validation, others are converted one by one
+INTEGER_PATTERN = re.compile(r"[+-]?[0-9]{1,15}")
+NUMBER_PATTERN = re.compile(r"[+-]?([0-9]+\.?[0-9]*|\.[0-9]+)([eE][+-]?[0-9]+)?")
+MAX_EXACT_FLOAT_INT = 2 ** 53
 
 def metadataValidate(configs, job_queue, mongo_dao):
     log = get_logger('Metadata Validation Service')
@@ -29,6 +49,8 @@ def metadataValidate(configs, job_queue, mongo_dao):
         model_store = ModelFactory(configs[MODEL_FILE_DIR], configs[TIER_CONFIG]) 
         # dump models to json files
         dump_dict_to_json(model_store.models, f"models/data_model.json")
+        # configure the process-wide CDE permissible values cache
+        cde_cache.configure(configs.get(CDE_CACHE_TTL), configs.get(CDE_CACHE_SIZE))
     except Exception as e:
         log.exception(e)
         log.exception(f'Error occurred when initialize metadata validation service: {get_exception_msg()}')
@@ -78,6 +100,8 @@ def metadataValidate(configs, job_queue, mongo_dao):
                     else:
                         log.error(f'Invalid message: {data}!')
                     log.info(f'Processed {SERVICE_TYPE_METADATA} validation for the submission: {data[SUBMISSION_ID]}!')
+                    cache_stats = cde_cache.stats()
+                    log.info(f'CDE permissible values cache: {cache_stats["size"]} entries, {cache_stats["hits"]} hits, {cache_stats["misses"]} misses.')
                     batches_processed += 1
                     msg.delete()
                 except Exception as e:
@@ -108,6 +132,16 @@ class MetaDataValidator:
         self.isWarning = None
         self.searched_sts = False
         self.not_found_cde = False
+        self.node_key_index = None
+        self.chunk_parent_nodes = None
+        self.chunk_released_parents = None
+        self.chunk_released_nodes = None
+        self.one_to_one_children = None
+        self.resolved_pvs = {}
+        self.incremental = bool(config.get(METADATA_VALIDATION_INCREMENTAL)) if config else False
+        self.affected_ids = None
+        self.columnar = bool(config.get(METADATA_VALIDATION_COLUMNAR)) if config else False
+        self.chunk_prop_results = None
 
     def validate(self, submission_id, scope):
         #1. # get data common from submission
@@ -132,61 +166,368 @@ class MetaDataValidator:
             msg = f'{self.datacommon} model version "{model_version}" is not available.'
             self.log.error(msg)
             return STATUS_ERROR
+        # load or refresh the synonym index for suggesting permissible values
+        synonym_index.refresh(self.mongo_dao)
+        # build the node key index of the submission for checking duplicate IDs
+        if submission.get(SUBMISSION_INTENTION) != SUBMISSION_INTENTION_DELETE:
+            self.node_key_index = self.build_node_key_index(submission_id)
+            self.one_to_one_children = self.build_one_to_one_children(submission_id)
+        # a validation of the whole submission is the checkpoint of the next incremental validation
+        checkpoint = self.create_checkpoint(submission_id) if scope != STATUS_NEW else None
+        if checkpoint and self.incremental:
+            self.affected_ids = self.find_affected_records(submission_id, checkpoint)
         #3 retrieve data batch by batch
-        start_index = 0
+        workers = int(self.config.get(METADATA_VALIDATION_WORKERS) or 1)
+        if workers > 1 and self.is_submission_resolved():
+            total_count, validated_count = self.validate_chunks_parallel(submission_id, scope, workers)
+        else:
+            total_count, validated_count = self.validate_chunks(submission_id, scope)
+        if total_count is None:
+            msg = f'{submission_id}: Failed to retrieve metadata to be validated.'
+            self.log.error(msg)
+            return FAILED
+        if checkpoint and validated_count == total_count:
+            self.mongo_dao.set_submission_validation_checkpoint(submission_id, checkpoint)
+        if total_count == 0 and self.affected_ids is None:
+            msg = f'No more new metadata to be validated.'
+            self.log.error(msg)
+            return FAILED
+        if total_count == 0:
+            self.log.info(f'{submission_id}: No metadata changed since the last validation.')
+        else:
+            self.log.info(f"{submission_id}: {validated_count} out of {total_count} nodes are validated.")
+        if self.affected_ids is not None:
+            return self.get_submission_status(submission_id)
+        return STATUS_ERROR if self.isError else STATUS_WARNING if self.isWarning  else STATUS_PASSED 
+
+    """
+    get the status of an incremental validation from the stored status of all dataRecords of the submission,
+    since the dataRecords not affected by the changes keep the status of the last validation.
+    """
+    def get_submission_status(self, submission_id):
+        statuses = self.mongo_dao.get_dataRecord_statuses(submission_id)
+        if statuses is None:
+            msg = f'{submission_id}: Failed to retrieve status of the validated metadata.'
+            self.log.error(msg)
+            return FAILED
+        if self.isError or STATUS_ERROR in statuses:
+            return STATUS_ERROR
+        return STATUS_WARNING if self.isWarning or STATUS_WARNING in statuses else STATUS_PASSED
+
+    """
+    validate dataRecords of the submission chunk by chunk in current process,
+    returns a tuple of (total count, validated count), total count is None if failed to retrieve dataRecords.
+    """
+    def validate_chunks(self, submission_id, scope):
+        total_count = 0
         validated_count = 0
-        while True:
-            data_records = self.mongo_dao.get_dataRecords_chunk(submission_id, scope, start_index, BATCH_SIZE)
-            if start_index == 0 and (not data_records or len(data_records) == 0):
-                msg = f'No more new metadata to be validated.'
-                self.log.error(msg)
-                return FAILED
-            
-            count = len(data_records)             
+        for data_records in self.get_validation_chunks(submission_id, scope):
+            if data_records is None:
+                return None, validated_count
+            total_count += len(data_records)
             validated_count += self.validate_nodes(data_records)
-            if count < BATCH_SIZE: 
-                self.log.info(f"{submission_id}: {validated_count} out of {count + start_index} nodes are validated.")
-                return STATUS_ERROR if self.isError else STATUS_WARNING if self.isWarning  else STATUS_PASSED 
-            start_index += count  
+        return total_count, validated_count
+
+    """
+    validate dataRecords of the submission with a pool of worker processes. Current process reads the chunks,
+    resolves their lookups and permissible values, and saves validation results in order as the single writer,
+    while the workers run the validation core on the chunks. A chunk is validated in current process if its lookups
+    can't be resolved. Workers are spawned, not forked, and open their own MongoDB client.
+    returns a tuple of (total count, validated count), total count is None if failed to retrieve dataRecords.
+    """
+    def validate_chunks_parallel(self, submission_id, scope, workers):
+        total_count = 0
+        validated_count = 0
+        pending = deque()
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"), initializer=init_worker,
+                                 initargs=(self.config, self.get_worker_state(), synonym_index.get_terms())) as executor:
+            self.log.info(f"{submission_id}: validating metadata with {workers} worker processes.")
+            for data_records in self.get_validation_chunks(submission_id, scope):
+                if data_records is None:
+                    total_count = None
+                    break
+                total_count += len(data_records)
+                chunk_lookups = self.resolve_chunk_lookups(data_records)
+                chunk_pvs = self.resolve_chunk_permissive_values(data_records)
+                if self.is_chunk_resolved(chunk_lookups):
+                    chunk_lookups += (self.get_chunk_node_keys(data_records), self.get_chunk_one_to_one_children(data_records))
+                    pending.append((data_records, executor.submit(validate_chunk, data_records, chunk_lookups, chunk_pvs)))
+                else:
+                    pending.append((data_records, self.validate_records(data_records)))
+                # limit the chunks in memory
+                while len(pending) > workers * 2:
+                    validated_count += self.save_pending_chunk(*pending.popleft())
+            while len(pending) > 0:
+                validated_count += self.save_pending_chunk(*pending.popleft())
+        return total_count, validated_count
+
+    """
+    state of the validation needed by the validation core in a worker process
+    """
+    def get_worker_state(self):
+        return {attr: getattr(self, attr) for attr in WORKER_STATE}
+
+    def load_worker_state(self, state):
+        for attr, value in state.items():
+            setattr(self, attr, value)
+        self.submission_id = self.submission.get(ID)
+        self.datacommon = self.submission.get(DATA_COMMON_NAME)
+
+    """
+    stream the dataRecords to be validated in chunks, all dataRecords in the scope, or the affected dataRecords
+    in incremental validation. yields None and stops if failed to retrieve a chunk.
+    """
+    def get_validation_chunks(self, submission_id, scope):
+        if self.affected_ids is None:
+            yield from self.mongo_dao.get_dataRecords_chunks(submission_id, scope, None, BATCH_SIZE)
+            return
+        for start in range(0, len(self.affected_ids), BATCH_SIZE):
+            data_records = self.mongo_dao.get_dataRecords_by_ids(submission_id, self.affected_ids[start: start + BATCH_SIZE])
+            yield data_records
+            if data_records is None:
+                return
+
+    """
+    create the checkpoint of a validation of the whole submission before validating, with the start time, the number
+    of dataRecords and the fingerprint of the data model and the submission they are validated against.
+    """
+    def create_checkpoint(self, submission_id):
+        started_at = current_datetime()
+        record_count = self.mongo_dao.count_docs(DATA_COLlECTION, {SUBMISSION_ID: submission_id})
+        if record_count is False:
+            return None
+        inputs = [self.datacommon, self.submission.get(MODEL_VERSION), self.submission.get(SUBMISSION_INTENTION), self.model.model]
+        fingerprint = hashlib.sha256(json.dumps(inputs, sort_keys=True, default=str).encode()).hexdigest()
+        return {CHECKPOINT_STARTED_AT: started_at, CHECKPOINT_RECORD_COUNT: record_count, CHECKPOINT_FINGERPRINT: fingerprint}
+
+    """
+    find the dataRecords affected by the changes since the last validation of the whole submission: changed dataRecords,
+    dataRecords with the same node key or a parent of the changed dataRecords and changed released nodes, all dataRecords
+    of node types with changed CDEs, and of node types in one_to_one relationships with changed nodes since their
+    siblings may have been moved to another parent.
+    returns a list of _ids, or None if the whole submission needs to be validated, i.e. no previous validation,
+    the data model or the submission changed, dataRecords were deleted, or the changes can't be retrieved.
+    """
+    def find_affected_records(self, submission_id, checkpoint):
+        last_checkpoint = self.submission.get(VALIDATION_CHECKPOINT) or {}
+        last_started_at = last_checkpoint.get(CHECKPOINT_STARTED_AT)
+        if not last_started_at or last_checkpoint.get(CHECKPOINT_FINGERPRINT) != checkpoint[CHECKPOINT_FINGERPRINT]:
+            self.log.info(f'{submission_id}: validating all dataRecords, no previous validation with the same data model.')
+            return None
+        # records created since the last validation are not counted, so a smaller count means records are deleted
+        created_count = self.mongo_dao.count_docs(DATA_COLlECTION, {SUBMISSION_ID: submission_id, CREATED_AT: {"$gt": last_started_at}})
+        if created_count is False or checkpoint[CHECKPOINT_RECORD_COUNT] - created_count < last_checkpoint.get(CHECKPOINT_RECORD_COUNT, 0):
+            self.log.info(f'{submission_id}: validating all dataRecords, dataRecords are deleted since the last validation.')
+            return None
+        changed_records = self.mongo_dao.get_changed_dataRecords(submission_id, last_started_at)
+        released_nodes = self.mongo_dao.get_changed_released_nodes(self.datacommon, last_started_at)
+        node_types = self.get_changed_cde_node_types(last_started_at)
+        if changed_records is None or released_nodes is None or node_types is None:
+            return None
+        changed_keys = {}
+        for node in changed_records + released_nodes:
+            node_type = node.get(NODE_TYPE)
+            changed_keys.setdefault(node_type, set()).add(node.get(NODE_ID))
+            relationships = self.model.get_node_relationships(node_type) or {}
+            for parent in node.get(PARENTS) or []:
+                relationship = relationships.get(parent.get(PARENT_TYPE))
+                if relationship and relationship.get(TYPE) == "one_to_one":
+                    node_types.add(node_type)
+        affected_ids = {record[ID] for record in changed_records}
+        keys = [(node_type, node_id) for node_type, node_ids in changed_keys.items() for node_id in node_ids if is_hashable(node_id)]
+        for start in range(0, len(keys), BATCH_SIZE):
+            chunk_keys = {}
+            for node_type, node_id in keys[start: start + BATCH_SIZE]:
+                chunk_keys.setdefault(node_type, []).append(node_id)
+            related_ids = self.mongo_dao.get_dataRecord_ids(submission_id, chunk_keys, chunk_keys)
+            if related_ids is None:
+                return None
+            affected_ids.update(related_ids)
+        if len(node_types) > 0:
+            type_ids = self.mongo_dao.get_dataRecord_ids(submission_id, node_types=node_types)
+            if type_ids is None:
+                return None
+            affected_ids.update(type_ids)
+        self.log.info(f'{submission_id}: {len(changed_records)} dataRecords and {len(released_nodes)} released nodes changed, '
+                      f'{len(affected_ids)} out of {checkpoint[CHECKPOINT_RECORD_COUNT]} dataRecords are affected.')
+        return sorted(affected_ids)
+
+    """
+    find node types with properties of CDEs updated after a given time, returns a set of node types or None if failed.
+    """
+    def get_changed_cde_node_types(self, updated_after):
+        cde_node_types = {}
+        for node_type in self.model.get_nodes().keys():
+            for prop_plan in (self.model.get_validation_plan(node_type) or {}).values():
+                if prop_plan.cde_code:
+                    cde_node_types.setdefault(prop_plan.cde_code, set()).add(node_type)
+        if len(cde_node_types) == 0:
+            return set()
+        updated_cdes = self.mongo_dao.get_updated_cdes(cde_node_types.keys(), updated_after)
+        if updated_cdes is None:
+            return None
+        return {node_type for cde in updated_cdes for node_type in cde_node_types.get(cde.get(CDE_CODE), [])}
+
+    """
+    save validation results of a chunk validated by a worker process or current process
+    """
+    def save_pending_chunk(self, data_records, results):
+        if isinstance(results, Future):
+            try:
+                worker_results = results.result()
+                results = []
+                for record, (status, errors, warnings, props) in zip(data_records, worker_results):
+                    # properties may be updated by the validation, e.g. permissible values in wrong case
+                    record[PROPERTIES] = props
+                    results.append((status, errors, warnings))
+            except Exception as e:
+                self.log.exception(e)
+                self.log.exception(f'{self.submission_id}: Failed to validate dataRecords in worker process, validating in current process.')
+                self.resolve_chunk_lookups(data_records)
+                results = self.validate_records(data_records)
+        return self.save_validation_results(data_records, results)
+
+    """
+    check if the lookups of the whole submission are resolved, so its chunks can be validated without querying DB
+    """
+    def is_submission_resolved(self):
+        if self.submission.get(SUBMISSION_INTENTION) == SUBMISSION_INTENTION_DELETE:
+            return True
+        return self.node_key_index is not None and self.one_to_one_children is not None and synonym_index.is_loaded()
+
+    """
+    resolve permissible values of the properties of a chunk of dataRecords in the order validate_props gets them,
+    so CDE lookups, the STS fallback and the CDE not found state are the same as validating the chunk in current process.
+    returns a dict of (nodeType, property name) to the resolved permissible values for worker processes.
+    """
+    def resolve_chunk_permissive_values(self, data_records):
+        chunk_pvs = {}
+        if self.submission.get(SUBMISSION_INTENTION) == SUBMISSION_INTENTION_DELETE:
+            return chunk_pvs
+        for record in data_records:
+            node_plan = self.model.get_validation_plan(record.get(NODE_TYPE))
+            props = record.get(PROPERTIES)
+            if not node_plan or not props:
+                continue
+            for k, v in props.items():
+                prop_plan = node_plan.get(k)
+                if not prop_plan or v is None or not prop_plan.is_valid_type:
+                    continue
+                chunk_pvs[(record.get(NODE_TYPE), k)] = self.get_permissive_value(prop_plan)
+        return chunk_pvs
+
+    """
+    set permissible values resolved by the main process for a chunk of dataRecords
+    """
+    def load_permissive_values(self, chunk_pvs):
+        for (node_type, prop_name), resolved in chunk_pvs.items():
+            self.resolved_pvs[self.model.get_validation_plan(node_type)[prop_name]] = resolved
 
     def validate_nodes(self, data_records):
         #2. loop through all records and call validateNode
+        results = []
+        try:
+            self.resolve_chunk_lookups(data_records)
+            results = self.validate_records(data_records)
+        except Exception as e:
+            self.log.exception(e)
+            msg = f'Failed to validate dataRecords for the submission, {self.submission_id} at scope, {self.scope}!'
+            self.log.exception(msg) 
+            self.isError = True 
+        return self.save_validation_results(data_records, results)
+
+    """
+    resolve parent nodes and released nodes of a chunk of dataRecords with bulk queries,
+    returns the lookups as a tuple of (parent nodes, released parents, released nodes), each is None if not resolved.
+    """
+    def resolve_chunk_lookups(self, data_records):
+        self.chunk_parent_nodes = self.chunk_released_parents = self.chunk_released_nodes = None
+        if self.submission.get(SUBMISSION_INTENTION) != SUBMISSION_INTENTION_DELETE:
+            self.resolve_parent_nodes(data_records)
+        if self.submission.get(SUBMISSION_INTENTION) in [SUBMISSION_INTENTION_NEW_UPDATE, SUBMISSION_INTENTION_DELETE]:
+            self.resolve_released_nodes(data_records)
+        return self.chunk_parent_nodes, self.chunk_released_parents, self.chunk_released_nodes
+
+    """
+    get the nodes in the node key index with the IDs of a chunk of dataRecords, for checking duplicate IDs in a worker process.
+    returns a dict of (nodeType, nodeID) to nodes.
+    """
+    def get_chunk_node_keys(self, data_records):
+        node_keys = {}
+        for record in data_records:
+            id_property = self.model.get_node_id(record.get(NODE_TYPE))
+            id_property_value = (record.get(PROPERTIES) or {}).get(id_property) if id_property else None
+            if id_property_value is None or not is_hashable(id_property_value):
+                continue
+            key = (record.get(NODE_TYPE), id_property_value)
+            node_keys[key] = self.node_key_index.get(key, [])
+        return node_keys
+
+    """
+    get the child nodeIDs of the one_to_one parents of a chunk of dataRecords, for checking one_to_one relationships
+    in a worker process. returns a dict of (nodeType, parentType) to dict of (parentIDPropName, parentIDValue) to child nodeIDs.
+    """
+    def get_chunk_one_to_one_children(self, data_records):
+        chunk_children = {}
+        for record in data_records:
+            node_type = record.get(NODE_TYPE)
+            for parent_node in record.get(PARENTS) or []:
+                children = self.one_to_one_children.get((node_type, parent_node.get(PARENT_TYPE)))
+                if children is None:
+                    continue
+                parent_children = chunk_children.setdefault((node_type, parent_node.get(PARENT_TYPE)), {})
+                key = (parent_node.get(PARENT_ID_NAME), parent_node.get(PARENT_ID_VAL))
+                if is_hashable(key) and key in children:
+                    parent_children[key] = children[key]
+        return chunk_children
+
+    """
+    check if the lookups of a chunk are resolved, so the chunk can be validated without querying DB
+    """
+    def is_chunk_resolved(self, chunk_lookups):
+        parent_nodes, released_parents, released_nodes = chunk_lookups
+        intention = self.submission.get(SUBMISSION_INTENTION)
+        if intention != SUBMISSION_INTENTION_DELETE and (parent_nodes is None or released_parents is None):
+            return False
+        if intention in [SUBMISSION_INTENTION_NEW_UPDATE, SUBMISSION_INTENTION_DELETE] and released_nodes is None:
+            return False
+        return True
+
+    """
+    validation core, validates a chunk of dataRecords against the model and the resolved lookups,
+    returns a list of (status, errors, warnings) in the order of the dataRecords.
+    """
+    def validate_records(self, data_records):
+        if self.columnar and self.submission.get(SUBMISSION_INTENTION) != SUBMISSION_INTENTION_DELETE:
+            self.chunk_prop_results = self.validate_props_columnar(data_records)
+        try:
+            return [self.validate_node(record) for record in data_records]
+        finally:
+            self.chunk_prop_results = None
+
+    """
+    save validation results of a chunk of dataRecords, creates, updates or deletes their qcResults and updates their status.
+    """
+    def save_validation_results(self, data_records, results):
         updated_records = []
         qc_results = []
+        deleted_qc_ids = []
         validated_count = 0
         try:
-            for record in data_records:
+            qc_records = self.get_qc_records(data_records)
+            for record, (status, errors, warnings) in zip(data_records, results):
                 qc_result = None
                 if record.get(QC_RESULT_ID):
-                    qc_result = self.mongo_dao.get_qcRecord(record[QC_RESULT_ID])
-                status, errors, warnings = self.validate_node(record)
+                    qc_result = qc_records.get(record[QC_RESULT_ID]) if qc_records is not None \
+                        else self.mongo_dao.get_qcRecord(record[QC_RESULT_ID])
                 if status == STATUS_PASSED:
                     if qc_result:
-                        self.mongo_dao.delete_qcRecord(qc_result[ID])
+                        deleted_qc_ids.append(qc_result[ID])
                         qc_result = None 
                     record[QC_RESULT_ID] = None
                 else:
                     if not qc_result:
-                        record[QC_RESULT_ID] = None
-                        qc_result = get_qc_result(record, VALIDATION_TYPE_METADATA, self.mongo_dao)
-                    if errors and len(errors) > 0:
-                        self.isError = True
-                        qc_result[ERRORS] = errors
-                        qc_result[QC_SEVERITY] = STATUS_ERROR
-                    else:
-                        qc_result[ERRORS] = []
-                    if warnings and len(warnings)> 0: 
-                        self.isWarning = True
-                        qc_result[WARNINGS] = warnings
-                        if not errors or len(errors) == 0:
-                            qc_result[QC_SEVERITY] = STATUS_WARNING
-                    else:
-                        qc_result[WARNINGS] = []
-
-                    qc_result[QC_VALIDATE_DATE] = current_datetime()
-                    if not qc_result:
-                        record[QC_RESULT_ID] = None
-                        qc_result = get_qc_result(record, VALIDATION_TYPE_METADATA, self.mongo_dao)
+                        qc_result = create_new_qc_result(record, VALIDATION_TYPE_METADATA)
                     if errors and len(errors) > 0:
                         self.isError = True
                         qc_result[ERRORS] = errors
@@ -206,23 +547,27 @@ class MetaDataValidator:
                     record[QC_RESULT_ID] = qc_result[ID]
                     
                 record[STATUS] = status
-                record[UPDATED_AT] = record[VALIDATED_AT] = current_datetime()
+                record[VALIDATED_AT] = current_datetime()
                 updated_records.append(record)
                 validated_count += 1
         except Exception as e:
             self.log.exception(e)
-            msg = f'Failed to validate dataRecords for the submission, {self.submission_id} at scope, {self.scope}!'
+            msg = f'Failed to save validation results for the submission, {self.submission_id} at scope, {self.scope}!'
             self.log.exception(msg) 
             self.isError = True 
 
+        # delete qcResults of passed records
+        if len(deleted_qc_ids) > 0:
+            self.mongo_dao.delete_qcRecords(deleted_qc_ids)
         #3. update data records based on record's _id
         if len(qc_results) > 0:
-            result = self.mongo_dao.save_qc_results(qc_results)
+            result, _ = self.mongo_dao.save_qc_results(qc_results)
             if not result:
                 msg = f'Failed to save qcResults for the submission, {self.submission_id} at scope, {self.scope}!'
                 self.log.error(msg)
-                
-        result = self.mongo_dao.update_data_records_status(updated_records)
+        if len(updated_records) == 0:
+            return validated_count
+        result, _ = self.mongo_dao.update_data_records_status(updated_records)
         if not result:
             #4. set errors in submission
             msg = f'Failed to update dataRecords for the submission, {self.submission_id} at scope, {self.scope}!'
@@ -234,7 +579,7 @@ class MetaDataValidator:
         # set default return values
         errors = []
         warnings = []
-        msg_prefix = f'[{data_record.get(ORIN_FILE_NAME)}: line {data_record.get("lineNumber")}]'
+        msg_prefix = get_msg_prefix(data_record)
         node_type = data_record.get(NODE_TYPE)
         def_file_nodes = self.model.get_file_nodes()
         # submission-level validation
@@ -253,8 +598,11 @@ class MetaDataValidator:
             warnings = result_required.get(WARNINGS, []) +  result_prop_value.get(WARNINGS, []) + result_rel.get(WARNINGS, [])
             #check if existed nodes in release collection
             if sub_intention and sub_intention in [SUBMISSION_INTENTION_NEW_UPDATE, SUBMISSION_INTENTION_DELETE]:
-                exist_releases = self.mongo_dao.search_released_node_with_status(self.submission[DATA_COMMON_NAME], node_type, data_record[NODE_ID], [SUBMISSION_REL_STATUS_RELEASED, None])
-                if sub_intention == SUBMISSION_INTENTION_NEW_UPDATE and (exist_releases and len(exist_releases) > 0):
+                if self.chunk_released_nodes is not None:
+                    exist_releases = (node_type, data_record[NODE_ID]) in self.chunk_released_nodes
+                else:
+                    exist_releases = self.mongo_dao.search_released_node_with_status(self.submission[DATA_COMMON_NAME], node_type, data_record[NODE_ID], [SUBMISSION_REL_STATUS_RELEASED, None])
+                if sub_intention == SUBMISSION_INTENTION_NEW_UPDATE and exist_releases:
                     # check if file node
                     if not node_type in def_file_nodes:
                         warnings.append(create_error("M018", [msg_prefix, node_type, f'{self.model.get_node_id(node_type)}: {data_record[NODE_ID]}'],
@@ -262,7 +610,7 @@ class MetaDataValidator:
                     else:
                         warnings.append(create_error("M018", f'{msg_prefix} “{node_type}”: {{“{self.model.get_node_id(node_type)}": “{data_record[NODE_ID]}"}} already exists and will be updated. Its associated data file will also be replaced if uploaded.',
                                                       NODE_ID, self.model.get_node_id(node_type)))
-                elif sub_intention == SUBMISSION_INTENTION_DELETE and (not exist_releases or len(exist_releases) == 0):
+                elif sub_intention == SUBMISSION_INTENTION_DELETE and not exist_releases:
                     errors.append(create_error("M019", [msg_prefix, node_type, data_record[NODE_ID]], NODE_ID, self.model.get_node_id(node_type)))
             # if there are any errors set the result to "Error"
             if len(errors) > 0:
@@ -298,7 +646,7 @@ class MetaDataValidator:
             result[ERRORS].append(create_error("M022", [msg_prefix, id_property_key], id_property_key, ""))
         else:
             # check if duplicate records
-            results = self.mongo_dao.search_nodes_by_index([{TYPE: node_type, KEY: id_property_key, VALUE_PROP: id_property_value}], self.submission[ID])
+            results = self.get_nodes_by_key(node_type, id_property_key, id_property_value)
             if len(results) > 1:
                 duplicates = ""
                 for item in results:
@@ -330,6 +678,79 @@ class MetaDataValidator:
             result["result"] = STATUS_PASSED
         return result
     
+    """
+    group the distinct child nodeIDs of all one_to_one relationships in the model by parent, with one aggregation per
+    relationship over the submission, and one over the release collection for parents with a single child in the submission.
+    returns a dict of (nodeType, parentType) to dict of (parentIDPropName, parentIDValue) to child nodeIDs,
+    or None if the child nodes can't be retrieved.
+    """
+    def build_one_to_one_children(self, submission_id):
+        one_to_one_children = {}
+        for node_type in self.model.get_nodes().keys():
+            for parent_type, relationship in (self.model.get_node_relationships(node_type) or {}).items():
+                if relationship.get(TYPE) != "one_to_one":
+                    continue
+                groups = self.mongo_dao.get_child_ids_by_parent(submission_id, node_type, parent_type)
+                if groups is None:
+                    return None
+                children = {}
+                for group in groups:
+                    key = (group[ID].get(PARENT_ID_NAME), group[ID].get(PARENT_ID_VAL))
+                    if is_hashable(key):
+                        children[key] = list(set(group["nodeIDs"]))
+                single_child_parents = {key for key, child_ids in children.items() if len(child_ids) == 1}
+                if len(single_child_parents) > 0:
+                    released_groups = self.mongo_dao.get_released_child_ids_by_parent(self.datacommon, node_type, parent_type,
+                                                                                      {key[1] for key in single_child_parents})
+                    if released_groups is None:
+                        return None
+                    for group in released_groups:
+                        key = (group[ID].get(PARENT_ID_NAME), group[ID].get(PARENT_ID_VAL))
+                        if key in single_child_parents:
+                            children[key] = list(set(children[key] + group["nodeIDs"]))
+                one_to_one_children[(node_type, parent_type)] = children
+        return one_to_one_children
+
+    """
+    prefetch existing qcResults of a chunk of dataRecords with one query,
+    returns a dict of qcResult _id to qcResult or None if the qcResults can't be retrieved.
+    """
+    def get_qc_records(self, data_records):
+        qc_ids = list({record[QC_RESULT_ID] for record in data_records if record.get(QC_RESULT_ID)})
+        if len(qc_ids) == 0:
+            return {}
+        qc_records = self.mongo_dao.get_qcRecords(qc_ids)
+        if qc_records is None:
+            return None
+        return {qc_record[ID]: qc_record for qc_record in qc_records}
+
+    """
+    build an index of all nodes in the submission keyed by (nodeType, nodeID) with one streamed query,
+    returns None if the node keys can't be retrieved.
+    """
+    def build_node_key_index(self, submission_id):
+        node_keys = self.mongo_dao.get_node_keys_by_submission(submission_id)
+        if node_keys is None:
+            self.log.error(f'{submission_id}: Failed to build node key index, duplicate IDs will be checked record by record.')
+            return None
+        node_key_index = {}
+        for node_type, node_id, id, file_name, line_number in node_keys:
+            node_key_index.setdefault((node_type, node_id), []).append({ID: id, ORIN_FILE_NAME: file_name, "lineNumber": line_number})
+        self.log.info(f'{submission_id}: {len(node_keys)} nodes are indexed for duplicate ID checking.')
+        return node_key_index
+
+    """
+    find nodes in the submission with the given nodeType and nodeID
+    """
+    def get_nodes_by_key(self, node_type, id_property_key, id_property_value):
+        # nodeIDs are strings, no node can be found by a missing or list value
+        if id_property_value is None or not is_hashable(id_property_value):
+            return []
+        if self.node_key_index is not None:
+            return self.node_key_index.get((node_type, id_property_value), [])
+        results = self.mongo_dao.search_nodes_by_index([{TYPE: node_type, KEY: id_property_key, VALUE_PROP: id_property_value}], self.submission[ID])
+        return results if results else []
+
     def validate_file_name(self, data_record, def_file_nodes, node_type, msg_prefix):
         result = {"result": STATUS_PASSED, ERRORS: [], WARNINGS: []}
         if node_type not in def_file_nodes.keys():
@@ -345,21 +766,245 @@ class MetaDataValidator:
         return result
     
     def validate_props(self, dataRecord, msg_prefix):
+        # use the results of the dataRecord validated in columnar mode, values are corrected after the required properties are checked
+        if self.chunk_prop_results is not None and id(dataRecord) in self.chunk_prop_results:
+            errors, corrected_values = self.chunk_prop_results[id(dataRecord)]
+            for k, v in corrected_values:
+                dataRecord[PROPERTIES][k] = v
+            return {VALIDATION_RESULT: STATUS_ERROR if len(errors) > 0 else STATUS_PASSED, ERRORS: errors, WARNINGS: []}
         # set default return values
         errors = []
-        props_def = self.model.get_node_props(dataRecord.get(NODE_TYPE))
+        node_plan = self.model.get_validation_plan(dataRecord.get(NODE_TYPE))
         props = dataRecord.get(PROPERTIES)
         for k, v in props.items():
-            prop_def = props_def.get(k)
-            if not prop_def or v is None: 
+            prop_plan = node_plan.get(k)
+            if not prop_plan or v is None: 
                 continue
             
-            errs = self.validate_prop_value(k, v, prop_def, msg_prefix, dataRecord)
+            errs = self.validate_prop_value(k, v, prop_plan, msg_prefix, dataRecord)
             if len(errs) > 0:
                 errors.extend(errs)
 
         return {VALIDATION_RESULT: STATUS_ERROR if len(errors) > 0 else STATUS_PASSED, ERRORS: errors, WARNINGS: []}
 
+    """
+    validate properties of a chunk of dataRecords column by column, a column is the values of a property of a node type.
+    returns a dict of id of dataRecord to a tuple of its property errors, in the same order as validate_props, and its
+    corrected values, applied by validate_props. dataRecords not in the dict, e.g. with a value can't be converted
+    or raising exception, are validated by validate_props.
+    """
+    def validate_props_columnar(self, data_records):
+        # permissible values are resolved in the order validate_props gets them, before the columns are validated
+        self.resolve_chunk_permissive_values(data_records)
+        results = {}
+        records_by_type = {}
+        for record in data_records:
+            records_by_type.setdefault(record.get(NODE_TYPE), []).append(record)
+        for node_type, records in records_by_type.items():
+            node_plan = self.model.get_validation_plan(node_type)
+            if node_plan is None:
+                continue
+            fallback = {i for i, record in enumerate(records) if not isinstance(record.get(PROPERTIES), dict)}
+            props_list = [record[PROPERTIES] if i not in fallback else {} for i, record in enumerate(records)]
+            column_errors = {}
+            corrected_values = {}
+            for k in dict.fromkeys(k for props in props_list for k in props):
+                if not node_plan.get(k):
+                    continue
+                column_values = [props.get(k) for props in props_list]
+                rows = [i for i, v in enumerate(column_values) if v is not None]
+                if len(rows) == 0:
+                    continue
+                column = ColumnResult(rows, [column_values[i] for i in rows], records)
+                try:
+                    self.validate_column(node_plan[k], column, records)
+                except Exception as e:
+                    self.log.debug(e)
+                    fallback.update(rows)
+                    continue
+                fallback.update(column.fallback)
+                for i, errors in column.errors.items():
+                    column_errors.setdefault(i, {})[k] = errors
+                for i, v in column.updates:
+                    corrected_values.setdefault(i, []).append((k, v))
+            for i, record in enumerate(records):
+                if i in fallback:
+                    continue
+                record_errors = column_errors.get(i, {})
+                errors = [error for k in record[PROPERTIES].keys() for error in record_errors.get(k, [])]
+                results[id(record)] = (errors, corrected_values.get(i, []))
+        return results
+
+    """
+    validate a column of property values with the same errors and corrected values as validate_prop_value for each value
+    """
+    def validate_column(self, prop_plan, column, records):
+        prop_type = prop_plan.type
+        if not prop_plan.is_valid_type or prop_type not in ["string", "integer", "number", "date", "datetime", "array", "value-list"]:
+            return self.validate_column_values(prop_plan, column, records)
+        permissive_vals, msg = self.get_permissive_value(prop_plan)
+        if permissive_vals and not isinstance(permissive_vals, PermissibleValues):
+            permissive_vals = PermissibleValues(permissive_vals)
+        if msg and msg == CDE_NOT_FOUND:
+            for j, value in enumerate(column.values):
+                column.add_error(j, create_error("M027", [column.prefix(j), prop_plan.name], prop_plan.name, value))
+        if prop_type == "string":
+            if permissive_vals and len(permissive_vals) > 0 and not permissive_vals.is_string:
+                return self.validate_column_values(prop_plan, column, records)
+            self.check_permissive_column(prop_plan, column, [str(value) for value in column.values], permissive_vals,
+                                         range(len(column.values)))
+        elif prop_type in ["integer", "number"]:
+            if permissive_vals and len(permissive_vals) > 0 and permissive_vals.is_string:
+                return self.validate_column_values(prop_plan, column, records)
+            self.validate_numeric_column(prop_plan, column, permissive_vals)
+        elif prop_type in ["date", "datetime"]:
+            for j, value in enumerate(column.values):
+                if date_parser.parse(value) is None:
+                    column.add_error(j, create_error("M007", [column.prefix(j), prop_plan.name, value], prop_plan.name, value))
+        else:
+            if not permissive_vals or len(permissive_vals) == 0:
+                return #skip validation by crdcdh-1723
+            if not permissive_vals.is_string or not isinstance(prop_plan.list_delimiter, str):
+                return self.validate_column_values(prop_plan, column, records)
+            rows = [j for j, value in enumerate(column.values) if isinstance(value, str)]
+            column.fallback_rows(j for j, value in enumerate(column.values) if not isinstance(value, str))
+            items = pd.Series([column.values[j] for j in rows], index=rows, dtype=object).str.split(prop_plan.list_delimiter, regex=False).explode()
+            self.check_permissive_column(prop_plan, column, items.tolist(), permissive_vals, items.index.tolist())
+
+    """
+    check string values of a column against string permissible values with the same errors and corrected values as check_permissive
+    """
+    def check_permissive_column(self, prop_plan, column, values, permissive_vals, rows):
+        if not permissive_vals or len(permissive_vals) == 0:
+            return
+        stripped = pd.Series(values, dtype=object).str.strip()
+        matched = stripped.str.lower().map(permissive_vals.folded_values).tolist()
+        for j, value, stripped_val, matched_val in zip(rows, values, stripped.tolist(), matched):
+            if not isinstance(matched_val, str) or not matched_val:
+                _, error = check_permissive(value, permissive_vals, column.prefix(j), prop_plan.name, self.mongo_dao)
+                column.add_error(j, error)
+            elif stripped_val not in permissive_vals.exact_values:
+                column.updates.append((column.rows[j], matched_val))
+
+    """
+    convert values of an integer or number column and check them against non-string permissible values and boundaries
+    with the same errors as validate_prop_value, values can't be converted are validated by validate_prop_value.
+    """
+    def validate_numeric_column(self, prop_plan, column, permissive_vals):
+        converter = prop_plan.converter
+        values = column.values
+        pattern = INTEGER_PATTERN if converter is int else NUMBER_PATTERN
+        # canonical numeric strings are converted in bulk by numpy, the others one by one by the converter
+        bulk_rows = [j for j, value in enumerate(values) if isinstance(value, str) and pattern.fullmatch(value)]
+        converted = [None] * len(values)
+        if len(bulk_rows) > 0:
+            bulk_values = np.array([values[j] for j in bulk_rows]).astype(np.int64 if converter is int else float).tolist()
+            for j, val in zip(bulk_rows, bulk_values):
+                converted[j] = val
+        if len(bulk_rows) < len(values):
+            for j, value in enumerate(values):
+                if converted[j] is None:
+                    try:
+                        converted[j] = converter(value)
+                    except Exception as e:
+                        column.fallback_rows([j])
+        rows = [j for j, val in enumerate(converted) if val is not None]
+        if permissive_vals and len(permissive_vals) > 0:
+            for j in rows:
+                if converted[j] not in permissive_vals:
+                    _, error = check_permissive(converted[j], permissive_vals, column.prefix(j), prop_plan.name, self.mongo_dao)
+                    column.add_error(j, error)
+        if not prop_plan.minimum and not prop_plan.maximum:
+            return
+        values = [converted[j] for j in rows]
+        below = check_boundary_column(values, prop_plan.minimum, True)
+        above = check_boundary_column(values, prop_plan.maximum, False)
+        for k in sorted(below | above):
+            j, val = rows[k], values[k]
+            if k in below:
+                column.add_error(j, create_error("M011", [column.prefix(j), prop_plan.name, val], prop_plan.name, val))
+            if k in above:
+                column.add_error(j, create_error("M012", [column.prefix(j), prop_plan.name, val], prop_plan.name, val))
+
+    """
+    validate values of a column one by one with validate_prop_value
+    """
+    def validate_column_values(self, prop_plan, column, records):
+        for j, (i, value) in enumerate(zip(column.rows, column.values)):
+            # validate against a copy of the record, the corrected value is applied by validate_props
+            record = {**records[i], PROPERTIES: {}}
+            try:
+                errors = self.validate_prop_value(prop_plan.name, value, prop_plan, column.prefix(j), record)
+            except Exception as e:
+                column.fallback_rows([j])
+                continue
+            column.errors[i] = errors
+            if prop_plan.name in record[PROPERTIES]:
+                column.updates.append((i, record[PROPERTIES][prop_plan.name]))
+
+    """
+    resolve all parent nodes referenced by a chunk of data records with one query per parent type 
+    against dataRecords, and one query per parent type against the release collection for the missing ones.
+    """
+    def resolve_parent_nodes(self, data_records):
+        self.chunk_parent_nodes = None
+        self.chunk_released_parents = None
+        parent_ids = {}
+        for record in data_records:
+            for parent_node in record.get(PARENTS) or []:
+                parent_type = parent_node.get(PARENT_TYPE)
+                parent_id_value = parent_node.get(PARENT_ID_VAL)
+                if parent_type and parent_id_value is not None and is_hashable(parent_id_value):
+                    parent_ids.setdefault((record.get(DATA_COMMON_NAME), parent_type), set()).add(parent_id_value)
+        parent_nodes = set()
+        released_parents = set()
+        for (data_common, parent_type), node_ids in parent_ids.items():
+            exist_parent_nodes = self.mongo_dao.search_nodes_by_type_and_ids(self.submission[ID], parent_type, node_ids)
+            if exist_parent_nodes is None:
+                return False
+            found_ids = set()
+            for node in exist_parent_nodes:
+                found_ids.add(node.get(NODE_ID))
+                if node.get(PROPERTIES):
+                    for key, value in node[PROPERTIES].items():
+                        parent_node_key = tuple([node.get(NODE_TYPE), key, value])
+                        if is_hashable(parent_node_key):
+                            parent_nodes.add(parent_node_key)
+            missing_ids = node_ids - found_ids
+            if len(missing_ids) == 0:
+                continue
+            released_nodes = self.mongo_dao.search_released_nodes_by_ids(data_common, parent_type, missing_ids)
+            if released_nodes is None:
+                return False
+            for node in released_nodes:
+                released_parents.add((data_common, node.get(NODE_TYPE), node.get(NODE_ID)))
+        self.chunk_parent_nodes = parent_nodes
+        self.chunk_released_parents = released_parents
+        return True
+
+    """
+    find the nodes of a chunk of dataRecords existing in release collection with one query per node type,
+    keeps the (nodeType, nodeID) of released nodes in chunk_released_nodes, or None if they can't be retrieved.
+    """
+    def resolve_released_nodes(self, data_records):
+        self.chunk_released_nodes = None
+        node_ids = {}
+        for record in data_records:
+            node_id = record.get(NODE_ID)
+            if is_hashable(node_id):
+                node_ids.setdefault(record.get(NODE_TYPE), set()).add(node_id)
+            else:
+                return False
+        released_nodes = set()
+        for node_type, ids in node_ids.items():
+            exist_releases = self.mongo_dao.search_released_nodes_by_ids(self.submission[DATA_COMMON_NAME], node_type, ids, [SUBMISSION_REL_STATUS_RELEASED, None])
+            if exist_releases is None:
+                return False
+            for node in exist_releases:
+                released_nodes.add((node.get(NODE_TYPE), node.get(NODE_ID)))
+        self.chunk_released_nodes = released_nodes
+        return True
+
     def get_parent_nodes(self, data_record_parent_nodes):
         parent_nodes = []
         for parent_node in data_record_parent_nodes:
@@ -393,7 +1038,7 @@ class MetaDataValidator:
 
         node_keys = self.model.get_node_keys()
         node_relationships = self.model.get_node_relationships(node_type)
-        parent_nodes = self.get_parent_nodes(data_record_parent_nodes)
+        parent_nodes = self.chunk_parent_nodes if self.chunk_parent_nodes is not None else self.get_parent_nodes(data_record_parent_nodes)
         data_common = data_record.get(DATA_COMMON_NAME)
         multi_parents = []
         for parent_node in data_record_parent_nodes:
@@ -439,7 +1084,10 @@ class MetaDataValidator:
                         
             has_parent = (parent_type, parent_id_property, parent_id_value) in parent_nodes
             if not has_parent:
-                released_parent = self.mongo_dao.search_released_node(data_common, parent_type, parent_id_value)
+                if self.chunk_released_parents is not None:
+                    released_parent = (data_common, parent_type, parent_id_value) in self.chunk_released_parents
+                else:
+                    released_parent = self.mongo_dao.search_released_node(data_common, parent_type, parent_id_value)
                 if not released_parent:
                     result[ERRORS].append(create_error("M014", [msg_prefix, parent_type, f'[“{parent_id_property}”: “{parent_id_value}"]'], node_type, node_id))
                 else:
@@ -460,6 +1108,10 @@ class MetaDataValidator:
         return result
     
     def get_unique_child_node_ids(self, data_common, node_type, parent_node, submission_id):
+        if self.one_to_one_children is not None and data_common == self.datacommon:
+            key = (node_type, parent_node[PARENT_TYPE], parent_node[PARENT_ID_NAME], parent_node[PARENT_ID_VAL])
+            if is_hashable(key) and (node_type, parent_node[PARENT_TYPE]) in self.one_to_one_children:
+                return self.one_to_one_children[(node_type, parent_node[PARENT_TYPE])].get(key[2:])
         children = self.mongo_dao.get_nodes_by_parent_prop(node_type, parent_node, submission_id)
         if not children:
             return None
@@ -472,17 +1124,17 @@ class MetaDataValidator:
                 child_id_list = list(set(child_id_list + [item[NODE_ID] for item in children]))
             return child_id_list
 
-    def validate_prop_value(self, prop_name, value, prop_def, msg_prefix, data_record):
+    def validate_prop_value(self, prop_name, value, prop_plan, msg_prefix, data_record):
         # set default return values
         errors = []
-        type = prop_def.get(TYPE)
-        if not type or not type in valid_prop_types:
+        type = prop_plan.type
+        if not prop_plan.is_valid_type:
             errors.append(create_error("M009", [msg_prefix, prop_name, type], prop_name, value))
         else:
             val = None
-            minimum = prop_def.get(MIN)
-            maximum = prop_def.get(MAX)
-            permissive_vals, msg = self.get_permissive_value(prop_def)
+            minimum = prop_plan.minimum
+            maximum = prop_plan.maximum
+            permissive_vals, msg = self.get_permissive_value(prop_plan)
             if msg and msg == CDE_NOT_FOUND:
                 errors.append(create_error("M027", [msg_prefix, prop_name], prop_name, value))
             if type == "string":
@@ -492,7 +1144,7 @@ class MetaDataValidator:
                     errors.append(error)
             elif type == "integer":
                 try:
-                    val = int(value)
+                    val = prop_plan.converter(value)
                 except ValueError as e:
                     errors.append(create_error("M004",[msg_prefix, prop_name, value], prop_name, value))
 
@@ -506,7 +1158,7 @@ class MetaDataValidator:
 
             elif type == "number":
                 try:
-                    val = float(value)
+                    val = prop_plan.converter(value)
                 except ValueError as e:
                     errors.append(create_error("M005", [msg_prefix, prop_name, value], prop_name, value))
                 result, error = check_permissive(val, permissive_vals, msg_prefix, prop_name, self.mongo_dao)
@@ -518,13 +1170,7 @@ class MetaDataValidator:
                     errors.extend(errs)
 
             elif type == "date" or type == "datetime":
-                val = None
-                for date_format in DATE_FORMATS:
-                    try:
-                        val = datetime.strptime(value, date_format)
-                        break #if the value can be parsed with the format
-                    except ValueError as e:
-                        continue
+                val = date_parser.parse(value)
                 if val is None:
                     errors.append(create_error("M007",[msg_prefix, prop_name, value], prop_name, value))
 
@@ -541,7 +1187,7 @@ class MetaDataValidator:
                 if not permissive_vals or len(permissive_vals) == 0: 
                     return errors #skip validation by crdcdh-1723
                 val = str(value)
-                list_delimiter = self.model.get_list_delimiter()
+                list_delimiter = prop_plan.list_delimiter
                 arr = val.split(list_delimiter) if list_delimiter in val else [value]
                 for item in arr:
                     val = item.strip() if item and isinstance(item, str) else item
@@ -554,39 +1200,45 @@ class MetaDataValidator:
         return errors
     
     """
-    get permissible values of a property
+    get permissible values of a property, resolved once per validation since CDEs don't change during a validation
+    """
+    def get_permissive_value(self, prop_plan):
+        resolved = self.resolved_pvs.get(prop_plan)
+        if resolved is None:
+            resolved = self.resolve_permissive_value(prop_plan)
+            self.resolved_pvs[prop_plan] = resolved
+        return resolved
+
     """
-    def get_permissive_value(self, prop_def):
-        permissive_vals = prop_def.get("permissible_values") 
+    resolve permissible values of a property from the model, or its CDE in cache, DB or cde site
+    """
+    def resolve_permissive_value(self, prop_plan):
+        permissive_vals = prop_plan.permissible_values
         msg = None
-        if prop_def.get(CDE_TERM) and len(prop_def.get(CDE_TERM)) > 0:
-            # retrieve permissible values from DB or cde site
-            cde_code = None
-            cde_terms = [ct for ct in prop_def[CDE_TERM] if 'caDSR' in ct.get('Origin', '')]
-            if cde_terms and len(cde_terms) > 0:
-                cde_code = cde_terms[0].get(TERM_CODE) 
-                cde_version = cde_terms[0].get(TERM_VERSION)
+        if prop_plan.has_cde_term:
+            # retrieve permissible values from cache, DB or cde site
+            cde_code, cde_version = prop_plan.cde_code, prop_plan.cde_version
             if not cde_code:
                 return permissive_vals, msg
             
-            cde = self.mongo_dao.get_cde_permissible_values(cde_code, cde_version)
-            if cde:
-                if cde.get(CDE_PERMISSIVE_VALUES) is not None: 
-                    if len(cde.get(CDE_PERMISSIVE_VALUES)) > 0:
-                        permissive_vals = cde[CDE_PERMISSIVE_VALUES]
-                    else:
-                        permissive_vals = None
+            found, cde_pvs = cde_cache.get(cde_code, cde_version)
+            if not found:
+                cde = self.mongo_dao.get_cde_permissible_values(cde_code, cde_version)
+                if cde:
+                    found = True
+                    cde_pvs = cde_cache.put(cde_code, cde_version, cde.get(CDE_PERMISSIVE_VALUES))
+            if found:
+                if cde_pvs is not None: 
+                    permissive_vals = cde_pvs if len(cde_pvs) > 0 else None
             else:
                 if not self.searched_sts:
                     cde = get_pv_by_datacommon_version_cde(self.config[TIER_CONFIG], self.submission[DATA_COMMON_NAME], 
                                                             self.submission[MODEL_VERSION], cde_code, cde_version, self.log, self.mongo_dao)
                     self.searched_sts = True
                     if cde:
-                        if cde.get(CDE_PERMISSIVE_VALUES) is not None:
-                            if len(cde[CDE_PERMISSIVE_VALUES]) > 0:
-                                permissive_vals = cde[CDE_PERMISSIVE_VALUES]
-                            else:
-                                permissive_vals =  None #escape validation
+                        cde_pvs = cde_cache.put(cde_code, cde_version, cde.get(CDE_PERMISSIVE_VALUES))
+                        if cde_pvs is not None:
+                            permissive_vals = cde_pvs if len(cde_pvs) > 0 else None #escape validation if empty
                     else:
                         msg = CDE_NOT_FOUND
                         self.not_found_cde = True
@@ -594,10 +1246,6 @@ class MetaDataValidator:
                     if self.not_found_cde:
                         msg = CDE_NOT_FOUND
 
-                       
-        # strip white space if the value is string
-        if permissive_vals and len(permissive_vals) > 0 and isinstance(permissive_vals[0], str):
-            permissive_vals = [item.strip() for item in permissive_vals]
         return permissive_vals, msg
 
     
@@ -609,9 +1257,11 @@ def check_permissive(value, permissive_vals, msg_prefix, prop_name, dao, data_re
     if value and isinstance(value, str):
         value = value.strip()
     if permissive_vals and len(permissive_vals) > 0:
-        if isinstance(permissive_vals[0], str):
+        if not isinstance(permissive_vals, PermissibleValues):
+            permissive_vals = PermissibleValues(permissive_vals)
+        if permissive_vals.is_string:
             # find value in pv list in case-insensitive if value is string
-            matched_val = next((item for item in permissive_vals if item.lower() == value.lower()), None)
+            matched_val = permissive_vals.match_ignore_case(value)
             if not matched_val: 
                 result = False
             else:
@@ -625,13 +1275,16 @@ def check_permissive(value, permissive_vals, msg_prefix, prop_name, dao, data_re
         if not result:
             error = create_error("M010", [msg_prefix, value, prop_name], prop_name, value)
             # check synonym
-            synonyms = dao.find_pvs_by_synonym(value)
-            if not synonyms or len(synonyms) == 0:
-                return result, error 
-            suggested_pvs = [item[PV_TERM] for item in synonyms]
-            permissive_val = [item for item in permissive_vals if item in suggested_pvs]
-            if permissive_val and len(permissive_val) > 0: 
-                error["description"] += f' It is recommended to use "{permissive_val[0]}", as it is semantically equivalent to "{value}"' 
+            if synonym_index.is_loaded():
+                permissive_val = synonym_index.suggest(value, permissive_vals)
+            else:
+                synonyms = dao.find_pvs_by_synonym(value)
+                if not synonyms or len(synonyms) == 0:
+                    return result, error 
+                suggested_pvs = [item[PV_TERM] for item in synonyms]
+                permissive_val = next((item for item in permissive_vals if item in suggested_pvs), None)
+            if permissive_val is not None: 
+                error["description"] += f' It is recommended to use "{permissive_val}", as it is semantically equivalent to "{value}"' 
     return result, error
 
 def check_boundary(value, min, max, msg_prefix, prop_name):
@@ -650,6 +1303,80 @@ def check_boundary(value, min, max, msg_prefix, prop_name):
 
     return errors
 
+"""
+get message prefix of a dataRecord, file name and line number
+"""
+def get_msg_prefix(data_record):
+    return f'[{data_record.get(ORIN_FILE_NAME)}: line {data_record.get("lineNumber")}]'
+
+"""
+check a column of converted values against a boundary in bulk, returns the set of indexes of the values out of the boundary
+"""
+def check_boundary_column(values, boundary, is_min):
+    if not boundary or not boundary.get(VALUE_PROP) or len(values) == 0:
+        return set()
+    val = boundary.get(VALUE_PROP)
+    exclusive = boundary.get(VALUE_EXCLUSIVE)
+    arr = np.array(values)
+    # compare in float64 only if it is exact for both the values and the boundary, otherwise compare python objects
+    is_exact = type(val) in (int, float) and (type(val) is float or abs(val) < MAX_EXACT_FLOAT_INT)
+    if arr.dtype.kind == "i":
+        is_exact = is_exact and int(np.abs(arr).max()) < MAX_EXACT_FLOAT_INT
+    elif arr.dtype.kind != "f" or not all(type(item) is float for item in values):
+        is_exact = False
+    arr = arr.astype(float) if is_exact else np.array(values, dtype=object)
+    if is_min:
+        result = arr <= val if exclusive else arr < val
+    else:
+        result = arr >= val if exclusive else arr > val
+    return set(np.flatnonzero(np.asarray(result, dtype=bool)).tolist())
+
+class ColumnResult:
+    """
+    Values of a property of the records of a node type in a chunk, and their validation results.
+    rows are the indexes of the records, errors and corrected values are keyed by the record index.
+    """
+    def __init__(self, rows, values, records):
+        self.rows = rows
+        self.values = values
+        self.records = records
+        self.errors = {}
+        self.updates = []
+        self.fallback = set()
+
+    def prefix(self, j):
+        # message prefixes are only needed for the values with errors
+        return get_msg_prefix(self.records[self.rows[j]])
+
+    def add_error(self, j, error):
+        self.errors.setdefault(self.rows[j], []).append(error)
+
+    def fallback_rows(self, column_rows):
+        self.fallback.update(self.rows[j] for j in column_rows)
+
+"""
+initialize a worker process of the parallel validation with its own MongoDB client, the state of the validation
+and the synonym index of the main process.
+"""
+def init_worker(config, state, synonym_terms):
+    global worker_validator
+    worker_validator = MetaDataValidator(MongoDao(config[MONGO_DB], config[DB]), None, config)
+    worker_validator.load_worker_state(state)
+    synonym_index.load_terms(synonym_terms)
+
+"""
+validation core run in a worker process, validates a chunk of dataRecords with the lookups and permissible values
+resolved by the main process, returns a list of (status, errors, warnings, properties) in the order of the dataRecords.
+the node key index and one_to_one children of the worker only have the entries of the chunk.
+"""
+def validate_chunk(data_records, chunk_lookups, chunk_pvs):
+    validator = worker_validator
+    validator.chunk_parent_nodes, validator.chunk_released_parents, validator.chunk_released_nodes, \
+        validator.node_key_index, validator.one_to_one_children = chunk_lookups
+    validator.load_permissive_values(chunk_pvs)
+    results = validator.validate_records(data_records)
+    return [(status, errors, warnings, record.get(PROPERTIES)) for record, (status, errors, warnings) in zip(data_records, results)]
+
 """
 get qc result for the node record by qc_id
 """
@@ -0,0 +1,63 @@
+import pytest
+from unittest.mock import MagicMock
+from pymongo import errors, UpdateOne
+import sys
+import os
+
+current_directory = os.getcwd()
+sys.path.insert(0, current_directory + '/src')
+from src.common.bulk_writer import BulkWriter
+
+
+def get_operations(count, value_size=10):
+    for i in range(count):
+        values = {"value": "x" * value_size}
+        yield UpdateOne({"_id": i}, {"$set": values}), values
+
+
+@pytest.fixture
+def mock_collection():
+    collection = MagicMock()
+    collection.name = "dataRecords"
+    collection.bulk_write.side_effect = lambda batch, ordered: MagicMock(inserted_count=0, matched_count=len(batch),
+        modified_count=len(batch), upserted_count=0, deleted_count=0)
+    return collection
+
+
+def test_batches_bounded_by_count(mock_collection):
+    result = BulkWriter(mock_collection, MagicMock(), batch_size=3, workers=2).write(get_operations(7))
+    assert result.ok
+    assert [batch.count for batch in result.batches] == [3, 3, 1]
+    assert [batch.offset for batch in result.batches] == [0, 3, 6]
+    assert result.modified_count == 7
+    assert all(call.kwargs["ordered"] is False for call in mock_collection.bulk_write.call_args_list)
+
+
+def test_batches_bounded_by_bytes(mock_collection):
+    # each document is about 30 bytes, a document larger than the bound is written in its own batch
+    result = BulkWriter(mock_collection, MagicMock(), batch_bytes=70).write(get_operations(5))
+    assert [batch.count for batch in result.batches] == [2, 2, 1]
+    result = BulkWriter(mock_collection, MagicMock(), batch_bytes=10).write(get_operations(2))
+    assert [batch.count for batch in result.batches] == [1, 1]
+
+
+def test_failed_batches(mock_collection):
+    def bulk_write(batch, ordered):
+        if batch[0]._filter["_id"] == 0:
+            raise errors.BulkWriteError({"nModified": 1, "writeErrors": [{"index": 1, "errmsg": "bad document"}]})
+        if batch[0]._filter["_id"] == 2:
+            raise errors.AutoReconnect("connection lost")
+        return MagicMock(inserted_count=0, matched_count=len(batch), modified_count=len(batch), upserted_count=0, deleted_count=0)
+    mock_collection.bulk_write.side_effect = bulk_write
+    result = BulkWriter(mock_collection, MagicMock(), batch_size=2).write(get_operations(6))
+    assert not result.ok
+    assert result.modified_count == 3
+    assert [write_error["index"] for write_error in result.write_errors] == [1]
+    assert [batch.index for batch in result.failed_batches] == [1]
+    assert "bad document" in result.get_error_msg()
+
+
+def test_no_operations(mock_collection):
+    result = BulkWriter(mock_collection, MagicMock()).write([])
+    assert result.ok and not result.batches
+    mock_collection.bulk_write.assert_not_called()
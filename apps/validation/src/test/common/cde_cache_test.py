@@ -0,0 +1,60 @@
+import pytest
+import sys
+import os
+
+current_directory = os.getcwd()
+sys.path.insert(0, current_directory + '/src')
+from src.common.cde_cache import CDEPermissibleValueCache, PermissibleValues
+
+
+@pytest.fixture
+def cache():
+    return CDEPermissibleValueCache(ttl=3600, max_size=2)
+
+
+def test_permissible_values_match():
+    pvs = PermissibleValues([" Male", "Female ", "male"])
+    assert pvs.values == ["Male", "Female", "male"]
+    assert "Male" in pvs
+    assert "MALE" not in pvs
+    # the first value in the list wins in case-insensitive matching
+    assert pvs.match_ignore_case("MALE") == "Male"
+    assert pvs.match_ignore_case("unknown") is None
+
+
+def test_permissible_values_non_string():
+    pvs = PermissibleValues([1, 2, 3])
+    assert not pvs.is_string
+    assert 2 in pvs
+    assert 2.0 in pvs
+    assert 4 not in pvs
+
+
+def test_cache_hit_and_miss(cache):
+    assert cache.get("123", "1.0") == (False, None)
+    compiled = cache.put("123", "1.0", ["a", "b"])
+    found, pvs = cache.get("123", "1.0")
+    assert found and pvs is compiled
+    assert cache.stats() == {"size": 1, "hits": 1, "misses": 1}
+
+
+def test_cache_keeps_undefined_permissible_values(cache):
+    cache.put("123", None, None)
+    assert cache.get("123", None) == (True, None)
+
+
+def test_cache_eviction(cache):
+    cache.put("1", None, ["a"])
+    cache.put("2", None, ["b"])
+    cache.get("1", None)
+    cache.put("3", None, ["c"])
+    # "2" is the least recently used entry
+    assert cache.get("2", None) == (False, None)
+    assert cache.get("1", None)[0]
+    assert cache.get("3", None)[0]
+
+
+def test_cache_expiration(cache):
+    cache.put("1", None, ["a"])
+    cache.configure(ttl=-1)
+    assert cache.get("1", None) == (False, None)
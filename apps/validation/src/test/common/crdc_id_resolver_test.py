@@ -0,0 +1,58 @@
+import pytest
+from unittest.mock import MagicMock
+import sys
+import os
+
+current_directory = os.getcwd()
+sys.path.insert(0, current_directory + '/src')
+from src.common.crdc_id_resolver import CrdcIdResolver
+
+
+@pytest.fixture
+def mock_mongo_dao():
+    mock_dao = MagicMock()
+    mock_dao.search_released_nodes_crdc.return_value = [
+        {"nodeID": "n1", "CRDC_ID": "released-1", "submissionID": "s1", "status": "Released"},
+        {"nodeID": "n2", "CRDC_ID": "released-2", "submissionID": "s1", "status": "Deleted"},
+    ]
+    mock_dao.search_nodes_crdc.return_value = [
+        {"nodeID": "n2", "CRDC_ID": "record-2-deleted", "submissionID": "s1"},
+        {"nodeID": "n2", "CRDC_ID": "record-2", "submissionID": "s2"},
+        {"nodeID": "n3", "submissionID": "s2"},
+    ]
+    mock_dao.search_study_nodes_crdc.return_value = [{"nodeID": "n3", "CRDC_ID": "study-3"}]
+    return mock_dao
+
+
+@pytest.fixture
+def mock_model():
+    model = MagicMock()
+    model.get_entity_type.return_value = "sample"
+    return model
+
+
+def test_resolve(mock_mongo_dao, mock_model):
+    resolver = CrdcIdResolver(mock_mongo_dao, "DC", mock_model)
+    crdc_ids = resolver.resolve("sample", ["n1", "n2", "n3", "n4"], "study")
+    assert crdc_ids["n1"] == "released-1"
+    assert crdc_ids["n2"] == "record-2"
+    assert crdc_ids["n3"] == "study-3"
+    assert crdc_ids["n4"] not in ["released-1", "record-2", "study-3", None]
+    mock_mongo_dao.search_nodes_crdc.assert_called_once()
+    assert set(mock_mongo_dao.search_nodes_crdc.call_args[0][2]) == {"n2", "n3", "n4"}
+    assert mock_mongo_dao.search_study_nodes_crdc.call_args[0][2] == {"n3", "n4"}
+
+
+def test_resolve_memoized(mock_mongo_dao, mock_model):
+    resolver = CrdcIdResolver(mock_mongo_dao, "DC", mock_model)
+    crdc_ids = resolver.resolve("sample", ["n1", "n4"], "study")
+    mock_mongo_dao.search_released_nodes_crdc.reset_mock()
+    assert resolver.resolve("sample", ["n4", "n1"], "study") == crdc_ids
+    mock_mongo_dao.search_released_nodes_crdc.assert_not_called()
+    assert resolver.resolve("sample", ["n4"], "other study")["n4"] != crdc_ids["n4"]
+
+
+def test_resolve_failed(mock_mongo_dao, mock_model):
+    mock_mongo_dao.search_released_nodes_crdc.return_value = None
+    with pytest.raises(Exception):
+        CrdcIdResolver(mock_mongo_dao, "DC", mock_model).resolve("sample", ["n1"], "study")
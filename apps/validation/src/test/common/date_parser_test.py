@@ -0,0 +1,34 @@
+import pytest
+import sys
+import os
+from datetime import datetime
+
+current_directory = os.getcwd()
+sys.path.insert(0, current_directory + '/src')
+from src.common.date_parser import DateParser, compile_shape
+
+FORMATS = ["%m/%d/%Y", "%m-%d-%Y", "%Y-%m-%d", "%Y%m%d", "%Y/%m/%d", "%Y-%m-%dT%H:%M:%S",
+           "%Y-%m-%d %H:%M:%S", "%d-%b-%Y", "%Y-%m-%dT%H:%M:%S.%f%z", "%Y-%j %Q"]
+VALUES = ["01/02/2020", "1/2/2020", "13/02/2020", "02/30/2020", "2020-01-02", "20200102", "2020112",
+          "2020/1/2", "2020-01-02T03:04:05", "2020-01-02t03:04:05", "2020-01-02   03:04:05", "2020-01-02 03:04",
+          " 2-Jan-2020", "02-JAN-2020", "02-Janu-2020", "2020-01-02T03:04:05.123456+05:30", "2020-01-02T03:04:05.1Z",
+          "2020-01-02T03:04:05.1z", "２０２０-01-02", "", " ", "2020-01-02 ", "unknown", "2020-001 1"]
+
+
+def strptime_any(value):
+    for date_format in FORMATS:
+        try:
+            return datetime.strptime(value, date_format)
+        except ValueError:
+            continue
+    return None
+
+
+@pytest.mark.parametrize("value", VALUES)
+def test_parse_same_as_strptime(value):
+    assert DateParser(FORMATS).parse(value) == strptime_any(value)
+
+
+def test_unknown_directive_is_always_tried():
+    assert compile_shape("%Y-%Q") is None
+    assert compile_shape("%d %b %Y").fullmatch(" 2   jan 2020")
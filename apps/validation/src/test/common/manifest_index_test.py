@@ -0,0 +1,59 @@
+import pytest
+from unittest.mock import MagicMock
+import sys
+import os
+
+current_directory = os.getcwd()
+sys.path.insert(0, current_directory + '/src')
+from src.common.manifest_index import ManifestIndex, ManifestIndexCache
+
+FILE_RECORDS = [
+    {"s3FileInfo": {"fileName": "a.txt", "md5": "m1"}},
+    {"s3FileInfo": {"fileName": "a.txt", "md5": "m1"}},
+    {"s3FileInfo": {"fileName": "a.txt", "md5": "m2"}},
+    {"s3FileInfo": {"fileName": "b.txt", "md5": "m2"}},
+    {"s3FileInfo": {"fileName": "c.txt", "md5": "m3"}},
+]
+
+
+@pytest.mark.parametrize("file_name, md5, expected", [
+    ("a.txt", "m1", (2, 1, 0)),
+    ("a.txt", "m2", (1, 2, 1)),
+    ("b.txt", "m2", (1, 0, 1)),
+    ("c.txt", "m3", (1, 0, 0)),
+])
+def test_duplicate_counts(file_name, md5, expected):
+    index = ManifestIndex(FILE_RECORDS)
+    assert index.count == 5
+    assert (index.count_same_name_md5(file_name, md5), index.count_same_name_other_md5(file_name, md5),
+            index.count_same_md5_other_name(file_name, md5)) == expected
+
+
+def test_cache_built_once_per_validation():
+    mock_dao = MagicMock()
+    mock_dao.get_file_manifest.return_value = FILE_RECORDS
+    cache = ManifestIndexCache(max_size=1)
+    index = cache.get(mock_dao, "s1", "v1")
+    assert cache.get(mock_dao, "s1", "v1") is index
+    mock_dao.get_file_manifest.assert_called_once()
+    # a new validation reads the file records again
+    mock_dao.get_file_manifest.return_value = FILE_RECORDS[1:]
+    assert cache.get(mock_dao, "s1", "v2").count == 4
+    cache.get(mock_dao, "s2", "v3")
+    assert cache.stats() == {"size": 1, "hits": 1, "misses": 3}
+
+
+def test_not_cached_without_validation():
+    mock_dao = MagicMock()
+    mock_dao.get_file_manifest.return_value = FILE_RECORDS
+    cache = ManifestIndexCache()
+    assert cache.get(mock_dao, "s1").count == 5
+    assert cache.get(mock_dao, "s1") is not None
+    assert mock_dao.get_file_manifest.call_count == 2
+    assert cache.stats()["size"] == 0
+
+
+def test_cache_failed():
+    mock_dao = MagicMock()
+    mock_dao.get_file_manifest.return_value = None
+    assert ManifestIndexCache().get(mock_dao, "s1", "v1") is None
@@ -0,0 +1,101 @@
+import pytest
+from unittest.mock import MagicMock
+import sys
+import os
+
+current_directory = os.getcwd()
+sys.path.insert(0, current_directory + '/src')
+from src.common.mongo_dao import MongoDao, get_keyset_query
+from src.common.constants import ID, SUBMISSION_ID, NODE_TYPE, NODE_ID, STATUS, STATUS_NEW, STATUS_PASSED, DATA_COLlECTION
+
+
+def match(record, query):
+    for key, condition in query.items():
+        if key == "$and":
+            if not all(match(record, sub_query) for sub_query in condition):
+                return False
+        elif key == "$or":
+            if not any(match(record, sub_query) for sub_query in condition):
+                return False
+        elif isinstance(condition, dict):
+            value = record.get(key)
+            for operator, operand in condition.items():
+                if operator == "$eq" and value != operand or operator == "$ne" and value == operand \
+                        or operator == "$gt" and (value is None or value <= operand) or operator == "$nin" and value in operand:
+                    return False
+        elif record.get(key) != condition:
+            return False
+    return True
+
+
+class FakeCursor:
+    def __init__(self, records):
+        self.records = records
+
+    def sort(self, sort):
+        # records with the same sort key are returned in any order, like MongoDB does
+        self.records.sort(key=lambda record: tuple(record.get(key) for key, _ in sort))
+        return self
+
+    def limit(self, size):
+        return self.records[:size]
+
+
+class FakeCollection:
+    def __init__(self, records):
+        self.records = records
+        self.queries = []
+
+    def find(self, query):
+        self.queries.append(query)
+        return FakeCursor([record for record in reversed(self.records) if match(record, query)])
+
+
+def get_records():
+    keys = [("file", "f1"), ("sample", "s1"), ("sample", "s1"), ("sample", "s1"), ("sample", "s2"), ("study", "p1"),
+            ("study", "p1"), ("sample", "s3"), ("file", "f2"), ("sample", "s1")]
+    return [{ID: f"r{index}", SUBMISSION_ID: "sub", NODE_TYPE: node_type, NODE_ID: node_id, STATUS: STATUS_NEW}
+            for index, (node_type, node_id) in enumerate(keys)] + \
+        [{ID: "other", SUBMISSION_ID: "sub2", NODE_TYPE: "sample", NODE_ID: "s1", STATUS: STATUS_NEW}]
+
+
+def get_mongo_dao(collection):
+    mongo_dao = MongoDao.__new__(MongoDao)
+    mongo_dao.client = {"db": {DATA_COLlECTION: collection}}
+    mongo_dao.db_name = "db"
+    mongo_dao.log = MagicMock()
+    return mongo_dao
+
+
+def test_keyset_query():
+    assert match({NODE_TYPE: "sample", NODE_ID: "s1", ID: "r3"}, get_keyset_query(("sample", "s1"), ["r1", "r2"]))
+    assert not match({NODE_TYPE: "sample", NODE_ID: "s1", ID: "r2"}, get_keyset_query(("sample", "s1"), ["r1", "r2"]))
+    assert match({NODE_TYPE: "sample", NODE_ID: "s2", ID: "r1"}, get_keyset_query(("sample", "s1"), ["r1"]))
+    assert not match({NODE_TYPE: "file", NODE_ID: "s9", ID: "r9"}, get_keyset_query(("sample", "s1"), ["r1"]))
+    assert match({NODE_TYPE: "study", NODE_ID: "a", ID: "r9"}, get_keyset_query(("sample", "s1"), ["r1"]))
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 4, 100])
+@pytest.mark.parametrize("scope", [STATUS_NEW, "All"])
+def test_duplicated_keys_across_chunks(size, scope):
+    records = get_records()
+    collection = FakeCollection(records)
+    chunks = []
+    for chunk in get_mongo_dao(collection).get_dataRecords_chunks("sub", scope, size=size):
+        assert chunk is not None and 0 < len(chunk) <= size
+        chunks.append([record[ID] for record in chunk])
+        # validated records leave New status before the next chunk is retrieved
+        for record in chunk:
+            record[STATUS] = STATUS_PASSED
+    ids = [id for chunk in chunks for id in chunk]
+    # every record is read exactly once, in the order of (nodeType, nodeID)
+    assert sorted(ids) == sorted(record[ID] for record in records if record[SUBMISSION_ID] == "sub")
+    keys = [(record[NODE_TYPE], record[NODE_ID]) for id in ids for record in records if record[ID] == id]
+    assert keys == sorted(keys)
+    assert len(collection.queries) == len(ids) // size + 1
+
+
+def test_failed_chunk():
+    collection = MagicMock()
+    collection.find.side_effect = Exception("failed")
+    assert list(get_mongo_dao(collection).get_dataRecords_chunks("sub", size=2)) == [None]
@@ -0,0 +1,93 @@
+import pytest
+import re
+from unittest.mock import MagicMock
+import sys
+import os
+
+current_directory = os.getcwd()
+sys.path.insert(0, current_directory + '/src')
+from src import metadata_validator
+from src.metadata_validator import check_permissive
+from src.common.synonym_index import SynonymIndex
+from src.common.constants import SYNONYM_TERM, PV_TERM
+
+SYNONYMS = [
+    {SYNONYM_TERM: "bloody", PV_TERM: "Blood"},
+    {SYNONYM_TERM: "Tumor mass", PV_TERM: "Tumor"},
+    {SYNONYM_TERM: "tumour", PV_TERM: "Neoplasm"},
+    {SYNONYM_TERM: "neoplastic", PV_TERM: "Neoplasm"},
+    {SYNONYM_TERM: "axb", PV_TERM: "Bone"},
+    {SYNONYM_TERM: "a.b", PV_TERM: "Skin"},
+    {SYNONYM_TERM: "left (arm)", PV_TERM: "Arm"},
+    {SYNONYM_TERM: None, PV_TERM: "Leg"},
+    {SYNONYM_TERM: "leg", PV_TERM: None},
+]
+PERMISSIVE_VALUES = ["Neoplasm", "Tumor", "Blood", "Bone", "Skin", "Arm", "Leg"]
+VALUES = ["blo", "BLOODY", "bloody ", "tum", "Tumor Mass", "neo", "blood", "plasm", "a.b", "A.B", "a+b", "(", "(arm)",
+          "left (arm)", "^neo", "mass$", "le", "leg", "x", "", "[", "*a", "c++", ".*"]
+
+
+def find_pvs_by_synonym(synonym):
+    """
+    search synonyms like the $regex query on the synonym term and equivalent term of the synonyms collection,
+    an invalid regex fails the query.
+    """
+    try:
+        pattern = re.compile(synonym, re.IGNORECASE)
+    except re.error:
+        return None
+    return [synonym_doc for synonym_doc in SYNONYMS if any(isinstance(term, str) and pattern.search(term)
+                                                           for term in (synonym_doc[SYNONYM_TERM], synonym_doc[PV_TERM]))]
+
+
+def get_suggestions(value, permissive_vals, index):
+    mongo_dao = MagicMock()
+    mongo_dao.find_pvs_by_synonym.side_effect = find_pvs_by_synonym
+    metadata_validator.synonym_index.load_terms(index.get_terms())
+    result, error = check_permissive(value, permissive_vals, "[test.tsv: line 2]", "tissue", mongo_dao)
+    if error is None:
+        return None
+    # synonyms are searched in DB only if the index is not loaded
+    assert mongo_dao.find_pvs_by_synonym.called != index.is_loaded()
+    return error["description"]
+
+
+@pytest.fixture
+def index():
+    mongo_dao = MagicMock()
+    mongo_dao.count_docs.return_value = len(SYNONYMS)
+    mongo_dao.get_synonyms.return_value = SYNONYMS
+    index = SynonymIndex()
+    assert index.refresh(mongo_dao)
+    yield index
+    metadata_validator.synonym_index.load_terms((None, {}, {}))
+
+
+@pytest.mark.parametrize("permissive_vals", [PERMISSIVE_VALUES, PERMISSIVE_VALUES[::-1]])
+@pytest.mark.parametrize("value", VALUES)
+def test_suggest_same_as_regex_query(index, value, permissive_vals):
+    assert get_suggestions(value, permissive_vals, index) == get_suggestions(value, permissive_vals, SynonymIndex())
+
+
+@pytest.mark.parametrize("value, permissive_vals, suggested", [
+    ("blo", PERMISSIVE_VALUES, "Blood"),
+    # a value matching synonyms of several permissible values suggests the first one in the permissible values
+    ("tum", PERMISSIVE_VALUES, "Neoplasm"),
+    ("tum", PERMISSIVE_VALUES[::-1], "Tumor"),
+    # equivalent terms are matched too
+    ("plasm", PERMISSIVE_VALUES, "Neoplasm"),
+    # values are matched as regex
+    ("a.b", PERMISSIVE_VALUES, "Bone"),
+    ("(arm)", PERMISSIVE_VALUES, "Arm"),
+    ("x", PERMISSIVE_VALUES, "Bone"),
+    # an invalid regex fails the query
+    ("(", PERMISSIVE_VALUES, None),
+    ("*a", PERMISSIVE_VALUES, None),
+    ("z", PERMISSIVE_VALUES, None),
+])
+def test_suggestion(index, value, permissive_vals, suggested):
+    description = get_suggestions(value, permissive_vals, index)
+    if suggested:
+        assert description.endswith(f'It is recommended to use "{suggested}", as it is semantically equivalent to "{value}"')
+    else:
+        assert "It is recommended to use" not in description
@@ -0,0 +1,58 @@
+import pytest
+import sys
+import os
+import pandas as pd
+
+current_directory = os.getcwd()
+sys.path.insert(0, current_directory + '/src')
+from src.common.tsv_parser import parse_tsv, parse_tsv_arrow, get_column_names, TSV_ENGINE_PANDAS, TSV_ENGINE_PYARROW, \
+    WHITESPACE_CHARS
+
+FILES = [
+    "type\tid\tvalue\n\nsample\t s1 \tNA\nsample\ts2\t\n\t\t\n",
+    "type\tid\t\tid\nsample\t\"s\n1\"\t\t5'1\"\nsample\t\"a\"\"b\"\tx\t\n",
+    " type \tid\nsample\ts1\x1c\n",
+    "id\nNA\n \ns2\n",
+    "type\tid\n",
+]
+
+
+@pytest.mark.parametrize("data", FILES)
+def test_engines_same_frame(data, tmp_path):
+    pytest.importorskip("pyarrow")
+    file_path = tmp_path / "test.tsv"
+    file_path.write_text(data)
+    expected = parse_tsv(str(file_path), TSV_ENGINE_PANDAS)
+    parsed = parse_tsv(str(file_path), TSV_ENGINE_PYARROW)
+    assert parsed.df.equals(expected.df)
+    assert list(parsed.df.columns) == list(expected.df.columns)
+    assert parsed.get_validation_frame().equals(expected.get_validation_frame())
+
+
+@pytest.mark.parametrize("data, error", [
+    ("type\tid\nsample\ts1\nsample\ts2\textra\n", pd.errors.ParserError),
+    (b"type\tid\nsample\t\xff\n", UnicodeDecodeError),
+    ("", pd.errors.EmptyDataError),
+])
+def test_invalid_files_read_by_pandas(data, error, tmp_path):
+    pytest.importorskip("pyarrow")
+    file_path = tmp_path / "test.tsv"
+    file_path.write_bytes(data if isinstance(data, bytes) else data.encode())
+    assert parse_tsv_arrow(str(file_path)) is None
+    with pytest.raises(error):
+        parse_tsv(str(file_path), TSV_ENGINE_PYARROW)
+
+
+def test_column_names():
+    assert get_column_names(["a", "", "a", "a.1", "a"]) == ["a", "Unnamed: 1", "a.1", "a.1.1", "a.2"]
+
+
+def test_whitespace_chars():
+    assert set(WHITESPACE_CHARS) == {chr(c) for c in range(sys.maxunicode + 1) if chr(c).isspace()}
+
+
+def test_invalid_engine(tmp_path):
+    file_path = tmp_path / "f.tsv"
+    file_path.write_text("type\tid\nsample\t1\n")
+    with pytest.raises(ValueError):
+        parse_tsv(str(file_path), "polars")
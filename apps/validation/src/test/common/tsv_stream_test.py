@@ -0,0 +1,77 @@
+import pytest
+import sys
+import os
+import io
+import pandas as pd
+
+current_directory = os.getcwd()
+sys.path.insert(0, current_directory + '/src')
+from src.common.tsv_parser import parse_tsv
+from src.common.tsv_stream import StreamedTsv, RowKeyIndex, read_records, trim_tailing_columns
+
+FILES = [
+    "type\tid\tvalue\nsample\ts1\tNA\nsample\ts2\t b \n\nsample\ts3\t\n\t\t\n",
+    "type\tid\t\nsample\ts1\t\nsample\ts2\textra\nsample\t\t\n",
+    'type\tid\tnote\nsample\t"s\n1"\t5\'1"\nsample\ts2\t"a""b"\nsample\ts3\tx"y\n',
+    "type\tid\n",
+]
+
+
+class FakeS3Service:
+    def __init__(self, data):
+        self.data = data
+
+    def get_file_stream(self, bucket_name, key):
+        return io.BytesIO(self.data)
+
+
+def read_streamed(data, chunk_rows):
+    streamed_file = StreamedTsv(FakeS3Service(data.encode()), "bucket", "key", "test.tsv", chunk_rows)
+    return [chunk.get_validation_frame() for chunk in streamed_file.read_chunks()]
+
+
+@pytest.mark.parametrize("data", FILES)
+@pytest.mark.parametrize("chunk_rows", [1, 2, 100])
+def test_chunks_same_as_whole_file(data, chunk_rows, tmp_path):
+    file_path = tmp_path / "test.tsv"
+    file_path.write_text(data)
+    expected = parse_tsv(str(file_path)).get_validation_frame()
+    df = pd.concat(read_streamed(data, chunk_rows))
+    assert df.equals(expected)
+    assert list(df.columns) == list(expected.columns)
+
+
+@pytest.mark.parametrize("chunk_rows", [1, 2, 100])
+def test_extra_field_error_line(chunk_rows):
+    data = 'type\tid\nsample\t"s\n1"\n\nsample\ts2\textra\n'
+    with pytest.raises(pd.errors.ParserError, match="Expected 2 fields in line 4, saw 3"):
+        read_streamed(data, chunk_rows)
+
+
+def test_empty_file():
+    with pytest.raises(pd.errors.EmptyDataError):
+        read_streamed("", 1)
+
+
+def test_records_split_on_quoted_line_breaks():
+    records = list(read_records(io.BytesIO(b'a\t"b\n""c"\nd\n'), read_size=3))
+    assert records == [(1, b'a\t"b\n""c"\n'), (2, b'd\n')]
+    # a quote in the middle of a value does not start a quoted value
+    records = list(read_records(io.BytesIO(b'a\t5\'1"\nd\n'), read_size=3))
+    assert records == [(1, b'a\t5\'1"\n'), (2, b'd\n')]
+
+
+def test_trim_tailing_columns():
+    columns = ["type", "Unnamed: 1", "Unnamed: 2"]
+    assert trim_tailing_columns(columns, {"type": 1, "Unnamed: 1": 1, "Unnamed: 2": 0}) == ["type", "Unnamed: 1"]
+
+
+def test_row_key_index(tmp_path):
+    row_keys = RowKeyIndex(str(tmp_path))
+    row_keys.add_rows([(0, "a", '["p1"]', 1), (1, "b", '["p1"]', 1), (2, "a", '["p2"]', 1), (3, "a", '["p3"]', 2)])
+    assert list(row_keys.get_repeated_ids()) == ["a", "a"]
+    assert list(row_keys.get_duplicated_rows()) == [(0, "a"), (2, "a"), (3, "a")]
+    assert row_keys.get_duplicated_row_keys() == [(0, "a", '["p1"]', 1), (2, "a", '["p2"]', 1), (3, "a", '["p3"]', 2)]
+    assert row_keys.get_multi_row_ids() == {"a"}
+    row_keys.close()
+    assert not os.path.exists(row_keys.db_path)
@@ -0,0 +1,232 @@
+import pytest
+import copy
+import datetime
+from unittest.mock import MagicMock, patch
+import sys
+import os
+import pandas as pd
+import numpy as np
+
+current_directory = os.getcwd()
+sys.path.insert(0, current_directory + '/src')
+from src import data_loader
+from src.data_loader import DataLoader
+from src.common.utils import removeTailingEmptyColumnsAndRows
+from src.common.constants import TYPE, ID, SUBMISSION_ID, STATUS, STATUS_NEW, NODE_ID, ERRORS, WARNINGS, CREATED_AT, \
+    UPDATED_AT, S3_FILE_INFO, DATA_COMMON_NAME, QC_RESULT_ID, BATCH_IDS, FILE_NAME_FIELD, FILE_SIZE_FIELD, FILE_MD5_FIELD, \
+    NODE_TYPE, PARENTS, CRDC_ID, PROPERTIES, ORIN_FILE_NAME, ADDITION_ERRORS, RAW_DATA, DCF_PREFIX, ID_FIELD, ENTITY_TYPE, \
+    STUDY_ID, DISPLAY_ID, UPLOADED_DATE, LATEST_BATCH_ID, LATEST_BATCH_DISPLAY_ID, PARENT_TYPE
+
+NOW = datetime.datetime(2024, 1, 1)
+EXIST_DATE = datetime.datetime(2023, 1, 1)
+FILES = {
+    # extra white spaces, empty values, tailing empty columns and rows
+    "sample.tsv": "type\tsample_id\tstudy.study_id\t name \tage\t\n"
+                  "sample\ts1\tp1\ta\t1\t\n"
+                  "sample\t s2 \tp1\t b \t\t\n"
+                  "sample\ts3\t\t\t3\t\n"
+                  "\t\t\t\t\t\n",
+    "file.tsv": "type\tfile_id\tfile_name\tfile_size\tmd5sum\tsample.sample_id\n"
+                "file\tf1\ta.txt\t10\tmd5a\ts1\n"
+                "file\tdg.4DFC/f2\tb.txt\t20\tmd5b\ts2\n"
+                "file\t\tc.txt\t\t\ts3\n",
+}
+FILE_NODES = {"file": {ID_FIELD: "file_id", FILE_NAME_FIELD: "file_name", FILE_SIZE_FIELD: "file_size", FILE_MD5_FIELD: "md5sum"}}
+MAIN_NODES = {"sample": {}, "file": {}, "participant": {}}
+EXIST_NODES = {
+    ("sample", "s1"): {ID: "r1", NODE_TYPE: "sample", NODE_ID: "s1", BATCH_IDS: ["b1"], CREATED_AT: EXIST_DATE, QC_RESULT_ID: "qc1", CRDC_ID: "c1"},
+    ("sample", "s2"): {ID: "r2", NODE_TYPE: "sample", NODE_ID: "s2", BATCH_IDS: ["b1", "b2"], CREATED_AT: EXIST_DATE, CRDC_ID: "c2"},
+    ("file", "dg.4DFC/f2"): {ID: "r3", NODE_TYPE: "file", NODE_ID: "dg.4DFC/f2", BATCH_IDS: ["b2"], CREATED_AT: EXIST_DATE, QC_RESULT_ID: "qc3"},
+    ("sample", "s9"): {ID: "r9", NODE_TYPE: "sample", NODE_ID: "s9", BATCH_IDS: ["b1"], CREATED_AT: EXIST_DATE, QC_RESULT_ID: "qc9"},
+}
+
+
+class RowLoader(DataLoader):
+    """
+    loads the rows of a file one by one, as the data loader did before the dataRecords were built in bulk,
+    searching the existing dataRecord and CRDC ID and deleting the qcResult of each row.
+    """
+    def load_rows(self, file):
+        file_types = [k for (k, v) in self.file_nodes.items()]
+        main_node_types = [k for (k, v) in self.main_nodes.items()]
+        records = []
+        file_name = os.path.basename(file)
+        df = pd.read_csv(file, sep='\t', header=0, dtype='str', encoding='utf8', keep_default_na=False, na_values=[''])
+        # all columns are read as strings, whether their dtype is object or str
+        df = (df.rename(columns=lambda x: x.strip())).apply(lambda x: x.str.strip())
+        df = removeTailingEmptyColumnsAndRows(df)
+        df = df.replace({np.nan: None})
+        df = df.reset_index()
+        col_names = list(df.columns)
+        for index, row in df.iterrows():
+            type = row[TYPE]
+            node_id = self.get_node_id(type, row)
+            exist_node = self.mongo_dao.get_dataRecord_by_node(node_id, type, self.batch[SUBMISSION_ID])
+            if exist_node and exist_node.get(QC_RESULT_ID):
+                self.mongo_dao.delete_qcRecord(exist_node[QC_RESULT_ID])
+                exist_node[QC_RESULT_ID] = None
+            rawData = df.loc[index].to_dict()
+            del rawData['index']
+            relation_fields = [name for name in col_names if '.' in name]
+            prop_names = [name for name in col_names if not name in [TYPE, 'index'] + relation_fields]
+            batchIds = [self.batch[ID]] if not exist_node else exist_node[BATCH_IDS] + [self.batch[ID]]
+            current_date_time = data_loader.current_datetime()
+            valid_crdc_id_nodes = type in main_node_types
+            crdc_id = (exist_node.get(CRDC_ID) if exist_node else data_loader.get_uuid_str()) if valid_crdc_id_nodes else None
+            if valid_crdc_id_nodes and type in file_types:
+                file_id_val = row.get(self.file_nodes.get(type, {}).get(ID_FIELD))
+                if file_id_val:
+                    crdc_id = file_id_val if file_id_val.startswith(DCF_PREFIX) else DCF_PREFIX + file_id_val
+            if index == 0 or not self.merge_row(records, node_id, rawData, relation_fields):
+                dataRecord = {
+                    ID: self.get_record_id(exist_node),
+                    SUBMISSION_ID: self.batch[SUBMISSION_ID],
+                    DATA_COMMON_NAME: self.data_common,
+                    BATCH_IDS: batchIds,
+                    LATEST_BATCH_ID: self.batch[ID],
+                    LATEST_BATCH_DISPLAY_ID: self.batch.get(DISPLAY_ID),
+                    UPLOADED_DATE: current_date_time,
+                    STATUS: STATUS_NEW,
+                    ERRORS: [],
+                    WARNINGS: [],
+                    CREATED_AT: current_date_time if not exist_node else exist_node[CREATED_AT],
+                    UPDATED_AT: current_date_time,
+                    ORIN_FILE_NAME: file_name,
+                    "lineNumber": index + 2,
+                    NODE_TYPE: type,
+                    NODE_ID: node_id,
+                    "IDPropName": self.model.get_node_id(type),
+                    PROPERTIES: {k: v for (k, v) in rawData.items() if k in prop_names},
+                    PARENTS: self.get_row_parents(relation_fields, row),
+                    RAW_DATA: rawData,
+                    ADDITION_ERRORS: [],
+                    ENTITY_TYPE: self.model.get_entity_type(type),
+                    STUDY_ID: self.submission.get(STUDY_ID)
+                }
+                if crdc_id:
+                    dataRecord["CRDC_ID"] = crdc_id
+                if type in file_types:
+                    dataRecord[S3_FILE_INFO] = self.get_file_info(type, prop_names, row)
+                records.append(dataRecord)
+        return records
+
+    def merge_row(self, records, node_id, row, relation_fields):
+        existed_node = next((record for record in records if record[NODE_ID] == node_id), None)
+        if not existed_node:
+            return False
+        parents = self.get_row_parents(relation_fields, row)
+        if len(parents) == 0:
+            return True
+        existed_parents = existed_node.get(PARENTS)
+        if not existed_parents or len(existed_parents) == 0:
+            existed_node[PARENTS] = parents
+            return True
+        for parent in parents:
+            if not any(p.get(PARENT_TYPE) == parent.get(PARENT_TYPE) and p.get("parentIDPropName") == parent.get("parentIDPropName")
+                       and p.get("parentIDValue") == parent.get("parentIDValue") for p in existed_parents):
+                existed_node[PARENTS].append(parent)
+        return True
+
+    def get_row_parents(self, relation_fields, row):
+        parents = []
+        for relation in relation_fields:
+            val = row.get(relation)
+            if val:
+                temp = relation.split('.')
+                parents.append({"parentType": temp[0], "parentIDPropName": temp[1], "parentIDValue": val})
+        return parents
+
+
+def get_mongo_dao(exist_nodes):
+    """
+    DAO of the existing dataRecords of the submission, the loaded dataRecords are kept in loaded_records
+    """
+    mongo_dao = MagicMock()
+    mongo_dao.get_dataRecord_by_node.side_effect = lambda node_id, node_type, submission_id: \
+        exist_nodes.get((node_type, node_id))
+    mongo_dao.get_dataRecords_by_nodes.side_effect = lambda submission_id, node_type, node_ids: \
+        [record for (type, node_id), record in exist_nodes.items() if type == node_type and node_id in node_ids]
+    mongo_dao.search_released_nodes_crdc.return_value = []
+    mongo_dao.search_nodes_crdc.return_value = []
+    mongo_dao.search_study_nodes_crdc.return_value = []
+    mongo_dao.loaded_records = []
+    mongo_dao.update_data_records.side_effect = lambda records: (mongo_dao.loaded_records.extend(records), (True, None))[1]
+    return mongo_dao
+
+
+def get_loader(loader_class, mongo_dao):
+    model = MagicMock()
+    model.get_file_nodes.return_value = FILE_NODES
+    model.get_main_nodes.return_value = MAIN_NODES
+    model.get_node_id.side_effect = lambda node_type: f"{node_type}_id"
+    model.get_entity_type.side_effect = lambda node_type: f"{node_type}_entity"
+    batch = {ID: "batch", SUBMISSION_ID: "sub", DISPLAY_ID: 2}
+    return loader_class(model, batch, mongo_dao, "bucket", "root", "CDS", {ID: "sub", STUDY_ID: "study"})
+
+
+def load(files, exist_nodes, tmp_path):
+    """
+    load the files with the data loader and row by row, returns the dataRecords and DAOs of both
+    """
+    file_paths = []
+    for file_name, data in files.items():
+        file_path = tmp_path / file_name
+        file_path.write_text(data)
+        file_paths.append(str(file_path))
+    with patch.object(data_loader, "current_datetime", return_value=NOW), patch.object(data_loader, "get_uuid_str", return_value="uuid"), \
+            patch("common.crdc_id_resolver.get_uuid_str", return_value="uuid"):
+        mongo_dao = get_mongo_dao(copy.deepcopy(exist_nodes))
+        result, errors = get_loader(DataLoader, mongo_dao).load_data(file_paths)
+        assert result and errors == []
+        row_mongo_dao = get_mongo_dao(copy.deepcopy(exist_nodes))
+        row_loader = get_loader(RowLoader, row_mongo_dao)
+        row_records = [record for file_path in file_paths for record in row_loader.load_rows(file_path)]
+    return mongo_dao.loaded_records, row_records, mongo_dao, row_mongo_dao
+
+
+def test_records_same_as_row_by_row(tmp_path):
+    records, row_records, mongo_dao, _ = load(FILES, {}, tmp_path)
+    assert records == row_records
+    assert [record[PROPERTIES] for record in records[:3]] == [{"sample_id": "s1", "name": "a", "age": "1"},
+                                                            {"sample_id": "s2", "name": "b", "age": None},
+                                                            {"sample_id": "s3", "name": None, "age": "3"}]
+    assert [record["CRDC_ID"] for record in records[3:]] == ["dg.4DFC/f1", "dg.4DFC/f2", "uuid"]
+    # existing dataRecords are searched once per node type of a file
+    assert mongo_dao.get_dataRecords_by_nodes.call_count == 2
+
+
+def test_exist_nodes_same_as_row_by_row(tmp_path):
+    records, row_records, mongo_dao, row_mongo_dao = load(FILES, EXIST_NODES, tmp_path)
+    assert records == row_records
+    # _id, batchIDs and createdAt of existing dataRecords are kept
+    assert [(record[ID], record[BATCH_IDS], record[CREATED_AT]) for record in records] == [
+        ("r1", ["b1", "batch"], EXIST_DATE), ("r2", ["b1", "b2", "batch"], EXIST_DATE), ("uuid", ["batch"], NOW),
+        ("uuid", ["batch"], NOW), ("r3", ["b2", "batch"], EXIST_DATE), ("uuid", ["batch"], NOW)]
+    # qcResults of the existing dataRecords of a file are deleted with one call
+    assert [call.args[0] for call in mongo_dao.delete_qcRecords.call_args_list] == [["qc1"], ["qc3"]]
+    assert [call.args[0] for call in row_mongo_dao.delete_qcRecord.call_args_list] == ["qc1", "qc3"]
+    mongo_dao.get_dataRecord_by_node.assert_not_called()
+    mongo_dao.delete_qcRecord.assert_not_called()
+
+
+def test_m2m_parents_same_as_row_by_row(tmp_path):
+    files = {"sample.tsv": "type\tsample_id\tstudy.study_id\tparticipant.participant_id\n"
+                           "sample\ts1\tp1\tx1\n"
+                           "sample\ts2\tp1\t\n"
+                           "sample\ts1\tp2\tx1\n"
+                           "sample\ts3\t\t\n"
+                           "sample\ts1\tp1\tx2\n"
+                           "sample\ts2\t\tx3\n"
+                           "sample\ts3\tp3\t\n"
+                           "sample\ts4\tp1\t\n"
+                           "sample\ts1\tp2\tx1\n"}
+    records, row_records, _, _ = load(files, EXIST_NODES, tmp_path)
+    # dataRecords of nodes in more than one row are loaded after the others
+    assert [record[NODE_ID] for record in records] == ["s4", "s1", "s2", "s3"]
+    assert sorted(records, key=lambda record: record["lineNumber"]) == row_records
+    # parents of the following rows are appended in the order of their first rows
+    assert [[(parent[PARENT_TYPE], parent["parentIDValue"]) for parent in record[PARENTS]] for record in row_records] == [
+        [("study", "p1"), ("participant", "x1"), ("study", "p2"), ("participant", "x2")],
+        [("study", "p1"), ("participant", "x3")],
+        [("study", "p3")],
+        [("study", "p1")]]
@@ -0,0 +1,121 @@
+import pytest
+import io
+import os
+import sys
+import time
+from concurrent.futures import Future
+from unittest.mock import MagicMock, patch
+from botocore.exceptions import ClientError
+
+current_directory = os.getcwd()
+sys.path.insert(0, current_directory + '/src')
+from src import essential_validator
+from src.essential_validator import EssentialValidator
+from src.common.constants import ERRORS, FILE_NAME, STATUS, STATUS_ERROR, TYPE, BATCH_TYPE_METADATA, ID, SUBMISSION_ID, \
+    DATA_COMMON_NAME, MODEL_VERSION, SUBMISSION_INTENTION, BATCH_BUCKET, FILE_PREFIX, STREAM_MIN_FILE_SIZE, METADATA_DOWNLOAD_WORKERS
+
+VALID = "type\tsample_id\tname\nsample\ts1\ta\nsample\ts2\tb\n"
+INVALID = "type\tsample_id\tname\nsample\ts1\ta\nsample\ts1\tb\n"
+LARGE = "type\tsample_id\tname\n" + "".join(f"sample\tl{index}\tx\n" for index in range(100))
+FILES = {"a.tsv": VALID, "b.tsv": INVALID, "c.tsv": VALID, "d.tsv": INVALID, "e.tsv": LARGE, "f.tsv": VALID, "g.tsv": LARGE}
+VALID_FILES = {**FILES, "b.tsv": VALID, "d.tsv": VALID}
+
+
+class FakeS3Service:
+    """
+    s3 of the batch files, a file is missing, fails to be downloaded or is downloaded slowly
+    """
+    def __init__(self, files, missing=None, failed=None, slow=None):
+        self.files = files
+        self.missing = missing
+        self.failed = failed
+        self.slow = slow
+        self.downloaded = []
+
+    def get_file_size(self, bucket_name, key):
+        file_name = os.path.basename(key)
+        return None if file_name == self.missing else len(self.files[file_name])
+
+    def download_file(self, bucket_name, key, file_path):
+        file_name = os.path.basename(key)
+        if file_name == self.slow:
+            time.sleep(0.3)
+        if file_name == self.failed:
+            raise ClientError({"Error": {"Code": "500", "Message": "failed"}}, "GetObject")
+        with open(file_path, "w") as file:
+            file.write(self.files[file_name])
+        self.downloaded.append(file_name)
+
+    def get_file_stream(self, bucket_name, key):
+        return io.BytesIO(self.files[os.path.basename(key)].encode())
+
+
+class SerialExecutor:
+    """
+    reads each file when it is submitted, as reading and validating the files one by one
+    """
+    def __init__(self, max_workers):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def submit(self, fn, *args):
+        future = Future()
+        try:
+            future.set_result(fn(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+
+def run_validation(s3_service, workers, download_dir):
+    download_dir.mkdir()
+    mongo_dao = MagicMock()
+    mongo_dao.get_submission.return_value = {ID: "sub", DATA_COMMON_NAME: "CDS", MODEL_VERSION: "1", SUBMISSION_INTENTION: "New/Update"}
+    model = MagicMock()
+    model.get_node_keys.return_value = ["sample"]
+    model.get_node_id.return_value = "sample_id"
+    model.get_node_req_props.return_value = ["sample_id", "name"]
+    model.get_node_relationships.return_value = {}
+    model.get_file_nodes.return_value = {}
+    model_store = MagicMock()
+    model_store.get_model_by_data_common_version.return_value = model
+    validator = EssentialValidator(mongo_dao, model_store, {STREAM_MIN_FILE_SIZE: len(LARGE), METADATA_DOWNLOAD_WORKERS: workers})
+    validator.s3_service = s3_service
+    batch = {ID: "batch", TYPE: BATCH_TYPE_METADATA, SUBMISSION_ID: "sub", BATCH_BUCKET: "bucket", FILE_PREFIX: "prefix",
+             "files": [{FILE_NAME: file_name} for file_name in FILES]}
+    with patch.object(essential_validator, "S3Bucket"), patch.object(essential_validator, "S3_DOWNLOAD_DIR", str(download_dir)):
+        if workers:
+            result = validator.validate(batch)
+        else:
+            with patch.object(essential_validator, "ThreadPoolExecutor", SerialExecutor):
+                result = validator.validate(batch)
+    return result, batch, [os.path.basename(path) for path in validator.download_file_list], \
+        [streamed_file.file_name for streamed_file in validator.streamed_files]
+
+
+@pytest.mark.parametrize("files", [FILES, VALID_FILES], ids=["invalid", "valid"])
+@pytest.mark.parametrize("file_name", ["b.tsv", "c.tsv", "d.tsv"])
+@pytest.mark.parametrize("problem", ["missing", "failed", "slow"])
+def test_read_ahead_same_as_serial(files, file_name, problem, tmp_path):
+    serial_s3_service = FakeS3Service(files, **{problem: file_name})
+    serial_result, serial_batch, serial_downloads, serial_streams = run_validation(serial_s3_service, 0, tmp_path / "serial")
+    s3_service = FakeS3Service(files, **{problem: file_name})
+    result, batch, downloads, streams = run_validation(s3_service, 3, tmp_path / "read_ahead")
+    assert result == serial_result == (files is VALID_FILES and problem == "slow")
+    assert batch[ERRORS] == serial_batch[ERRORS]
+    assert [(file_info.get(STATUS), file_info.get(ERRORS)) for file_info in batch["files"]] == \
+           [(file_info.get(STATUS), file_info.get(ERRORS)) for file_info in serial_batch["files"]]
+    assert downloads == serial_downloads
+    assert streams == serial_streams == (["e.tsv", "g.tsv"] if result else [])
+    assert sorted(s3_service.downloaded) == sorted(serial_s3_service.downloaded)
+    if problem == "slow":
+        # files behind the slow file are downloaded before it, and still validated in the order of the batch
+        assert s3_service.downloaded.index(file_name) > list(FILES).index(file_name)
+    else:
+        assert file_name not in downloads
+        assert batch["files"][list(FILES).index(file_name)][STATUS] == STATUS_ERROR
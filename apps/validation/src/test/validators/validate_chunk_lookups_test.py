@@ -0,0 +1,242 @@
+import pytest
+import copy
+from unittest.mock import MagicMock, patch
+import sys
+import os
+
+current_directory = os.getcwd()
+sys.path.insert(0, current_directory + '/src')
+from src.metadata_validator import MetaDataValidator
+from src.common import mongo_dao as mongo_dao_module
+from src.common.mongo_dao import MongoDao
+from src.common.model import DataModel
+from src.common.constants import ID, NODE_TYPE, NODE_ID, PROPERTIES, PARENTS, DATA_COMMON_NAME, ORIN_FILE_NAME, STATUS, \
+    SUBMISSION_ID, SUBMISSION_INTENTION, SUBMISSION_INTENTION_NEW_UPDATE, SUBMISSION_INTENTION_DELETE, PARENT_TYPE, \
+    PARENT_ID_NAME, PARENT_ID_VAL, TYPE, KEY, VALUE_PROP, SUBMISSION_REL_STATUS, SUBMISSION_REL_STATUS_RELEASED, \
+    QC_RESULT_ID, ERRORS, WARNINGS, BATCH_IDS, LATEST_BATCH_ID, QC_VALIDATE_DATE, RELEASE_COLLECTION
+
+MODEL = {"nodes": {
+    "study": {"id_property": "study_id", "properties": {"study_id": {"type": "string", "required": True}}, "relationships": {}},
+    "participant": {"id_property": "participant_id", "properties": {"participant_id": {"type": "string", "required": True}},
+                    "relationships": {"study": {"type": "many_to_one"}}},
+    "sample": {"id_property": "sample_id", "properties": {"sample_id": {"type": "string", "required": True}},
+               "relationships": {"participant": {"type": "one_to_one"}}},
+}}
+
+
+def parent(parent_type, parent_id):
+    return {PARENT_TYPE: parent_type, PARENT_ID_NAME: f"{parent_type}_id", PARENT_ID_VAL: parent_id}
+
+
+def node(index, node_type, node_id, parents=None, props=None):
+    return {ID: f"r{index}", SUBMISSION_ID: "sub", NODE_TYPE: node_type, NODE_ID: node_id, DATA_COMMON_NAME: "CDS",
+            ORIN_FILE_NAME: f"{node_type}.tsv", "lineNumber": index + 2, BATCH_IDS: ["batch"], LATEST_BATCH_ID: "batch",
+            PROPERTIES: {f"{node_type}_id": node_id} if props is None else props, PARENTS: parents or []}
+
+
+# dataRecords of the submission
+RECORDS = [
+    node(0, "study", "s1"),
+    node(1, "participant", "p1", [parent("study", "s1")]),
+    # parent in the release collection, missing parent
+    node(2, "participant", "p2", [parent("study", "s9")]),
+    node(3, "participant", "p3", [parent("study", "s404")]),
+    # no parent, duplicated ID and no properties
+    node(4, "participant", "p4"),
+    node(5, "participant", "p1", [parent("study", "s1")]),
+    node(6, "participant", "p6", [parent("study", "s1")], {}),
+    # parents of one_to_one relationships with children in the submission and in the release collection
+    node(7, "sample", "a1", [parent("participant", "p1")]),
+    node(8, "sample", "a2", [parent("participant", "p1")]),
+    node(9, "sample", "a3", [parent("participant", "p2")]),
+    node(10, "sample", "a4", [parent("participant", "p3")]),
+    node(11, "sample", "a5", [parent("participant", "p9")]),
+    node(12, "study", "s2", [], {"study_id": "s2", "unknown": "x"}),
+]
+RELEASED = [
+    {DATA_COMMON_NAME: "CDS", NODE_TYPE: "study", NODE_ID: "s9", SUBMISSION_REL_STATUS: SUBMISSION_REL_STATUS_RELEASED, PARENTS: []},
+    {DATA_COMMON_NAME: "CDS", NODE_TYPE: "study", NODE_ID: "s2", SUBMISSION_REL_STATUS: "Deleted", PARENTS: []},
+    {DATA_COMMON_NAME: "CDS", NODE_TYPE: "participant", NODE_ID: "p1", SUBMISSION_REL_STATUS: None, PARENTS: [parent("study", "s1")]},
+    {DATA_COMMON_NAME: "CDS", NODE_TYPE: "participant", NODE_ID: "p9", SUBMISSION_REL_STATUS: SUBMISSION_REL_STATUS_RELEASED, PARENTS: []},
+    {DATA_COMMON_NAME: "CDS", NODE_TYPE: "sample", NODE_ID: "x2", SUBMISSION_REL_STATUS: SUBMISSION_REL_STATUS_RELEASED,
+     PARENTS: [parent("participant", "p2")]},
+    {DATA_COMMON_NAME: "OTHER", NODE_TYPE: "sample", NODE_ID: "x3", SUBMISSION_REL_STATUS: SUBMISSION_REL_STATUS_RELEASED,
+     PARENTS: [parent("participant", "p3")]},
+]
+# DAO methods queried by each dataRecord, not by a chunk
+RECORD_QUERIES = ["search_nodes_by_index", "search_released_node", "search_released_node_with_status", "get_nodes_by_parent_prop",
+                  "find_released_nodes_by_parent", "get_qcRecord", "delete_qcRecord"]
+
+
+def has_parent(data_record, parent_node):
+    return any((item[PARENT_TYPE], item[PARENT_ID_NAME], item[PARENT_ID_VAL]) ==
+               (parent_node[PARENT_TYPE], parent_node[PARENT_ID_NAME], parent_node[PARENT_ID_VAL]) for item in data_record[PARENTS])
+
+
+def group_by_parent(nodes, parent_type, parent_id_values=None):
+    groups = {}
+    for item in nodes:
+        for parent_node in item[PARENTS]:
+            if parent_node[PARENT_TYPE] == parent_type and (parent_id_values is None or parent_node[PARENT_ID_VAL] in parent_id_values):
+                groups.setdefault((parent_node[PARENT_ID_NAME], parent_node[PARENT_ID_VAL]), set()).add(item[NODE_ID])
+    return [{ID: {PARENT_ID_NAME: key[0], PARENT_ID_VAL: key[1]}, "nodeIDs": list(node_ids)} for key, node_ids in groups.items()]
+
+
+def is_released(item, data_commons, node_type, node_id, status=None):
+    return (item[DATA_COMMON_NAME], item[NODE_TYPE], item[NODE_ID]) == (data_commons, node_type, node_id) and \
+        (status is None or item[SUBMISSION_REL_STATUS] in status)
+
+
+def get_mongo_dao(records):
+    """
+    DAO searching the dataRecords of the submission and the release collection in memory
+    """
+    dao = MagicMock()
+    dao.search_nodes_by_index.side_effect = lambda nodes, submission_id: [
+        record for record in records if any((record[NODE_TYPE], record[NODE_ID]) == (item[TYPE], item[VALUE_PROP])
+                                            for item in nodes if item[TYPE] and item[KEY] and item[VALUE_PROP] is not None)]
+    dao.search_nodes_by_type_and_ids.side_effect = lambda submission_id, node_type, node_ids: [
+        record for record in records if record[NODE_TYPE] == node_type and record[NODE_ID] in node_ids]
+    dao.search_released_node.side_effect = lambda data_commons, node_type, node_id: next(
+        (item for item in RELEASED if is_released(item, data_commons, node_type, node_id)), None)
+    dao.search_released_nodes_by_ids.side_effect = lambda data_commons, node_type, node_ids, status=None: [
+        item for item in RELEASED if any(is_released(item, data_commons, node_type, node_id, status) for node_id in node_ids)]
+    dao.search_released_node_with_status.side_effect = lambda data_commons, node_type, node_id, status: next(
+        (item for item in RELEASED if is_released(item, data_commons, node_type, node_id, status)), None)
+    dao.get_nodes_by_parent_prop.side_effect = lambda node_type, parent_node, submission_id: [
+        record for record in records if record[NODE_TYPE] == node_type and has_parent(record, parent_node)]
+    dao.find_released_nodes_by_parent.side_effect = lambda node_type, data_commons, parent_node: [
+        item for item in RELEASED if (item[DATA_COMMON_NAME], item[NODE_TYPE]) == (data_commons, node_type) and has_parent(item, parent_node)]
+    dao.get_child_ids_by_parent.side_effect = lambda submission_id, node_type, parent_type: \
+        group_by_parent([record for record in records if record[NODE_TYPE] == node_type], parent_type)
+    dao.get_released_child_ids_by_parent.side_effect = lambda data_commons, node_type, parent_type, parent_id_values: group_by_parent(
+        [item for item in RELEASED if (item[DATA_COMMON_NAME], item[NODE_TYPE]) == (data_commons, node_type)], parent_type, parent_id_values)
+    dao.get_node_keys_by_submission.side_effect = lambda submission_id: [
+        (record[NODE_TYPE], record[NODE_ID], record[ID], record[ORIN_FILE_NAME], record["lineNumber"]) for record in records]
+    dao.save_qc_results.return_value = (True, None)
+    dao.update_data_records_status.return_value = (True, None)
+    return dao
+
+
+def get_validator(mongo_dao, intention):
+    validator = MetaDataValidator(mongo_dao, None, None)
+    validator.log = MagicMock()
+    validator.submission_id = "sub"
+    validator.submission = {ID: "sub", DATA_COMMON_NAME: "CDS", SUBMISSION_INTENTION: intention}
+    validator.datacommon = "CDS"
+    validator.model = DataModel(copy.deepcopy(MODEL))
+    return validator
+
+
+def get_records(copies=1):
+    records = []
+    for copy_index in range(copies):
+        for record in copy.deepcopy(RECORDS):
+            record[ID] = f"{record[ID]}-{copy_index}"
+            record["lineNumber"] += copy_index * len(RECORDS)
+            records.append(record)
+    return records
+
+
+def validate_by_record(records, intention):
+    validator = get_validator(get_mongo_dao(records), intention)
+    return validator.validate_records(records)
+
+
+def validate_by_chunk(records, intention):
+    mongo_dao = get_mongo_dao(records)
+    validator = get_validator(mongo_dao, intention)
+    if intention != SUBMISSION_INTENTION_DELETE:
+        validator.node_key_index = validator.build_node_key_index("sub")
+        validator.one_to_one_children = validator.build_one_to_one_children("sub")
+    mongo_dao.reset_mock()
+    assert validator.is_chunk_resolved(validator.resolve_chunk_lookups(records))
+    results = validator.validate_records(records)
+    for method in RECORD_QUERIES:
+        getattr(mongo_dao, method).assert_not_called()
+    return results, len(mongo_dao.method_calls)
+
+
+def get_codes(results):
+    return sorted({error["code"] for _, errors, warnings in results for error in errors + (warnings or [])})
+
+
+@pytest.mark.parametrize("intention, codes", [
+    (SUBMISSION_INTENTION_NEW_UPDATE, ["M013", "M014", "M016", "M018", "M021", "M024"]),
+    (SUBMISSION_INTENTION_DELETE, ["M019"]),
+    ("Update", ["M013", "M014", "M016", "M021", "M024"]),
+])
+def test_chunk_lookups_same_as_by_record(intention, codes):
+    records = get_records()
+    results, query_count = validate_by_chunk(records, intention)
+    assert results == validate_by_record(get_records(), intention)
+    assert codes == [code for code in get_codes(results) if code in ["M013", "M014", "M016", "M018", "M019", "M021", "M024"]]
+    # one query per node type or parent type of a chunk, no matter how many dataRecords
+    larger_results, larger_query_count = validate_by_chunk(get_records(3), intention)
+    assert larger_query_count == query_count
+    assert get_codes(larger_results) == get_codes(results)
+
+
+def test_build_one_to_one_children():
+    mongo_dao = get_mongo_dao(get_records())
+    validator = get_validator(mongo_dao, SUBMISSION_INTENTION_NEW_UPDATE)
+    children = validator.build_one_to_one_children("sub")
+    assert {key: sorted(node_ids) for key, node_ids in children[("sample", "participant")].items()} == {
+        ("participant_id", "p1"): ["a1", "a2"], ("participant_id", "p2"): ["a3", "x2"],
+        ("participant_id", "p3"): ["a4"], ("participant_id", "p9"): ["a5"]}
+    # one aggregation per one_to_one relationship, released children only for parents with a single child
+    mongo_dao.get_child_ids_by_parent.assert_called_once_with("sub", "sample", "participant")
+    mongo_dao.get_released_child_ids_by_parent.assert_called_once()
+    assert mongo_dao.get_released_child_ids_by_parent.call_args.args[3] == {"p2", "p3", "p9"}
+
+
+def test_released_children_in_chunks():
+    collection = MagicMock()
+    collection.aggregate.side_effect = lambda pipeline, allowDiskUse: \
+        [{ID: {PARENT_ID_NAME: "participant_id", PARENT_ID_VAL: value}, "nodeIDs": [f"x{value}"]}
+         for value in pipeline[0]["$match"][PARENTS]["$elemMatch"][PARENT_ID_VAL]["$in"]]
+    mongo_dao = MongoDao.__new__(MongoDao)
+    mongo_dao.client = {"db": {RELEASE_COLLECTION: collection}}
+    mongo_dao.db_name = "db"
+    mongo_dao.log = MagicMock()
+    parent_ids = [f"p{index}" for index in range(5)]
+    with patch.object(mongo_dao_module, "MAX_SIZE", 2):
+        groups = mongo_dao.get_released_child_ids_by_parent("CDS", "sample", "participant", parent_ids)
+    assert [group[ID][PARENT_ID_VAL] for group in groups] == parent_ids
+    assert collection.aggregate.call_count == 3
+    # each aggregation only groups by the parent IDs of its chunk
+    assert [call.args[0][3]["$match"][f"{PARENTS}.{PARENT_ID_VAL}"]["$in"] for call in collection.aggregate.call_args_list] == \
+           [["p0", "p1"], ["p2", "p3"], ["p4"]]
+
+
+def save_results(records, results, prefetch):
+    qc_records = {f"qc{index}": {ID: f"qc{index}", ERRORS: [], WARNINGS: []} for index in range(len(records))}
+    mongo_dao = get_mongo_dao(records)
+    mongo_dao.get_qcRecords.side_effect = lambda qc_ids: [qc_records[qc_id] for qc_id in qc_ids if qc_id in qc_records] if prefetch else None
+    mongo_dao.get_qcRecord.side_effect = lambda qc_id: qc_records.get(qc_id)
+    validator = get_validator(mongo_dao, SUBMISSION_INTENTION_NEW_UPDATE)
+    assert validator.save_validation_results(records, results) == len(records)
+    deleted = [qc_id for call in mongo_dao.delete_qcRecords.call_args_list for qc_id in call.args[0]] + \
+              [call.args[0] for call in mongo_dao.delete_qcRecord.call_args_list]
+    saved = [{k: v for k, v in qc_result.items() if k != QC_VALIDATE_DATE and (k != ID or v in qc_records)}
+             for call in mongo_dao.save_qc_results.call_args_list for qc_result in call.args[0]]
+    return deleted, saved, [(record[STATUS], record[QC_RESULT_ID] in qc_records) for record in records], mongo_dao
+
+
+def test_qc_prefetch_same_as_by_record():
+    records = get_records()
+    results = validate_by_record(records, SUBMISSION_INTENTION_NEW_UPDATE)
+    for index, record in enumerate(records):
+        # dataRecords validated before, and a qcResult deleted by another validation
+        if index % 3:
+            record[QC_RESULT_ID] = f"qc{index}" if index % 5 else "deleted"
+    by_record = save_results(copy.deepcopy(records), results, False)
+    deleted, saved, statuses, mongo_dao = save_results(copy.deepcopy(records), results, True)
+    assert (deleted, saved, statuses) == by_record[:3]
+    assert len(deleted) > 0 and len(saved) > 0
+    # qcResults of a chunk are retrieved, deleted and saved with one call each
+    mongo_dao.get_qcRecords.assert_called_once()
+    mongo_dao.delete_qcRecords.assert_called_once()
+    mongo_dao.save_qc_results.assert_called_once()
+    for method in RECORD_QUERIES:
+        getattr(mongo_dao, method).assert_not_called()
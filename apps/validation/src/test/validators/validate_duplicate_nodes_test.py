@@ -0,0 +1,55 @@
+import pytest
+from unittest.mock import MagicMock
+import sys
+import os
+
+current_directory = os.getcwd()
+sys.path.insert(0, current_directory + '/src')
+from src.metadata_validator import MetaDataValidator, get_msg_prefix
+from src.common.model import DataModel
+from src.common.constants import ID, NODE_TYPE, NODE_ID, PROPERTIES, ORIN_FILE_NAME, ERRORS
+
+MODEL = {"nodes": {"sample": {"id_property": "sample_id", "properties": {"sample_id": {"type": "string", "required": True}}}}}
+# nodeType, nodeID, _id, file name and line number of the nodes in the submission
+NODE_KEYS = [("sample", "s1", "r1", "a.tsv", 2), ("sample", "s2", "r2", "a.tsv", 3), ("sample", "s1", "r3", "a.tsv", 4),
+             ("sample", "s1", "r4", "b.tsv", 2), ("sample", None, "r5", "b.tsv", 3), ("sample", None, "r6", "b.tsv", 4)]
+
+
+def get_record(id, node_id, file_name, line_number):
+    return {ID: id, NODE_TYPE: "sample", NODE_ID: node_id, ORIN_FILE_NAME: file_name, "lineNumber": line_number,
+            PROPERTIES: {"sample_id": node_id}}
+
+
+@pytest.fixture(params=[True, False], ids=["node_key_index", "search_by_record"])
+def validator(request):
+    mongo_dao = MagicMock()
+    mongo_dao.get_node_keys_by_submission.return_value = NODE_KEYS
+    mongo_dao.search_nodes_by_index.side_effect = lambda nodes, submission_id: \
+        [{ID: id, ORIN_FILE_NAME: file_name, "lineNumber": line_number} for node_type, node_id, id, file_name, line_number
+         in NODE_KEYS if (node_type, node_id) == (nodes[0]["type"], nodes[0]["value"])]
+    validator = MetaDataValidator(mongo_dao, None, None)
+    validator.log = MagicMock()
+    validator.submission = {ID: "sub"}
+    validator.model = DataModel(MODEL)
+    if request.param:
+        validator.node_key_index = validator.build_node_key_index("sub")
+    return validator
+
+
+def get_duplicate_errors(validator, record):
+    result = validator.validate_required_props(record, get_msg_prefix(record))
+    return [error["description"] for error in result[ERRORS] if error["code"] == "M016"]
+
+
+def test_duplicate_lines(validator):
+    errors = get_duplicate_errors(validator, get_record("r3", "s1", "a.tsv", 4))
+    assert len(errors) == 1
+    assert errors[0].startswith("[a.tsv: line 4]")
+    assert '"a.tsv" line 2,"b.tsv" line 2' in errors[0]
+    assert get_duplicate_errors(validator, get_record("r2", "s2", "a.tsv", 3)) == []
+
+
+@pytest.mark.parametrize("node_id", [None, ["s1", "s2"], {"s1": 1}])
+def test_no_duplicate_of_invalid_id(validator, node_id):
+    assert get_duplicate_errors(validator, get_record("r5", node_id, "b.tsv", 3)) == []
+    validator.mongo_dao.search_nodes_by_index.assert_not_called()
@@ -0,0 +1,104 @@
+import pytest
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+import sys
+import os
+
+current_directory = os.getcwd()
+sys.path.insert(0, current_directory + '/src')
+from src import metadata_validator
+from src.metadata_validator import MetaDataValidator
+from src.common.mongo_dao import MongoDao
+from src.common.model import DataModel
+from src.common.constants import ID, NODE_TYPE, NODE_ID, PROPERTIES, PARENTS, DATA_COMMON_NAME, ORIN_FILE_NAME, STATUS, \
+    SUBMISSION_ID, SUBMISSION_INTENTION, SUBMISSION_INTENTION_NEW_UPDATE, MODEL_VERSION, METADATA_VALIDATION_INCREMENTAL, \
+    VALIDATION_CHECKPOINT, STATUS_ERROR, STATUS_WARNING, STATUS_PASSED, UPDATED_AT, VALIDATED_AT, DATA_COLlECTION, CREATED_AT, \
+    BATCH_IDS, LATEST_BATCH_ID, QC_RESULT_ID
+
+MODEL = {"nodes": {"study": {"id_property": "study_id", "relationships": {}, "properties": {
+    "study_id": {"type": "string", "required": True},
+    "name": {"type": "string", "required": True},
+}}}}
+UPDATED = datetime(2024, 1, 1)
+
+
+def get_record(index, name="study"):
+    return {ID: f"r{index}", SUBMISSION_ID: "sub", NODE_TYPE: "study", NODE_ID: f"study{index}", DATA_COMMON_NAME: "CDS",
+            ORIN_FILE_NAME: "study.tsv", "lineNumber": index + 2, BATCH_IDS: ["batch"], LATEST_BATCH_ID: "batch",
+            PROPERTIES: {"study_id": f"study{index}", "name": name}, PARENTS: [], UPDATED_AT: UPDATED}
+
+
+@pytest.fixture
+def mongo_dao():
+    dao = MagicMock()
+    dao.get_submission.return_value = {ID: "sub", DATA_COMMON_NAME: "CDS", MODEL_VERSION: "1",
+                                       SUBMISSION_INTENTION: SUBMISSION_INTENTION_NEW_UPDATE}
+    dao.get_node_keys_by_submission.return_value = [("study", f"study{index}", f"r{index}", "study.tsv", index + 2) for index in range(3)]
+    dao.count_docs.side_effect = lambda collection, query: (0 if CREATED_AT in query else 3) if collection == DATA_COLlECTION else 0
+    dao.search_released_nodes_by_ids.return_value = []
+    dao.save_qc_results.return_value = (True, None)
+    dao.update_data_records_status.return_value = (True, None)
+    dao.get_changed_released_nodes.return_value = []
+    return dao
+
+
+def validate(mongo_dao):
+    model_store = MagicMock()
+    model_store.get_model_by_data_common_version.return_value = DataModel(MODEL)
+    validator = MetaDataValidator(mongo_dao, model_store, {METADATA_VALIDATION_INCREMENTAL: True})
+    with patch.object(metadata_validator.synonym_index, "refresh", return_value=True):
+        return validator.validate("sub", "All")
+
+
+def validate_after_full_validation(mongo_dao):
+    # the first validation of the whole submission creates the checkpoint of the incremental validation
+    mongo_dao.get_dataRecords_chunks.return_value = [[get_record(0), get_record(1, ""), get_record(2)]]
+    assert validate(mongo_dao) == STATUS_ERROR
+    validated_records = mongo_dao.update_data_records_status.call_args.args[0]
+    # the validation sets validatedAt and keeps updatedAt of loading the metadata
+    assert all(record[UPDATED_AT] == UPDATED and record[VALIDATED_AT] > UPDATED for record in validated_records)
+    checkpoint = mongo_dao.set_submission_validation_checkpoint.call_args.args[1]
+    mongo_dao.get_submission.return_value[VALIDATION_CHECKPOINT] = checkpoint
+    mongo_dao.update_data_records_status.reset_mock()
+    mongo_dao.get_dataRecord_statuses.return_value = [STATUS_PASSED, STATUS_ERROR]
+    return validate(mongo_dao)
+
+
+def test_nothing_changed(mongo_dao):
+    mongo_dao.get_changed_dataRecords.return_value = []
+    # the error of the unchanged record is still reported
+    assert validate_after_full_validation(mongo_dao) == STATUS_ERROR
+    mongo_dao.get_dataRecords_chunks.assert_called_once()
+    mongo_dao.get_dataRecords_by_ids.assert_not_called()
+    mongo_dao.update_data_records_status.assert_not_called()
+
+
+def test_one_record_changed(mongo_dao):
+    changed_record = get_record(1)
+    mongo_dao.get_changed_dataRecords.return_value = [{ID: "r1", NODE_TYPE: "study", NODE_ID: "study1", PARENTS: []}]
+    mongo_dao.get_dataRecord_ids.return_value = ["r1"]
+    mongo_dao.get_dataRecords_by_ids.return_value = [changed_record]
+    def get_dataRecord_statuses(submission_id):
+        return [STATUS_PASSED] if changed_record.get(STATUS) == STATUS_PASSED else [STATUS_PASSED, STATUS_ERROR]
+    status = validate_after_full_validation(mongo_dao)
+    mongo_dao.get_dataRecords_by_ids.assert_called_once_with("sub", ["r1"])
+    assert [record[ID] for record in mongo_dao.update_data_records_status.call_args.args[0]] == ["r1"]
+    assert changed_record[STATUS] == STATUS_PASSED
+    # the status is counted from the stored status of all dataRecords
+    mongo_dao.get_dataRecord_statuses.assert_called_with("sub")
+    assert status == STATUS_ERROR
+    mongo_dao.get_dataRecord_statuses.side_effect = get_dataRecord_statuses
+    assert validate(mongo_dao) == STATUS_PASSED
+
+
+def test_status_update_keeps_updated_at():
+    dao = MongoDao.__new__(MongoDao)
+    dao.client = MagicMock()
+    dao.db_name = "db"
+    dao.log = MagicMock()
+    writer = MagicMock()
+    dao.get_bulk_writer = MagicMock(return_value=writer)
+    record = {ID: "r1", STATUS: STATUS_WARNING, VALIDATED_AT: UPDATED, QC_RESULT_ID: "qc1", PROPERTIES: {}, UPDATED_AT: UPDATED}
+    dao.update_data_records_status([record])
+    [(operation, values)] = list(writer.write.call_args.args[0])
+    assert values == {STATUS: STATUS_WARNING, VALIDATED_AT: UPDATED, QC_RESULT_ID: "qc1", PROPERTIES: {}}
@@ -0,0 +1,74 @@
+import pytest
+from unittest.mock import MagicMock
+import sys
+import os
+
+current_directory = os.getcwd()
+sys.path.insert(0, current_directory + '/src')
+from src.essential_validator import EssentialValidator
+from src.common.tsv_parser import parse_tsv
+from src.common.constants import ERRORS, FILE_NAME
+
+# s1 has conflict names in 3 rows, s2 conflict ages, s3 no conflict, s4 duplicated relationship values,
+# s5 after s4 is not checked
+DATA = "type\tsample_id\tstudy.study_id\tname\tage\n" \
+       "sample\ts1\tp1\ta\t1\n" \
+       "sample\ts2\tp1\tb\t2\n" \
+       "sample\ts1\tp2\tc\t1\n" \
+       "sample\ts3\tp1\tx\t5\n" \
+       "sample\ts1\tp3\t\t3\n" \
+       "sample\ts2\tp2\tb\t4\n" \
+       "sample\ts3\tp2\tx\t5\n" \
+       "sample\ts4\tp1\td\t1\n" \
+       "sample\ts4\tp1\td\t1\n" \
+       "sample\ts5\tp1\te\t1\n" \
+       "sample\ts5\tp2\tf\t1\n"
+S1_CONFLICTS = ['“test.tsv: 2”: conflict data detected: “name”: "a".',
+                '“test.tsv: 4”: conflict data detected: “name”: "c".',
+                '“test.tsv: 6”: conflict data detected: “name”: "None".']
+# messages of the per-ID loop, with the values of a conflict in the order of their first rows and an empty value as None
+EXPECTED = [
+    # conflicts of an ID are reported for each of its rows after the first one
+    *S1_CONFLICTS, *S1_CONFLICTS,
+    # only the first property with conflict values of an ID is reported
+    '“test.tsv: 3”: conflict data detected: “age”: "2".',
+    '“test.tsv: 7”: conflict data detected: “age”: "4".',
+    # the rows of the first ID with duplicated relationship values are reported and the check stops
+    '“test.tsv:9”: duplicated data detected: “sample_id”: s4.',
+    '“test.tsv:10”: duplicated data detected: “sample_id”: s4.',
+]
+
+
+def get_validator():
+    validator = EssentialValidator(None, None)
+    validator.model = MagicMock()
+    validator.model.get_node_keys.return_value = ["study", "sample"]
+    validator.model.get_node_id.side_effect = lambda node_type: f"{node_type}_id"
+    validator.model.get_node_req_props.return_value = []
+    validator.model.get_node_relationships.side_effect = lambda node_type: {"study": {}} if node_type == "sample" else {}
+    validator.batch = {ERRORS: []}
+    validator.submission_intention = "New/Update"
+    validator.def_file_nodes = {}
+    validator.def_file_name = "file_name"
+    return validator
+
+
+@pytest.mark.parametrize("data, expected", [
+    (DATA, EXPECTED),
+    # IDs duplicated with different relationship values and no conflict
+    ("type\tsample_id\tstudy.study_id\tname\nsample\ts1\tp1\ta\nsample\ts1\tp2\ta\nsample\ts2\tp1\tb\nsample\ts2\tp3\tb\n", []),
+    # ID with one duplicated relationship value in 3 rows
+    ("type\tsample_id\tstudy.study_id\nsample\ts1\tp1\nsample\ts1\tp2\nsample\ts1\tp1\n",
+     ['“test.tsv:2”: duplicated data detected: “sample_id”: s1.', '“test.tsv:3”: duplicated data detected: “sample_id”: s1.',
+      '“test.tsv:4”: duplicated data detected: “sample_id”: s1.']),
+])
+def test_m2m_messages(data, expected, tmp_path):
+    file_path = tmp_path / "test.tsv"
+    file_path.write_text(data)
+    validator = get_validator()
+    validator.df = parse_tsv(str(file_path)).get_validation_frame()
+    file_info = {FILE_NAME: "test.tsv"}
+    result = validator.validate_data(file_info)
+    assert result == (len(expected) == 0)
+    assert [msg for msg in file_info[ERRORS] if "data detected" in msg] == expected
+    assert [msg for msg in validator.batch[ERRORS] if "data detected" in msg] == expected
@@ -0,0 +1,152 @@
+import pytest
+import copy
+import pickle
+from unittest.mock import MagicMock, patch
+import sys
+import os
+
+current_directory = os.getcwd()
+sys.path.insert(0, current_directory + '/src')
+from src import metadata_validator
+from src.metadata_validator import MetaDataValidator
+from src.common.model import DataModel
+from src.common.constants import ID, NODE_TYPE, NODE_ID, PROPERTIES, PARENTS, DATA_COMMON_NAME, ORIN_FILE_NAME, \
+    SUBMISSION_INTENTION, SUBMISSION_INTENTION_NEW_UPDATE, MODEL_VERSION, METADATA_VALIDATION_WORKERS, MONGO_DB, DB, \
+    TIER_CONFIG, CDE_PERMISSIVE_VALUES, PARENT_TYPE, PARENT_ID_NAME, PARENT_ID_VAL
+
+def cde_prop(code):
+    return {"type": "string", "required": False, "Term": [{"Origin": "caDSR", "Code": code, "Version": "1"}]}
+
+MODEL = {"nodes": {
+    "study": {"id_property": "study_id", "properties": {"study_id": {"type": "string", "required": True}}, "relationships": {}},
+    "participant": {"id_property": "participant_id", "properties": {"participant_id": {"type": "string", "required": True}},
+                    "relationships": {}},
+    "sample": {"id_property": "sample_id", "properties": {
+        "sample_id": {"type": "string", "required": True},
+        "tissue": cde_prop("1"),
+        "site": cde_prop("2"),
+        "method": cde_prop("3"),
+        "age": {"type": "integer", "required": True, "minimum": 0},
+    }, "relationships": {"study": {"type": "many_to_one"}, "participant": {"type": "one_to_one"}}},
+}}
+# values of the properties of the samples, the permissible values of CDE 1 are in DB, CDE 2 and 3 are not found
+VALUES = [
+    {"tissue": "Blood"}, {"tissue": "blood"}, {"tissue": "bloody", "age": "x"}, {"method": "a"}, {"tissue": "Bone", "site": "b"},
+    {"age": "-1"}, {"site": "c", "tissue": "Skin"}, {"method": "d", "age": "3"}, {}, {"tissue": "bone"},
+]
+CDE_PVS = {"1": ["Blood", "Bone"]}
+# nodes of the submission not in the validated chunks
+OTHER_NODES = 10000
+
+
+def get_records():
+    records = []
+    for index, values in enumerate(VALUES):
+        sample_id = f"sample{index % 8}"
+        records.append({ID: f"r{index}", NODE_TYPE: "sample", NODE_ID: sample_id, DATA_COMMON_NAME: "CDS",
+                        ORIN_FILE_NAME: "sample.tsv", "lineNumber": index + 2,
+                        PROPERTIES: {"sample_id": sample_id, "age": "1", **values},
+                        PARENTS: [{PARENT_TYPE: "study", PARENT_ID_NAME: "study_id", PARENT_ID_VAL: "study1" if index % 3 else "study2"},
+                                  {PARENT_TYPE: "participant", PARENT_ID_NAME: "participant_id", PARENT_ID_VAL: f"p{index % 5}"}]})
+    return records
+
+
+def get_node_key_index(records):
+    node_key_index = {("sample", f"other{index}"): [{ID: f"o{index}", ORIN_FILE_NAME: "other.tsv", "lineNumber": index + 2}]
+                      for index in range(OTHER_NODES)}
+    for record in records:
+        node_key_index.setdefault(("sample", record[NODE_ID]), []).append(
+            {ID: record[ID], ORIN_FILE_NAME: record[ORIN_FILE_NAME], "lineNumber": record["lineNumber"]})
+    return node_key_index
+
+
+def get_one_to_one_children():
+    children = {("participant_id", f"other{index}"): [f"other{index}"] for index in range(OTHER_NODES)}
+    children[("participant_id", "p1")] = ["sample1", "sample6"]
+    children[("participant_id", "p2")] = ["sample2"]
+    return {("sample", "participant"): children}
+
+
+def resolve_chunk_lookups(validator, data_records):
+    validator.chunk_parent_nodes = {("study", "study_id", "study1"), ("participant", "participant_id", "p1"), ("participant", "participant_id", "p2")}
+    validator.chunk_released_parents = set()
+    validator.chunk_released_nodes = {("sample", "sample1")}
+    return validator.chunk_parent_nodes, validator.chunk_released_parents, validator.chunk_released_nodes
+
+
+def run_validation(workers):
+    records = get_records()
+    mongo_dao = MagicMock()
+    mongo_dao.get_dataRecords_chunks.return_value = [records[:4], records[4:7], records[7:]]
+    mongo_dao.get_cde_permissible_values.side_effect = lambda code, version: \
+        {CDE_PERMISSIVE_VALUES: CDE_PVS[code]} if code in CDE_PVS else None
+    configs = {METADATA_VALIDATION_WORKERS: workers, MONGO_DB: "mongodb://localhost:27017", DB: "test", TIER_CONFIG: "dev"}
+    validator = MetaDataValidator(mongo_dao, None, configs)
+    validator.log = MagicMock()
+    validator.submission_id = "sub"
+    validator.submission = {ID: "sub", SUBMISSION_INTENTION: SUBMISSION_INTENTION_NEW_UPDATE, DATA_COMMON_NAME: "CDS", MODEL_VERSION: "1"}
+    validator.datacommon = "CDS"
+    validator.model = DataModel(copy.deepcopy(MODEL))
+    validator.node_key_index = get_node_key_index(records)
+    validator.one_to_one_children = get_one_to_one_children()
+    saved = []
+    def save_validation_results(data_records, results):
+        saved.extend((record[ID], record[PROPERTIES], result) for record, result in zip(data_records, results))
+        return len(data_records)
+    validator.save_validation_results = save_validation_results
+    with patch.object(MetaDataValidator, "resolve_chunk_lookups", resolve_chunk_lookups), \
+            patch.object(metadata_validator, "get_pv_by_datacommon_version_cde", return_value=None) as get_pv:
+        if workers > 1:
+            counts = validator.validate_chunks_parallel("sub", "All", workers)
+        else:
+            counts = validator.validate_chunks("sub", "All")
+    # no chunk failed in a worker and was validated again in current process
+    validator.log.exception.assert_not_called()
+    return counts, saved, get_pv.call_count
+
+
+@pytest.fixture(autouse=True)
+def synonyms():
+    metadata_validator.synonym_index.load_terms((1, {"bloody": {"Blood"}}, {"Blood": ["blood", "bloody"]}))
+    metadata_validator.cde_cache.clear()
+    yield
+    metadata_validator.synonym_index.load_terms((None, {}, {}))
+    metadata_validator.cde_cache.clear()
+
+
+def test_parallel_same_as_serial():
+    serial_counts, serial_results, serial_sts_searches = run_validation(1)
+    metadata_validator.cde_cache.clear()
+    parallel_counts, parallel_results, parallel_sts_searches = run_validation(2)
+    assert serial_counts == parallel_counts == (len(VALUES), len(VALUES))
+    assert parallel_results == serial_results
+    # STS is searched once for the first CDE not found in DB, and the CDE not found error is reported for both CDEs
+    assert serial_sts_searches == parallel_sts_searches == 1
+    errors = [error for _, _, (status, errs, warnings) in serial_results for error in errs]
+    assert len([error for error in errors if error.get("code") == "M027"]) == 4
+    assert any("It is recommended to use" in error.get("description", "") for error in errors)
+    # properties in wrong case are fixed by the workers
+    assert [props["tissue"] for _, props, _ in parallel_results if "tissue" in props] == ["Blood", "Blood", "bloody", "Bone", "Skin", "Bone"]
+    # duplicated IDs and one_to_one relationships are checked by the workers with the lookups of their chunks
+    assert len([error for error in errors if error.get("code") == "M016"]) == 4
+    assert len([error for error in errors if error.get("code") == "M024"]) == 2
+
+
+def test_worker_lookups_of_chunk():
+    records = get_records()
+    validator = MetaDataValidator(MagicMock(), None, None)
+    validator.submission = {ID: "sub", SUBMISSION_INTENTION: SUBMISSION_INTENTION_NEW_UPDATE, DATA_COMMON_NAME: "CDS"}
+    validator.model = DataModel(copy.deepcopy(MODEL))
+    validator.node_key_index = get_node_key_index(records)
+    validator.one_to_one_children = get_one_to_one_children()
+    # the state copied to the workers doesn't grow with the submission
+    state = validator.get_worker_state()
+    assert set(state.keys()) == {"submission", "model"}
+    assert len(pickle.dumps(state)) < 10000
+    node_keys = validator.get_chunk_node_keys(records[:2])
+    assert node_keys == {("sample", "sample0"): validator.node_key_index[("sample", "sample0")],
+                         ("sample", "sample1"): validator.node_key_index[("sample", "sample1")]}
+    assert len(node_keys[("sample", "sample0")]) == 2
+    assert validator.get_chunk_one_to_one_children(records[:3]) == \
+           {("sample", "participant"): {("participant_id", "p1"): ["sample1", "sample6"], ("participant_id", "p2"): ["sample2"]}}
+    assert validator.get_chunk_one_to_one_children(records[:1]) == {("sample", "participant"): {}}
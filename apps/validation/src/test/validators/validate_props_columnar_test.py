@@ -0,0 +1,130 @@
+import pytest
+import copy
+from unittest.mock import MagicMock, patch
+import sys
+import os
+
+current_directory = os.getcwd()
+sys.path.insert(0, current_directory + '/src')
+from src import metadata_validator
+from src.metadata_validator import MetaDataValidator
+from src.common.model import DataModel
+from src.common.constants import ID, NODE_TYPE, NODE_ID, PROPERTIES, PARENTS, ORIN_FILE_NAME, DATA_COMMON_NAME, MODEL_VERSION, \
+    CDE_PERMISSIVE_VALUES, TIER_CONFIG, LIST_DELIMITER_PROP, SUBMISSION_INTENTION, METADATA_VALIDATION_COLUMNAR
+
+
+def prop(prop_type, **kwargs):
+    return {"type": prop_type, "required": False, **kwargs}
+
+
+def cde_prop(code, prop_type="string"):
+    return prop(prop_type, Term=[{"Origin": "caDSR", "Code": code, "Version": "1"}])
+
+MODEL = {LIST_DELIMITER_PROP: "|", "nodes": {
+    "sample": {"id_property": "sample_id", "relationships": {}, "properties": {
+        "sample_id": {"type": "string", "required": True},
+        "tissue": prop("string", permissible_values=[" Blood", "Bone "]),
+        "count": prop("integer", minimum={"value": 0}, maximum={"value": 10, "exclusive": True}),
+        "total": prop("integer"),
+        "weight": prop("number", minimum={"value": 0.5, "exclusive": True}),
+        "ratio": prop("number"),
+        "size": prop("number", maximum={"value": 2 ** 60}),
+        "score": prop("integer", permissible_values=[1, 2]),
+        "level": prop("integer", permissible_values=["1", "2"]),
+        "collected": prop("date"),
+        "frozen": prop("boolean"),
+        "sites": prop("array", permissible_values=["Arm", "Leg"]),
+        "notes": prop("array"),
+        "method": cde_prop("2"),
+        "grade": cde_prop("4"),
+        "extra": prop("object"),
+        "name": {"type": "string", "required": True},
+    }},
+    # the ID property has permissible values, its value is checked for duplicates before it is corrected
+    "case": {"id_property": "case_id", "relationships": {}, "properties": {
+        "case_id": {"type": "string", "required": True, "permissible_values": ["C1", "C2"]},
+        "site": cde_prop("1"),
+        "stage": cde_prop("3", "value-list"),
+    }},
+}}
+# permissible values of the CDEs in DB, CDE 2 and 3 are not found, CDE 4 has no permissible values
+CDE_PVS = {"1": ["Head", "Neck"], "4": []}
+# permissible values of the CDEs found by the STS API, the API is only called for the first CDE not found in DB
+STS_PVS = {"2": ["A", "B"]}
+RECORDS = [
+    ("sample", {"tissue": "Blood", "count": "3", "weight": "1.5", "collected": "2020-01-02", "frozen": "Yes", "name": "a"}),
+    # CDE 3 is searched by the STS API before CDE 2 of the sample nodes, as in validate_props order
+    ("case", {"case_id": "c1", "site": "head", "stage": "i|II| ii "}),
+    ("sample", {"tissue": " blood ", "count": "10", "weight": "0.5", "score": "3", "collected": "2020-13-02", "frozen": "maybe",
+                "method": "a", "name": " "}),
+    ("sample", {"tissue": "Skin", "count": "-1", "weight": "2", "ratio": "x", "score": "2", "sites": "arm|Leg|Tail", "notes": "a|b",
+                "name": "b"}),
+    ("sample", {"score": "y", "grade": "any", "extra": "{}", "unknown": "u", "sites": "|arm"}),
+    ("sample", {"total": "+5", "ratio": "1e3", "score": "1", "collected": "1/2/2020", "sites": " Leg ", "tissue": None}),
+    ("sample", {"total": " 7", "weight": "5.", "ratio": ".5", "score": 2, "frozen": True, "tissue": 5}),
+    ("sample", {"total": "0012", "weight": "nan", "ratio": "1_000", "tissue": "BONE"}),
+    ("sample", {"total": "12345678901234567890", "weight": "-inf", "size": str(2 ** 60 + 1)}),
+    ("sample", {"total": "1.0", "ratio": "1e400", "size": "1e18"}),
+    # values validate_props fails to validate
+    ("sample", {"count": "x", "level": "2", "sites": 1}),
+    ("case", {"case_id": "C2", "site": "Foot", "stage": "III"}),
+    ("case", {"case_id": "c2"}),
+]
+# duplicated cases in other files of the submission
+NODE_KEY_INDEX = {("case", "c1"): [{ID: "x1", ORIN_FILE_NAME: "other.tsv", "lineNumber": 2}],
+                  ("case", "C2"): [{ID: "x2", ORIN_FILE_NAME: "other.tsv", "lineNumber": 3}]}
+
+
+def get_records(copies=1):
+    records = []
+    for index, (node_type, props) in enumerate(RECORDS * copies):
+        id_property = MODEL["nodes"][node_type]["id_property"]
+        props = {id_property: f"{node_type}{index}", **copy.deepcopy(props)}
+        records.append({ID: f"r{index}", NODE_TYPE: node_type, NODE_ID: props[id_property], ORIN_FILE_NAME: f"{node_type}.tsv",
+                        "lineNumber": index + 2, PROPERTIES: props, PARENTS: []})
+    return records
+
+
+def validate(records, columnar):
+    metadata_validator.cde_cache.clear()
+    mongo_dao = MagicMock()
+    mongo_dao.get_cde_permissible_values.side_effect = lambda code, version: \
+        {CDE_PERMISSIVE_VALUES: CDE_PVS[code]} if code in CDE_PVS else None
+    mongo_dao.find_pvs_by_synonym.return_value = []
+    validator = MetaDataValidator(mongo_dao, None, {TIER_CONFIG: "dev", METADATA_VALIDATION_COLUMNAR: columnar})
+    validator.submission = {ID: "sub", DATA_COMMON_NAME: "CDS", MODEL_VERSION: "1", SUBMISSION_INTENTION: "Update"}
+    validator.model = DataModel(copy.deepcopy(MODEL))
+    node_key_index = copy.deepcopy(NODE_KEY_INDEX)
+    for record in records:
+        node_key_index.setdefault((record[NODE_TYPE], record[NODE_ID]), []).append(
+            {ID: record[ID], ORIN_FILE_NAME: record[ORIN_FILE_NAME], "lineNumber": record["lineNumber"]})
+    validator.node_key_index = node_key_index
+    sts_pvs = lambda tier, data_commons, version, cde_code, cde_version, log, dao: \
+        {CDE_PERMISSIVE_VALUES: STS_PVS[cde_code]} if cde_code in STS_PVS else None
+    with patch.object(metadata_validator, "get_pv_by_datacommon_version_cde", side_effect=sts_pvs), \
+            patch.object(validator, "validate_props_columnar", wraps=validator.validate_props_columnar) as validate_props_columnar:
+        results = validator.validate_records(records)
+    assert validate_props_columnar.called == columnar
+    assert validator.chunk_prop_results is None
+    return results
+
+
+@pytest.mark.parametrize("copies", [1, 3])
+def test_columnar_same_as_validate_props(copies):
+    records = get_records(copies)
+    results = validate(records, True)
+    value_records = get_records(copies)
+    value_results = validate(value_records, False)
+    assert results == value_results
+    # values in wrong case are corrected and boolean values converted the same
+    assert [record[PROPERTIES] for record in records] == [record[PROPERTIES] for record in value_records]
+    codes = {error["code"] for _, errors, warnings in results for error in errors + (warnings or [])}
+    assert codes >= {"M003", "M004", "M005", "M007", "M008", "M009", "M010", "M011", "M012", "M016", "M017", "M020", "M027"}
+
+
+def test_correct_after_required_props():
+    records = get_records()
+    results = validate(records, True)
+    # duplicates are found by the ID as submitted, the ID is corrected with the other values
+    assert [([error["code"] for error in errors], records[index][PROPERTIES]["case_id"]) for index, (_, errors, _) in enumerate(results)
+            if records[index][NODE_TYPE] == "case"] == [(["M016", "M027"], "C1"), (["M016", "M010", "M027"], "C2"), ([], "C2")]
@@ -0,0 +1,175 @@
+import pytest
+import copy
+from unittest.mock import MagicMock, patch
+import sys
+import os
+
+current_directory = os.getcwd()
+sys.path.insert(0, current_directory + '/src')
+from src import metadata_validator
+from src.metadata_validator import MetaDataValidator, check_permissive, check_boundary, get_msg_prefix, CDE_NOT_FOUND
+from src.common.model import DataModel
+from src.common.date_parser import date_parser
+from src.common.model_reader import valid_prop_types
+from src.common.constants import ID, NODE_TYPE, PROPERTIES, ORIN_FILE_NAME, DATA_COMMON_NAME, MODEL_VERSION, TYPE, MIN, MAX, \
+    CDE_TERM, TERM_CODE, TERM_VERSION, CDE_PERMISSIVE_VALUES, TIER_CONFIG, ERRORS, LIST_DELIMITER_PROP
+
+
+def cde_prop(code, prop_type="string"):
+    return {"type": prop_type, "Term": [{"Origin": "NCIt", "Code": "C1"}, {"Origin": "caDSR", "Code": code, "Version": "1"}]}
+
+MODEL = {LIST_DELIMITER_PROP: "|", "nodes": {"sample": {"id_property": "sample_id", "properties": {
+    "sample_id": {"type": "string"},
+    "tissue": {"type": "string", "permissible_values": [" Blood", "Bone "]},
+    "count": {"type": "integer", "minimum": {"value": 0}, "maximum": {"value": 10, "exclusive": True}},
+    "weight": {"type": "number", "minimum": {"value": 0.5, "exclusive": True}},
+    "ratio": {"type": "number"},
+    "score": {"type": "integer", "permissible_values": [1, 2]},
+    "collected": {"type": "date"},
+    "frozen": {"type": "boolean"},
+    "sites": {"type": "array", "permissible_values": ["Arm", "Leg"]},
+    "notes": {"type": "array"},
+    "site": cde_prop("1"),
+    "method": cde_prop("2"),
+    "stage": cde_prop("3", "value-list"),
+    "grade": cde_prop("4"),
+    "extra": {"type": "object"},
+    "other": {},
+}}}}
+# permissible values of the CDEs in DB, CDE 2 and 3 are not found, CDE 4 has no permissible values
+CDE_PVS = {"1": ["Head", "Neck"], "4": []}
+VALUES = [
+    {"tissue": "Blood", "count": "3", "weight": "1.5", "collected": "2020-01-02", "frozen": "Yes"},
+    {"tissue": "blood", "count": "10", "weight": "0.5", "score": "3", "collected": "2020-13-02", "frozen": "maybe"},
+    {"tissue": "Skin", "count": "-1", "weight": "2", "ratio": "x", "score": "2", "sites": "arm|Leg|Tail", "notes": "a|b"},
+    {"score": "y", "site": "head", "method": "a", "stage": "I|II", "grade": "any", "extra": "{}", "other": "o"},
+    {"site": "Foot", "method": "b", "sites": "Tail", "frozen": True, "tissue": None},
+    {"ratio": "1e3", "score": "1", "collected": "1/2/2020", "sites": " Leg "},
+]
+
+
+class DefinitionValidator(MetaDataValidator):
+    """
+    Validates property values with lookups in the raw property definitions of the model for every value, as before
+    the validation plans were compiled.
+    """
+    def validate_props(self, dataRecord, msg_prefix):
+        errors = []
+        props_def = self.model.get_node_props(dataRecord.get(NODE_TYPE))
+        for k, v in dataRecord.get(PROPERTIES).items():
+            prop_def = props_def.get(k)
+            if not prop_def or v is None:
+                continue
+            errors.extend(self.validate_prop_def_value(k, v, prop_def, msg_prefix, dataRecord))
+        return errors
+
+    def validate_prop_def_value(self, prop_name, value, prop_def, msg_prefix, data_record):
+        errors = []
+        type = prop_def.get(TYPE)
+        if not type or not type in valid_prop_types:
+            errors.append(metadata_validator.create_error("M009", [msg_prefix, prop_name, type], prop_name, value))
+            return errors
+        permissive_vals, msg = self.get_permissive_def_value(prop_def)
+        if msg and msg == CDE_NOT_FOUND:
+            errors.append(metadata_validator.create_error("M027", [msg_prefix, prop_name], prop_name, value))
+        if type == "string":
+            result, error = check_permissive(str(value), permissive_vals, msg_prefix, prop_name, self.mongo_dao, data_record)
+            if not result:
+                errors.append(error)
+        elif type in ["integer", "number"]:
+            val = None
+            try:
+                val = int(value) if type == "integer" else float(value)
+            except ValueError as e:
+                errors.append(metadata_validator.create_error("M004" if type == "integer" else "M005", [msg_prefix, prop_name, value], prop_name, value))
+            result, error = check_permissive(val, permissive_vals, msg_prefix, prop_name, self.mongo_dao)
+            if not result:
+                errors.append(error)
+            errors.extend(check_boundary(val, prop_def.get(MIN), prop_def.get(MAX), msg_prefix, prop_name))
+        elif type == "date" or type == "datetime":
+            if date_parser.parse(value) is None:
+                errors.append(metadata_validator.create_error("M007", [msg_prefix, prop_name, value], prop_name, value))
+        elif type == "boolean":
+            if not isinstance(value, bool):
+                if value.lower() not in ["yes", "true", "no", "false"]:
+                    errors.append(metadata_validator.create_error("M008", [msg_prefix, prop_name, value], prop_name, value))
+                else:
+                    data_record[PROPERTIES][prop_name] = value.lower() in ["yes", "true"]
+        elif type == "array" or type == "value-list":
+            if not permissive_vals or len(permissive_vals) == 0:
+                return errors
+            list_delimiter = self.model.get_list_delimiter()
+            arr = str(value).split(list_delimiter) if list_delimiter in str(value) else [value]
+            for item in arr:
+                val = item.strip() if item and isinstance(item, str) else item
+                result, error = check_permissive(val, permissive_vals, msg_prefix, prop_name, self.mongo_dao, data_record)
+                if not result:
+                    errors.append(error)
+        else:
+            errors.append(metadata_validator.create_error("M009", [msg_prefix, prop_name, value], prop_name, value))
+        return errors
+
+    def get_permissive_def_value(self, prop_def):
+        permissive_vals = prop_def.get("permissible_values")
+        msg = None
+        if prop_def.get(CDE_TERM) and len(prop_def.get(CDE_TERM)) > 0:
+            cde_code = None
+            cde_terms = [ct for ct in prop_def[CDE_TERM] if 'caDSR' in ct.get('Origin', '')]
+            if cde_terms and len(cde_terms) > 0:
+                cde_code = cde_terms[0].get(TERM_CODE)
+                cde_version = cde_terms[0].get(TERM_VERSION)
+            if not cde_code:
+                return permissive_vals, msg
+            cde = self.mongo_dao.get_cde_permissible_values(cde_code, cde_version)
+            if cde:
+                if cde.get(CDE_PERMISSIVE_VALUES) is not None:
+                    permissive_vals = cde[CDE_PERMISSIVE_VALUES] if len(cde[CDE_PERMISSIVE_VALUES]) > 0 else None
+            elif not self.searched_sts:
+                self.searched_sts = True
+                msg = CDE_NOT_FOUND
+                self.not_found_cde = True
+            elif self.not_found_cde:
+                msg = CDE_NOT_FOUND
+        if permissive_vals and len(permissive_vals) > 0 and isinstance(permissive_vals[0], str):
+            permissive_vals = [item.strip() for item in permissive_vals]
+        return permissive_vals, msg
+
+
+def get_records():
+    return [{ID: f"r{index}", NODE_TYPE: "sample", ORIN_FILE_NAME: "sample.tsv", "lineNumber": index + 2,
+             PROPERTIES: {"sample_id": f"s{index}", **values}} for index, values in enumerate(VALUES)]
+
+
+def get_validator(validator_class):
+    mongo_dao = MagicMock()
+    mongo_dao.get_cde_permissible_values.side_effect = lambda code, version: \
+        {CDE_PERMISSIVE_VALUES: CDE_PVS[code]} if code in CDE_PVS else None
+    validator = validator_class(mongo_dao, None, {TIER_CONFIG: "dev"})
+    validator.submission = {ID: "sub", DATA_COMMON_NAME: "CDS", MODEL_VERSION: "1"}
+    validator.model = DataModel(copy.deepcopy(MODEL))
+    return validator
+
+
+@pytest.fixture(autouse=True)
+def clear_cde_cache():
+    metadata_validator.cde_cache.clear()
+    yield
+    metadata_validator.cde_cache.clear()
+
+
+def test_plan_same_as_definition():
+    records = get_records()
+    validator = get_validator(MetaDataValidator)
+    with patch.object(metadata_validator, "get_pv_by_datacommon_version_cde", return_value=None):
+        results = [validator.validate_props(record, get_msg_prefix(record))[ERRORS] for record in records]
+
+    def_records = get_records()
+    def_validator = get_validator(DefinitionValidator)
+    def_results = [def_validator.validate_props(record, get_msg_prefix(record)) for record in def_records]
+    assert results == def_results
+    # values in wrong case are corrected and boolean values converted the same
+    assert [record[PROPERTIES] for record in records] == [record[PROPERTIES] for record in def_records]
+    codes = [error["code"] for errors in results for error in errors]
+    assert codes.count("M027") == 3 and codes.count("M010") == 6 and "M009" in codes
+    # permissible values of a CDE are resolved once per validation rather than for every value
+    assert validator.mongo_dao.get_cde_permissible_values.call_count == 4
@@ -0,0 +1,74 @@
+import pytest
+from unittest.mock import MagicMock
+import sys
+import os
+import io
+
+current_directory = os.getcwd()
+sys.path.insert(0, current_directory + '/src')
+from src.essential_validator import EssentialValidator
+from src.common.tsv_parser import parse_tsv
+from src.common.tsv_stream import StreamedTsv, RowKeyIndex
+from src.common.constants import ERRORS, FILE_NAME, NODE_TYPE
+
+FILES = [
+    # many-to-many relationships with conflict values, the conflict of s1 is in rows of values different from its first row
+    "type\tsample_id\tstudy.study_id\tname\nsample\ts1\tp1\ta\nsample\ts2\tp1\tb\nsample\ts1\tp2\tc\nsample\ts1\tp3\t\nsample\ts2\tp2\tb\n",
+    # duplicated relationship values of s2 after a conflict of s1
+    "type\tsample_id\tstudy.study_id\tname\nsample\ts1\tp1\ta\nsample\ts1\tp2\tb\nsample\ts2\tp1\tc\nsample\ts2\tp1\tc\n",
+    # duplicated IDs without relationship columns
+    "type\tsample_id\tname\nsample\ts1\ta\nsample\ts2\tb\nsample\ts1\ta\n",
+    # extra cells, duplicated columns, empty rows and tailing empty rows
+    "type\tsample_id\tname\tname.1\t\nsample\ts1\ta\ta\t\nsample\ts2\tb\tb\tx\n\t\t\t\t\nsample\ts3\t\t\t\n\t\t\t\t\n",
+    # different node types
+    "type\tsample_id\tstudy.study_id\nsample\ts1\tp1\nstudy\ts2\tp1\nfile\ts3\tp1\n",
+    # empty IDs and missing required property
+    "type\tsample_id\tstudy.study_id\nsample\t\tp1\nsample\ts2\tp1\nsample\t\tp2\n",
+]
+
+
+class FakeS3Service:
+    def __init__(self, data):
+        self.data = data
+
+    def get_file_stream(self, bucket_name, key):
+        return io.BytesIO(self.data)
+
+
+def get_validator(intention):
+    validator = EssentialValidator(None, None)
+    validator.model = MagicMock()
+    validator.model.get_node_keys.return_value = ["study", "sample", "file"]
+    validator.model.get_node_id.side_effect = lambda node_type: f"{node_type}_id"
+    validator.model.get_node_req_props.side_effect = lambda node_type: ["sample_id", "name"] if node_type == "sample" else []
+    validator.model.get_node_relationships.side_effect = lambda node_type: {"study": {}} if node_type == "sample" else {}
+    validator.batch = {ERRORS: []}
+    validator.submission_intention = intention
+    validator.def_file_nodes = {"file": {}}
+    validator.def_file_name = "file_name"
+    return validator
+
+
+@pytest.mark.parametrize("data", FILES)
+@pytest.mark.parametrize("intention", ["New/Update", "Delete"])
+@pytest.mark.parametrize("chunk_rows", [1, 2, 100])
+def test_streamed_same_as_in_memory(data, intention, chunk_rows, tmp_path):
+    file_path = tmp_path / "test.tsv"
+    file_path.write_text(data)
+    validator = get_validator(intention)
+    validator.df = parse_tsv(str(file_path)).get_validation_frame()
+    file_info = {FILE_NAME: "test.tsv"}
+    result = validator.validate_data(file_info)
+
+    streamed_validator = get_validator(intention)
+    streamed_file = StreamedTsv(FakeS3Service(data.encode()), "bucket", "key", "test.tsv", chunk_rows)
+    row_keys = RowKeyIndex(str(tmp_path))
+    streamed_file_info = {FILE_NAME: "test.tsv"}
+    try:
+        streamed_result = streamed_validator.validate_stream_data(streamed_file_info, streamed_file, row_keys)
+    finally:
+        row_keys.close()
+    assert streamed_result == result
+    assert streamed_file_info[ERRORS] == file_info[ERRORS]
+    assert streamed_file_info.get(NODE_TYPE) == file_info.get(NODE_TYPE)
+    assert streamed_validator.batch[ERRORS] == validator.batch[ERRORS]
@@ -0,0 +1,114 @@
+import pytest
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+import sys
+import os
+
+current_directory = os.getcwd()
+sys.path.insert(0, current_directory + '/src')
+from src import file_validator
+from src.file_validator import FileValidator
+from src.common.constants import STATUS_ERROR, STATUS_PASSED, STATUS_WARNING, S3_FILE_INFO, STATUS, QC_RESULT_ID, \
+    FILE_NAME, MD5, SIZE, ID, LAST_MODIFIED, SUBMISSION_ID, CREATED_AT
+
+S3_FILES = {
+    "root/file/a.txt": (b"aaa", datetime(2024, 1, 2)),
+    "root/file/b.txt": (b"bbb", datetime(2024, 1, 2)),
+    "root/file/c.txt": (b"aaa", datetime(2024, 1, 2)),
+}
+MD5_A, MD5_B = "47bce5c74f589f4867dbd57e9ca9f808", "08f8e0260c64418510cefb2b06eee5cd"
+
+
+def file_record(record_id, file_name, md5, status="New", size=3, qc_id=None):
+    return {ID: record_id, SUBMISSION_ID: "sub", "batchIDs": ["batch"], "latestBatchID": "batch",
+            S3_FILE_INFO: {FILE_NAME: file_name, MD5: md5, SIZE: size, STATUS: status, QC_RESULT_ID: qc_id}}
+
+
+@pytest.fixture
+def mongo_dao():
+    dao = MagicMock()
+    dao.get_files_by_submission.return_value = [
+        file_record("r1", "a.txt", MD5_A),
+        file_record("r2", "b.txt", "wrong md5", qc_id="qc2"),
+        file_record("r3", "c.txt", MD5_A, status="Passed"),
+        file_record("r4", "missing.txt", MD5_B, qc_id="qc4"),
+    ]
+    # b.txt was cached before it is modified, a.txt and c.txt after
+    dao.get_files_md5.return_value = [
+        {ID: "m1", SUBMISSION_ID: "sub", FILE_NAME: "a.txt", MD5: MD5_A, LAST_MODIFIED: datetime(2024, 1, 3), CREATED_AT: datetime(2024, 1, 3)},
+        {ID: "m3", SUBMISSION_ID: "sub", FILE_NAME: "c.txt", MD5: MD5_A, LAST_MODIFIED: datetime(2024, 1, 3), CREATED_AT: datetime(2024, 1, 3)},
+        {ID: "m2", SUBMISSION_ID: "sub", FILE_NAME: "b.txt", MD5: "stale", LAST_MODIFIED: datetime(2024, 1, 1), CREATED_AT: datetime(2024, 1, 1)},
+    ]
+    dao.get_qcRecords.return_value = [{ID: "qc2"}]
+    dao.update_files_info.return_value = (True, None)
+    dao.save_qc_results.return_value = (True, None)
+    return dao
+
+
+@pytest.fixture
+def s3_service():
+    service = MagicMock()
+    service.get_file_head.side_effect = lambda bucket, key: {"ContentLength": len(S3_FILES[key][0]), LAST_MODIFIED: S3_FILES[key][1]} \
+        if key in S3_FILES else None
+    service.streams = []
+    def get_file_stream(bucket, key):
+        stream = MagicMock(read=MagicMock(side_effect=[S3_FILES[key][0], b""]))
+        service.streams.append(stream)
+        return stream
+    service.get_file_stream.side_effect = get_file_stream
+    return service
+
+
+def get_validator(mongo_dao):
+    validator = FileValidator(mongo_dao, workers=2)
+    validator.submission = {ID: "sub"}
+    validator.rootPath = "root"
+    validator.bucket_name = "bucket"
+    return validator
+
+
+@pytest.mark.parametrize("scope, expected_statuses", [
+    ("New", {"r1": STATUS_WARNING, "r2": STATUS_ERROR, "r4": STATUS_ERROR}),
+    ("All", {"r1": STATUS_WARNING, "r2": STATUS_ERROR, "r3": STATUS_WARNING, "r4": STATUS_ERROR}),
+])
+def test_validate_submission_files(mongo_dao, s3_service, scope, expected_statuses):
+    with patch.object(file_validator, "S3Service", return_value=s3_service):
+        assert get_validator(mongo_dao).validate_submission_files("sub", scope)
+    mongo_dao.get_file.assert_not_called()
+    updated_records = list(mongo_dao.update_files_info.call_args.args[0])
+    assert {record[ID]: record[S3_FILE_INFO][STATUS] for record in updated_records} == expected_statuses
+    # md5 of a.txt and c.txt is cached, b.txt is modified after its md5 is cached
+    saved_md5 = list(mongo_dao.save_files_md5.call_args.args[0])
+    assert [(md5_info[ID], md5_info[MD5]) for md5_info in saved_md5] == [("m2", MD5_B)]
+    assert [call.args[1] for call in s3_service.get_file_stream.call_args_list] == ["root/file/b.txt"]
+    assert all(stream.close.called for stream in s3_service.streams)
+    # the existing QC result is updated, a new one is created for each file with an error or a warning
+    saved_qc = list(mongo_dao.save_qc_results.call_args.args[0])
+    assert len(saved_qc) == len(expected_statuses)
+    assert "qc2" in [qc[ID] for qc in saved_qc]
+    mongo_dao.get_qcRecord.assert_not_called()
+    mongo_dao.delete_qcRecords.assert_not_called()
+
+
+def test_passed_file_deletes_qc_result(mongo_dao, s3_service):
+    mongo_dao.get_files_by_submission.return_value = [file_record("r1", "a.txt", MD5_A, qc_id="qc1")]
+    mongo_dao.get_qcRecords.return_value = [{ID: "qc1"}]
+    with patch.object(file_validator, "S3Service", return_value=s3_service):
+        assert get_validator(mongo_dao).validate_submission_files("sub", "All")
+    mongo_dao.delete_qcRecords.assert_called_once_with(["qc1"])
+    mongo_dao.save_qc_results.assert_not_called()
+    record = list(mongo_dao.update_files_info.call_args.args[0])[0]
+    assert record[S3_FILE_INFO][STATUS] == STATUS_PASSED and record[S3_FILE_INFO][QC_RESULT_ID] is None
+
+
+@pytest.mark.parametrize("failed_method, failed_result", [
+    ("get_files_md5", None),
+    ("get_qcRecords", None),
+    ("save_files_md5", False),
+    ("save_qc_results", (False, "failed")),
+    ("update_files_info", (False, "failed")),
+])
+def test_failed_reads_and_writes(mongo_dao, s3_service, failed_method, failed_result):
+    getattr(mongo_dao, failed_method).return_value = failed_result
+    with patch.object(file_validator, "S3Service", return_value=s3_service):
+        assert not get_validator(mongo_dao).validate_submission_files("sub", "All")
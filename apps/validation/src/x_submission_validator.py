@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 import json
 from bento.common.utils import get_logger
-from common.constants import  ADDITION_ERRORS, STATUS_ERROR, FAILED, STATUS_PASSED, STATUS, UPDATED_AT, DATA_COMMON_NAME, \
+from common.constants import  ADDITION_ERRORS, STATUS_ERROR, FAILED, STATUS_PASSED, STATUS, DATA_COMMON_NAME, \
     NODE_TYPE, NODE_ID, VALIDATED_AT, ORIN_FILE_NAME, STUDY_ABBREVIATION, ID, SUBMISSION_STATUS_SUBMITTED, SUBMISSION_REL_STATUS_RELEASED
 from common.utils import current_datetime, create_error
 
@@ -33,21 +33,21 @@ class CrossSubmissionValidator:
         self.submission = submission
         
         #2 retrieve data batch by batch
-        start_index = 0
+        total_count = 0
         validated_count = 0
-        while True:
-            data_records = self.mongo_dao.get_dataRecords_chunk(submission_id, None, start_index, BATCH_SIZE)
-            if start_index == 0 and (not data_records or len(data_records) == 0):
-                msg = f'No metadata to be validated.'
+        for data_records in self.mongo_dao.get_dataRecords_chunks(submission_id, None, None, BATCH_SIZE):
+            if data_records is None:
+                msg = f'{submission_id}: Failed to retrieve metadata to be validated.'
                 self.log.error(msg)
                 return FAILED
-            
-            count = len(data_records) 
+            total_count += len(data_records)
             validated_count += self.validate_nodes(data_records, submission_id)
-            if count < BATCH_SIZE: 
-                self.log.info(f"{submission_id}: {validated_count} out of {count + start_index} nodes are validated.")
-                return STATUS_ERROR if self.isError else STATUS_PASSED 
-            start_index += count  
+        if total_count == 0:
+            msg = f'No metadata to be validated.'
+            self.log.error(msg)
+            return FAILED
+        self.log.info(f"{submission_id}: {validated_count} out of {total_count} nodes are validated.")
+        return STATUS_ERROR if self.isError else STATUS_PASSED 
     
     def validate_nodes(self, data_records, submission_id):
         #2. loop through all records and call validateNode
@@ -60,7 +60,7 @@ class CrossSubmissionValidator:
                     self.isError = True
                 # set status, errors and warnings
                 record[ADDITION_ERRORS] = errors
-                record[UPDATED_AT] = record[VALIDATED_AT] = current_datetime()
+                record[VALIDATED_AT] = current_datetime()
                 updated_records.append(record)
                 validated_count += 1
         except Exception as e:
@@ -69,7 +69,7 @@ class CrossSubmissionValidator:
             self.log.exception(msg) 
             self.isError = True 
         #3. update data records based on record's _id
-        result = self.mongo_dao.update_data_records_addition_error(updated_records)
+        result, _ = self.mongo_dao.update_data_records_addition_error(updated_records)
         if not result:
             #4. set errors in submission
             msg = f'Failed to update dataRecords for the submission, {submission_id}.'